@@ -1,28 +1,56 @@
 ### SISTEMA DE DEFESA AMBIENTAL - VERSÃO FINAL COMPLETA ###
 
+import time
+_INICIO_SCRIPT = time.perf_counter()
+
 import streamlit as st
-import os
-import datetime
-import re
-import glob
-from pypdf import PdfReader
-from pypdf.errors import PdfReadError
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from fpdf import FPDF
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import asyncio
+import logging
+import threading
+import importlib
+from extracao_pdf import hash_conteudo
+from metricas import registro as registro_metricas
+from processamento import (NOME_BANCO, extrair_dados_cadastrais_do_texto, separar_exigencias,
+                           processar_pdf_completo, processar_apenas_cadastro, consultar_ia_stream, rascunhar_fila,
+                           abrir_cerebro)
+from relatorio_pdf import RelatorioPdf, ASSINANTE_PADRAO, CARGO_PADRAO
+from armazem_analises import ArmazemAnalises, novo_id
+# Chroma, ChatGroq, FPDF, embeddings e o indexador são importados só onde são usados:
+# os pesados carregam na thread de aquecimento (ver AquecimentoCerebro) e não atrasam a primeira pintura.
+
+logger = logging.getLogger("defesa_ambiental")
+_inicio_execucao = time.perf_counter()
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="Sistema de Defesa Ambiental", layout="wide")
 
 # --- ESTADO DA SESSÃO (INICIALIZAÇÃO) ---
-if "relatorio" not in st.session_state: st.session_state.relatorio = []
-if "fila_exigencias" not in st.session_state: st.session_state.fila_exigencias = []
-if "dados_auto" not in st.session_state: 
-    st.session_state.dados_auto = {"empresa": "", "cnpj": "", "endereco": "", "cidade": ""}
+# A análise vive no armazém SQLite e é identificada pelo ?analise= da URL: um refresh,
+# a queda do worker ou outro worker atrás do balanceador recarregam o mesmo estado.
+@st.cache_resource
+def abrir_armazem():
+    return ArmazemAnalises()
+
+armazem = abrir_armazem()
+if "analise" not in st.query_params: st.query_params["analise"] = novo_id()
+if st.session_state.get("analise_id") != st.query_params["analise"]:
+    estado = armazem.carregar(st.query_params["analise"])
+    st.session_state.analise_id = st.query_params["analise"]
+    # Só as análises abertas nesta sessão aparecem em "Retomar": outras pessoas usam o mesmo arquivo
+    st.session_state.setdefault("analises_abertas", [])
+    if st.session_state.analise_id not in st.session_state.analises_abertas:
+        st.session_state.analises_abertas.append(st.session_state.analise_id)
+    st.session_state.relatorio = estado["relatorio"]
+    st.session_state.fila_exigencias = estado["fila"]
+    st.session_state.rascunhos = estado["rascunhos"]
+    st.session_state.modos_rascunhos = estado["modos"]
+    st.session_state.dados_auto = estado["dados_auto"]
+    for chave in ("editor_exigencia", "editor_resposta", "editor_indice", "editor_modo"): st.session_state.pop(chave, None)
+if "relatorio_pdf" not in st.session_state: st.session_state.relatorio_pdf = RelatorioPdf()
+
+def salvar_analise():
+    armazem.salvar(st.session_state.analise_id, dados_auto=st.session_state.dados_auto,
+                   fila=st.session_state.fila_exigencias, relatorio=st.session_state.relatorio)
 
 # --- CENTRO DE CONTROLE ESTÉTICO ---
 with st.sidebar:
@@ -55,219 +83,79 @@ st.markdown(f"""
     </style>
     """, unsafe_allow_html=True)
 
-# --- FUNÇÕES DE EXTRAÇÃO E PROCESSAMENTO ---
-
-### INÍCIO DO NOVO CÓDIGO ###
-
-### INÍCIO DO CÓDIGO A SER SUBSTITUÍDO ###
-
-def extrair_dados_cadastrais_do_texto(texto_llm):
-    """Converte o texto bruto da IA em um dicionário de dados."""
-    dados = {"empresa": "", "cnpj": "", "endereco": "", "cidade": ""}
-    padroes = {
-        "empresa": r"EMPRESA:\s*(.+)", 
-        "cnpj": r"CNPJ:\s*(.+)",
-        "endereco": r"ENDERECO:\s*(.+)", 
-        "cidade": r"CIDADE:\s*(.+)"
-    }
-    for chave, padrao in padroes.items():
-        match = re.search(padrao, texto_llm, re.IGNORECASE)
-        if match: 
-            dados[chave] = match.group(1).strip()
-    return dados
-
-### FIM DO CÓDIGO A SER SUBSTITUÍDO ###
-
-### FIM DO NOVO CÓDIGO ###
-
-def processar_pdf_completo(arquivo_pdf, api_key):
-    try:
-        reader = PdfReader(arquivo_pdf)
-        texto_completo = ""
-        for page in reader.pages:
-            try:
-                extracted_text = page.extract_text()
-                if extracted_text: texto_completo += extracted_text + "\n"
-            except: continue
-        if not texto_completo.strip(): return "ERRO: Texto não extraído.", "ERRO: Texto não extraído."
-
-        llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.0, api_key=api_key)
-
-        template_dados = """
-        Analise o texto da licença ambiental abaixo e extraia os dados do LICENCIADO.
-        TEXTO: {texto}
-        RETORNE APENAS NESTE FORMATO:
-        EMPRESA: (Razão Social)
-        CNPJ: (CNPJ)
-        ENDERECO: (Logradouro)
-        CIDADE: (Cidade - UF)
-        """
-        chain_dados = ChatPromptTemplate.from_template(template_dados) | llm
-        dados_cadastrais = chain_dados.invoke({"texto": texto_completo[:4000]}).content
-
-        template_exigencias = """
-        Analise o texto da Licença Ambiental.
-        SUA MISSÃO: Listar todas as EXIGÊNCIAS TÉCNICAS que o cliente precisa cumprir.
-        REGRAS:
-        1. NUNCA escreva textos introdutórios como "Aqui estão as exigências...".
-        2. Ignore leis, artigos e preâmbulos.
-        3. Copie o texto fiel da exigência.
-        4. Separe cada exigência EXCLUSIVAMENTE com o delimitador "###".
-        TEXTO: {texto}
-        RESPOSTA (APENAS AS EXIGÊNCIAS, SEM NADA ANTES OU DEPOIS):
-        """
-        chain_exig = ChatPromptTemplate.from_template(template_exigencias) | llm
-        lista_exigencias = chain_exig.invoke({"texto": texto_completo}).content
-        
-        return dados_cadastrais, lista_exigencias
-    except Exception as e:
-        return f"ERRO: {e}", f"ERRO: {e}"
-
-def processar_apenas_cadastro(arquivo_pdf, api_key):
-    try:
-        reader = PdfReader(arquivo_pdf)
-        texto_curto = ""
-        for i, page in enumerate(reader.pages):
-            if i > 2: break
-            texto_curto += page.extract_text() + "\n"
-            
-        llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.0, api_key=api_key)
-        template_dados = """
-        Extraia os dados cadastrais.
-        TEXTO: {texto}
-        RETORNE APENAS NESTE FORMATO:
-        EMPRESA: (Razão Social)
-        CNPJ: (CNPJ)
-        ENDERECO: (Logradouro)
-        CIDADE: (Cidade - UF)
-        """
-        chain_dados = ChatPromptTemplate.from_template(template_dados) | llm
-        return chain_dados.invoke({"texto": texto_curto}).content
-    except Exception as e:
-        return f"ERRO: {e}"
-
-def consultar_ia(exigencia, vectorstore, api_key, temperatura=0.0, modo="media"):
-    docs = vectorstore.similarity_search(exigencia, k=3)
-    contexto = "\n".join([d.page_content for d in docs])
-    llm = ChatGroq(model="llama-3.1-8b-instant", temperature=temperatura, api_key=api_key)
-    instrucoes_modo = {
-        "curta": "ESTILO: CURTO E GROSSO. FOCO: Diga apenas que a exigência foi cumprida.",
-        "media": "ESTILO: EQUILIBRADO E TÉCNICO. FOCO: Confirme o atendimento e explique brevemente.",
-        "avancada": "ESTILO: TÉCNICO DETALHADO. FOCO: Explique o funcionamento técnico completo."
-    }.get(modo, "ESTILO: TÉCNICO.")
-    template = f"""
-    Você é um Engenheiro Ambiental Sênior. {instrucoes_modo}
-    REGRAS GERAIS: Use voz passiva, seja impessoal, não repita a pergunta.
-    CONTEXTO (Gabarito): {{context}}
-    EXIGÊNCIA (Pergunta): {{question}}
-    RESPOSTA:
+# --- AQUECIMENTO EM SEGUNDO PLANO ---
+class AquecimentoCerebro:
+    """
+    Carrega modelo de embeddings, Chroma, BM25 e cache de respostas numa thread,
+    enquanto a página já é desenhada. Registra quanto tempo cada etapa levou.
     """
-    chain = ChatPromptTemplate.from_template(template) | llm
-    return chain.invoke({"context": contexto, "question": exigencia}).content
-
-def construir_cerebro():
-    PASTA_DOCUMENTOS = "pdfs_cetesb"; NOME_BANCO = "banco_chroma"
-    if not os.path.exists(PASTA_DOCUMENTOS): os.makedirs(PASTA_DOCUMENTOS); return None
-    documentos = []
-    loaders = {".pdf": PyPDFLoader, ".txt": TextLoader, ".docx": Docx2txtLoader}
-    for extensao, loader_class in loaders.items():
-        for arc in glob.glob(os.path.join(PASTA_DOCUMENTOS, f"*{extensao}")):
-            try:
-                loader = loader_class(arc); documentos.extend(loader.load())
-            except: continue
-    if not documentos: return None
-    splits = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents(documentos)
-    vectorstore = Chroma.from_documents(documents=splits, embedding=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"), persist_directory=NOME_BANCO)
-    return vectorstore
-
-@st.cache_resource
-def carregar_ou_construir_cerebro():
-    NOME_BANCO = "banco_chroma"
-    if os.path.exists(NOME_BANCO):
-        embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        return Chroma(persist_directory=NOME_BANCO, embedding_function=embedding_function)
-    return construir_cerebro()
 
-### INÍCIO DO NOVO CÓDIGO ###
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.vectorstore = self.indice_lexical = self.cache_respostas = self.erro = None
+        # A thread grava tempos enquanto a página os lê: todo acesso passa pela trava
+        self._trava_tempos = threading.Lock()
+        self._tempos = {"imports do app.py": _inicio_execucao - _INICIO_SCRIPT}
+        threading.Thread(target=self._carregar, name="aquecimento-cerebro", daemon=True).start()
+
+    def registrar_tempo(self, etapa, segundos, substituir=True):
+        with self._trava_tempos:
+            if substituir or etapa not in self._tempos: self._tempos[etapa] = segundos
+
+    def tempos(self):
+        """Cópia dos tempos registrados até agora."""
+        with self._trava_tempos:
+            return dict(self._tempos)
+
+    def _medir(self, etapa, funcao):
+        inicio = time.perf_counter()
+        try:
+            return funcao()
+        finally:
+            self.registrar_tempo(etapa, time.perf_counter() - inicio)
+
+    def _carregar(self):
+        try:
+            from motor_embeddings import MotorEmbeddings
+            # Mesmo motor (e mesmo cache em disco) usado pelo treinar.py; consultas repetidas saem do LRU
+            embedding_function = self._medir("modelo de embeddings", MotorEmbeddings)
+            self._medir("primeira inferência", lambda: embedding_function.embed_query("aquecimento"))
+            # Abre o banco; se ele ainda não existe, a primeira indexação roda aqui mesmo, sem pool de processos
+            self.vectorstore = self._medir("chroma", lambda: abrir_cerebro(embedding_function))
+            if self.vectorstore:
+                from busca_hibrida import IndiceLexical
+                from cache_respostas import CacheRespostas
+                from indexador import versao_do_cerebro
+                # BM25 abre via memmap; a versão da base invalida respostas de um cérebro antigo
+                self.indice_lexical = self._medir("índice BM25", lambda: IndiceLexical.abrir(NOME_BANCO))
+                self.cache_respostas = self._medir("cache de respostas", lambda: CacheRespostas(
+                    embedding_function, versao_do_cerebro(NOME_BANCO)))
+            # Deixa os imports do LLM e do PDF prontos para o primeiro clique
+            self._medir("imports LLM/PDF", lambda: [importlib.import_module(m) for m in ("langchain_groq", "langchain_core.prompts", "fpdf")])
+        except Exception as e:
+            self.erro = e
+            logger.exception("falha no aquecimento do cérebro")
+        finally:
+            self.pronto.set()
+            logger.info("aquecimento concluído: %s", {k: round(v, 3) for k, v in self.tempos().items()})
+
+    def aguardar(self):
+        """Bloqueia até o cérebro estar pronto (usado só por ações que precisam dele)."""
+        if not self.pronto.is_set():
+            with st.spinner("Carregando a base de conhecimento..."):
+                self.pronto.wait()
+        return self.vectorstore, self.indice_lexical, self.cache_respostas
 
-# --- FUNÇÃO DE GERAR PDF FINAL ---
-def gerar_pdf_final(itens, empresa, cidade, nome, cargo):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    
-    # Limpeza robusta de TODOS os caracteres indesejados
-    empresa_limpa = str(empresa).strip().strip("'\"“”*")
-    cidade_limpa = str(cidade).strip().strip("'\"“”*")
-    nome_limpo = str(nome).strip().strip("'\"“”*")
-    cargo_limpo = str(cargo).strip().strip("'\"“”*")
-
-    # Cabeçalho
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, empresa_limpa.encode('latin-1', 'replace').decode('latin-1'), ln=True, align="C")
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "RELATORIO DE ATENDIMENTO AS EXIGENCIAS TECNICAS", ln=True, align="C")
-    pdf.ln(10)
-    
-    for item in itens:
-        pdf.set_font("Arial", "B", 11)
-        pdf.set_fill_color(230, 230, 230)
-        tit = str(item['titulo']).encode('latin-1', 'replace').decode('latin-1')
-        pdf.cell(0, 8, tit, ln=True, fill=True, align="C")
-        pdf.ln(2)
-        if item['exigencia']:
-            pdf.set_font("Arial", "I", 9)
-            pdf.set_text_color(100, 100, 100)
-            exi = f"Exigencia: {str(item['exigencia'])}".encode('latin-1', 'replace').decode('latin-1')
-            pdf.multi_cell(0, 5, exi)
-            pdf.ln(2)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", "", 10)
-        res = str(item['resposta']).encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 5, res)
-        pdf.ln(8)
-        
-    # Assinatura
-    if pdf.get_y() > 240: pdf.add_page()
-    pdf.ln(10)
-    
-    # Linha da Cidade e Data
-    hoje = datetime.date.today()
-    meses = {"01": "janeiro", "02": "fevereiro", "03": "março", "04": "abril", "05": "maio", "06": "junho", "07": "julho", "08": "agosto", "09": "setembro", "10": "outubro", "11": "novembro", "12": "dezembro"}
-    data_formatada = f"{hoje.day} de {meses[hoje.strftime('%m')]} de {hoje.year}"
-    linha_cidade_data = f"{cidade_limpa}, {data_formatada}"
-    pdf.set_font("Arial", "", 11)
-    pdf.cell(0, 10, linha_cidade_data.encode('latin-1', 'replace').decode('latin-1'), ln=True, align="C")
-    
-    # --- CIRURGIA FINAL: Reposicionamento da imagem da assinatura ---
-    if os.path.exists("assinatura.png"):
-        assinatura_w = 100
-        
-        # <<< CIRURGIA: Deslocamento para a ESQUERDA >>>
-        # Pega a posição anterior (centro + 3cm) e recua 1cm (10mm)
-        assinatura_x = ((pdf.w - assinatura_w) / 2) + 20 # (30 - 10 = 20)
-        
-        # Posição Y mantida
-        assinatura_y = pdf.get_y() - 20
-        
-        pdf.image("assinatura.png", x=assinatura_x, y=assinatura_y, w=assinatura_w)
-        
-        pdf.ln(30) 
-    else:
-        pdf.ln(15)
-    # --- FIM DA CIRURGIA ---
-
-    pdf.line(60, pdf.get_y(), 150, pdf.get_y())
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 7, nome_limpo.encode('latin-1', 'replace').decode('latin-1'), ln=True, align="C")
-    pdf.set_font("Arial", "", 10)
-    pdf.cell(0, 5, cargo_limpo.encode('latin-1', 'replace').decode('latin-1'), ln=True, align="C")
-    
-    return pdf.output(dest="S").encode("latin-1", "replace")
+@st.cache_resource
+def iniciar_aquecimento():
+    return AquecimentoCerebro()
 
-### FIM DO NOVO CÓDIGO ###
 # --- INTERFACE PRINCIPAL ---
-vectorstore = carregar_ou_construir_cerebro()
+aquecimento = iniciar_aquecimento()
+if aquecimento.pronto.is_set():
+    vectorstore, indice_lexical, cache_respostas = aquecimento.aguardar()
+else:
+    vectorstore = indice_lexical = cache_respostas = None
 
 ### INÍCIO DO NOVO CÓDIGO ###
 
@@ -282,26 +170,33 @@ with st.sidebar:
 
     # <<< CIRURGIA 1: Botão para zerar a sessão.
     if st.button("Nova Análise 🔄"):
-        # Limpa todas as variáveis de sessão para recomeçar
-        st.session_state.relatorio = []
-        st.session_state.fila_exigencias = []
-        st.session_state.dados_auto = {"empresa": "", "cnpj": "", "endereco": "", "cidade": ""}
-        # Limpa também os estados temporários do editor, se existirem
-        if "editor_exigencia" in st.session_state:
-            del st.session_state.editor_exigencia
-        if "editor_resposta" in st.session_state:
-            del st.session_state.editor_resposta
+        # Novo id na URL: o estado em branco é carregado no rerun e a análise anterior fica salva
+        st.query_params["analise"] = novo_id()
         st.rerun()
 
+    recentes = armazem.recentes(a for a in st.session_state.analises_abertas if a != st.session_state.analise_id)
+    if recentes:
+        with st.expander("📂 Retomar análise"):
+            for analise in recentes:
+                rotulo = f"{analise['empresa'] or 'Sem empresa'} · {analise['na_fila']} na fila · {analise['aprovados']} aprovados"
+                if st.button(rotulo, key=f"retomar_{analise['id']}"):
+                    st.query_params["analise"] = analise["id"]
+                    st.rerun()
+
     st.markdown("---")
     uploaded_file = st.file_uploader("Subir Licença (PDF)", type="pdf")
     
     if uploaded_file:
         st.markdown("### Selecione a Tática:")
+        # Extração guardada errada (ou de antes de um ajuste nos prompts): chama o LLM de novo e sobrescreve
+        reextrair = st.checkbox("🔄 Reextrair (ignorar extração guardada)", value=False)
         
         if st.button("🕵️ IMPORTAR TUDO (AUTO)", type="primary"):
             with st.spinner("Extraindo Dados e Perguntas..."):
-                txt_dados, txt_exigencias = processar_pdf_completo(uploaded_file, api_key)
+                # O mesmo PDF já extraído (nesta ou em outra análise) não volta ao LLM
+                hash_pdf = hash_conteudo(uploaded_file)
+                extraido = None if reextrair else armazem.extracao(hash_pdf, "completo")
+                txt_dados, txt_exigencias = extraido or processar_pdf_completo(uploaded_file, api_key, hash_pdf=hash_pdf)
                 
                 if "ERRO:" in txt_dados:
                     st.error(f"Falha ao processar PDF: {txt_dados}")
@@ -309,21 +204,33 @@ with st.sidebar:
                     novos_dados = extrair_dados_cadastrais_do_texto(txt_dados)
                     st.session_state.dados_auto.update(novos_dados)
                     
-                    raw_list = txt_exigencias.split('###') if "###" in txt_exigencias else txt_exigencias.split('\n')
-                    
-                    st.session_state.fila_exigencias = [item.strip() for item in raw_list if len(item.strip()) > 10]
+                    st.session_state.fila_exigencias = separar_exigencias(txt_exigencias)
+                    st.session_state.rascunhos = {}
+                    st.session_state.modos_rascunhos = {}
+                    # Sem exigências a extração provavelmente falhou: não fica guardada para a próxima vez
+                    if st.session_state.fila_exigencias:
+                        armazem.guardar_extracao(hash_pdf, "completo", [txt_dados, txt_exigencias])
+                    armazem.limpar_rascunhos(st.session_state.analise_id)
+                    salvar_analise()
                     st.success("Processamento concluído!")
                     st.rerun()
 
         if st.button("📝 SÓ CADASTRO (MANUAL)"):
             with st.spinner("Lendo cabeçalho..."):
-                txt_dados = processar_apenas_cadastro(uploaded_file, api_key)
+                hash_pdf = hash_conteudo(uploaded_file)
+                extraido = None if reextrair else armazem.extracao(hash_pdf, "cadastro")
+                txt_dados = extraido or processar_apenas_cadastro(uploaded_file, api_key, hash_pdf=hash_pdf)
                 if "ERRO:" in txt_dados:
                     st.error(f"Falha ao processar PDF: {txt_dados}")
                 else:
                     novos_dados = extrair_dados_cadastrais_do_texto(txt_dados)
                     st.session_state.dados_auto.update(novos_dados)
                     st.session_state.fila_exigencias = [] 
+                    st.session_state.rascunhos = {}
+                    st.session_state.modos_rascunhos = {}
+                    armazem.guardar_extracao(hash_pdf, "cadastro", txt_dados)
+                    armazem.limpar_rascunhos(st.session_state.analise_id)
+                    salvar_analise()
                     st.success("Cadastro preenchido!")
                     st.rerun()
 
@@ -333,22 +240,34 @@ with st.sidebar:
     INPUT_CNPJ = st.text_input("CNPJ", st.session_state.dados_auto["cnpj"])
     INPUT_ENDERECO = st.text_input("Endereço", st.session_state.dados_auto["endereco"])
     INPUT_CIDADE = st.text_input("Cidade", st.session_state.dados_auto["cidade"])
+    # Correções feitas à mão também vão para o armazém: um refresh não volta ao texto extraído
+    digitados = {"empresa": INPUT_EMPRESA, "cnpj": INPUT_CNPJ, "endereco": INPUT_ENDERECO, "cidade": INPUT_CIDADE}
+    if any(st.session_state.dados_auto.get(campo) != valor for campo, valor in digitados.items()):
+        st.session_state.dados_auto.update(digitados)
+        armazem.salvar(st.session_state.analise_id, dados_auto=st.session_state.dados_auto)
     
     st.markdown("---")
-    INPUT_NOME = st.text_input("Assinatura (Nome)", "Ângelo Aparecido Amadeu Júnior")
-    INPUT_CARGO = st.text_input("Cargo", "Consultor Técnico")
+    INPUT_NOME = st.text_input("Assinatura (Nome)", ASSINANTE_PADRAO)
+    INPUT_CARGO = st.text_input("Cargo", CARGO_PADRAO)
 
 ### FIM DO NOVO CÓDIGO ###
 
 # CORPO DA PÁGINA
 st.title("🛡️ CENTRAL DE DEFESA AMBIENTAL")
-if not vectorstore: st.warning("Atenção: Base de conhecimento (cérebro) não encontrada. As respostas da IA serão baseadas apenas no conhecimento geral.")
+if not aquecimento.pronto.is_set(): st.info("⏳ Carregando a base de conhecimento em segundo plano. Você já pode importar a licença.")
+elif aquecimento.erro or not vectorstore:
+    if aquecimento.erro: st.error(f"Falha ao carregar a base de conhecimento: {aquecimento.erro}")
+    else: st.warning("Atenção: Base de conhecimento (cérebro) não encontrada. Rode o treinar.py para criá-la a partir da pasta de documentos.")
+    # O aquecimento fica no cache do processo: sem isso a falha (ou o banco ausente) valeria até reiniciar o servidor
+    if st.button("🔁 Tentar carregar de novo"):
+        iniciar_aquecimento.clear()
+        st.rerun()
 col1, col2 = st.columns([1, 1])
 with col1:
     st.subheader("1. Fila de Exigências")
     if st.session_state.fila_exigencias:
         st.info(f"Existem {len(st.session_state.fila_exigencias)} itens para processar.")
-        opcoes = [f"{i+1}. {item[:60]}..." for i, item in enumerate(st.session_state.fila_exigencias)]
+        opcoes = [f"{'📝 ' if item in st.session_state.rascunhos else ''}{i+1}. {item[:60]}..." for i, item in enumerate(st.session_state.fila_exigencias)]
         idx = st.selectbox("Selecione o item:", range(len(opcoes)), format_func=lambda x: opcoes[x])
         exigencia_selecionada = st.session_state.fila_exigencias[idx]
         st.text_area("Texto da Exigência:", value=exigencia_selecionada, height=150, disabled=True)
@@ -356,12 +275,47 @@ with col1:
             st.session_state.editor_exigencia = exigencia_selecionada
             st.session_state.editor_indice = idx
             if "editor_resposta" in st.session_state: del st.session_state.editor_resposta
+            st.session_state.pop("editor_modo", None)
+            if exigencia_selecionada in st.session_state.rascunhos:
+                st.session_state.editor_resposta = st.session_state.rascunhos[exigencia_selecionada]
+                st.session_state.editor_modo = st.session_state.modos_rascunhos.get(exigencia_selecionada)
             st.rerun()
+
+        # Rascunho em lote: toda a fila de uma vez, com concorrência limitada
+        pendentes = [e for e in st.session_state.fila_exigencias if e not in st.session_state.rascunhos]
+        if pendentes:
+            modo_lote = st.radio("Profundidade dos rascunhos:", ["curta", "media", "avancada"], index=0, horizontal=True, key="modo_lote")
+            if st.button(f"⚡ RASCUNHAR TODOS ({len(pendentes)})"):
+                vectorstore, indice_lexical, cache_respostas = aquecimento.aguardar()
+                if not vectorstore:
+                    st.error("Base de conhecimento não encontrada. Resposta não pode ser gerada.")
+                else:
+                    barra = st.progress(0.0, text="Gerando rascunhos...")
+                    painel = st.container()
+                    concluidos = []
+
+                    def _mostrar_rascunho(i, resposta, erro):
+                        concluidos.append(i)
+                        barra.progress(len(concluidos) / len(pendentes), text=f"{len(concluidos)}/{len(pendentes)} rascunhos")
+                        if erro is not None:
+                            painel.error(f"Falha no item '{pendentes[i][:60]}...': {erro}")
+                            return
+                        st.session_state.rascunhos[pendentes[i]] = resposta
+                        st.session_state.modos_rascunhos[pendentes[i]] = modo_lote
+                        # Gravado na hora: se a página cair no meio do lote, o clique seguinte só faz o que faltou
+                        armazem.guardar_rascunho(st.session_state.analise_id, pendentes[i], resposta, modo_lote)
+                        with painel.expander(f"📝 {pendentes[i][:60]}..."):
+                            st.write(resposta)
+
+                    asyncio.run(rascunhar_fila(pendentes, vectorstore, api_key, modo=modo_lote, ao_concluir=_mostrar_rascunho,
+                                               indice_lexical=indice_lexical, cache_respostas=cache_respostas))
+                    st.success("Rascunhos prontos! Selecione um item e clique em RESPONDER para revisar.")
     else:
         st.write("Fila vazia. Importe um PDF ou adicione manualmente.")
         if st.button("➕ ADICIONAR ITEM MANUAL"):
             st.session_state.editor_exigencia = ""
             if "editor_indice" in st.session_state: del st.session_state.editor_indice
+            st.session_state.pop("editor_modo", None)
             st.rerun()
 ### INÍCIO DO NOVO CÓDIGO ###
 
@@ -375,27 +329,56 @@ with col2:
         titulo_item = st.text_input("Título do Relatório:", tit_sugerido)
         texto_exigencia = st.text_area("Exigência:", value=st.session_state.editor_exigencia, height=100)
         
+        # Geração interrompida: o clique em PARAR reinicia o script no meio do stream.
+        # O texto parcial é aproveitado só se a parada foi pedida; qualquer outra interação o descarta.
+        if "editor_parcial" in st.session_state:
+            parcial = st.session_state.pop("editor_parcial")
+            if st.session_state.get("parar_geracao") and parcial.strip():
+                st.session_state.editor_resposta = parcial
+
         if "editor_resposta" not in st.session_state:
             if st.button("GERAR RESPOSTA TÉCNICA ⚡", type="primary"):
+                vectorstore, indice_lexical, cache_respostas = aquecimento.aguardar()
                 if not vectorstore:
                     st.error("Base de conhecimento não encontrada. Resposta não pode ser gerada.")
                 else:
-                    with st.spinner("Consultando base técnica..."):
-                        resposta = consultar_ia(texto_exigencia, vectorstore, api_key, modo=modo)
-                        st.session_state.editor_resposta = resposta
-                        st.rerun()
+                    st.button("⏹ PARAR GERAÇÃO", key="parar_geracao")
+                    st.session_state.editor_parcial = ""
+                    st.session_state.editor_modo = modo
+
+                    fluxo = consultar_ia_stream(texto_exigencia, vectorstore, api_key, modo=modo,
+                                                indice_lexical=indice_lexical, cache_respostas=cache_respostas)
+
+                    def _acumular():
+                        for pedaco in fluxo:
+                            st.session_state.editor_parcial += pedaco
+                            yield pedaco
+
+                    # PARAR reinicia o script no meio do write_stream: o close devolve na hora a vaga
+                    # do pool de LLM em vez de esperar o coletor de lixo
+                    try:
+                        st.write_stream(_acumular())
+                    finally:
+                        fluxo.close()
+                    st.session_state.editor_resposta = st.session_state.pop("editor_parcial")
+                    st.rerun()
         
         if "editor_resposta" in st.session_state:
             resposta_final = st.text_area("Resposta da IA (Editável):", value=st.session_state.editor_resposta, height=200)
             
             c1, c2 = st.columns(2)
             if c1.button("✅ APROVAR E SALVAR"):
+                vectorstore, indice_lexical, cache_respostas = aquecimento.aguardar()
                 # 1. Salva o item atual no relatório
                 st.session_state.relatorio.append({
                     "titulo": titulo_item, 
                     "exigencia": texto_exigencia, 
                     "resposta": resposta_final
                 })
+                # Resposta aprovada alimenta o cache semântico para as próximas licenças,
+                # no modo com que foi gerada (rascunho do lote usa o modo do lote, não o do editor)
+                if cache_respostas is not None and texto_exigencia.strip():
+                    cache_respostas.guardar(texto_exigencia, st.session_state.pop("editor_modo", None) or modo, resposta_final)
                 
                 # 2. Remove o item da fila de exigências
                 idx_antigo = st.session_state.get("editor_indice", -1)
@@ -406,6 +389,10 @@ with col2:
                 
                 # 3. Limpa a resposta do editor atual
                 del st.session_state.editor_resposta
+                st.session_state.rascunhos.pop(st.session_state.editor_exigencia, None)
+                st.session_state.modos_rascunhos.pop(st.session_state.editor_exigencia, None)
+                armazem.remover_rascunho(st.session_state.analise_id, st.session_state.editor_exigencia)
+                salvar_analise()
                 
                 # 4. Verifica se ainda há itens na fila
                 if st.session_state.fila_exigencias:
@@ -416,6 +403,9 @@ with col2:
                     # Prepara o editor para o próximo item
                     st.session_state.editor_exigencia = st.session_state.fila_exigencias[novo_idx]
                     st.session_state.editor_indice = novo_idx
+                    if st.session_state.editor_exigencia in st.session_state.rascunhos:
+                        st.session_state.editor_resposta = st.session_state.rascunhos[st.session_state.editor_exigencia]
+                        st.session_state.editor_modo = st.session_state.modos_rascunhos.get(st.session_state.editor_exigencia)
                 else:
                     # Se a fila acabou, limpa o editor completamente
                     del st.session_state.editor_exigencia
@@ -425,6 +415,7 @@ with col2:
                 
             if c2.button("❌ CANCELAR"):
                 del st.session_state.editor_exigencia
+                st.session_state.pop("editor_modo", None)
                 if "editor_resposta" in st.session_state: del st.session_state.editor_resposta
                 st.rerun()
 
@@ -438,13 +429,36 @@ if st.session_state.relatorio:
             st.markdown(f"**Resposta:**\n{item['resposta']}")
             if st.button("Remover Item", key=f"del_{i}"):
                 st.session_state.relatorio.pop(i)
+                salvar_analise()
                 st.rerun()
     st.markdown("---")
-    pdf_bytes = gerar_pdf_final(st.session_state.relatorio, INPUT_EMPRESA, INPUT_CIDADE, INPUT_NOME, INPUT_CARGO)
-    st.download_button(label="📄 BAIXAR RELATÓRIO EM PDF", data=pdf_bytes, file_name=f"Relatorio_Defesa_{INPUT_EMPRESA}.pdf", mime="application/pdf", type="primary")
+    # O PDF só é montado quando pedido; o mesmo conteúdo não é diagramado duas vezes
+    relatorio_pdf = st.session_state.relatorio_pdf
+    dados_relatorio = (st.session_state.relatorio, INPUT_EMPRESA, INPUT_CIDADE, INPUT_NOME, INPUT_CARGO)
+    if not relatorio_pdf.pronto(*dados_relatorio) and st.button("📄 PREPARAR RELATÓRIO EM PDF", type="primary"):
+        with st.spinner("Montando o PDF..."):
+            relatorio_pdf.gerar(*dados_relatorio)
+    if relatorio_pdf.pronto(*dados_relatorio):
+        st.download_button(label="📄 BAIXAR RELATÓRIO EM PDF", data=relatorio_pdf.gerar(*dados_relatorio), file_name=f"Relatorio_Defesa_{INPUT_EMPRESA}.pdf", mime="application/pdf", type="primary")
 else:
     st.info("Ainda não há itens aprovados no relatório.")
 
+# --- RELATÓRIO DE INICIALIZAÇÃO ---
+aquecimento.registrar_tempo("primeira pintura da página", time.perf_counter() - _INICIO_SCRIPT, substituir=False)
+with st.sidebar.expander("⏱️ Tempo de inicialização"):
+    for etapa, segundos in aquecimento.tempos().items():
+        st.write(f"{etapa}: {segundos:.2f}s")
+    if not aquecimento.pronto.is_set(): st.caption("Aquecimento em andamento...")
+
+# --- PAINEL DE DESEMPENHO (p50/p95 DAS ÚLTIMAS MEDIÇÕES) ---
+with st.sidebar.expander("📊 Desempenho"):
+    linhas_metricas = registro_metricas().resumo()
+    if linhas_metricas:
+        st.dataframe(linhas_metricas, hide_index=True, use_container_width=True)
+        st.caption("Tempos em ms; tokens somam entrada + saída por chamada ao LLM.")
+    else:
+        st.caption("Nenhuma medição registrada ainda.")
+
 
 
 
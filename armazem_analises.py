@@ -0,0 +1,127 @@
+### ARMAZÉM DE ANÁLISES: FILA, RASCUNHOS, APROVADOS E CADASTRO EM SQLITE ###
+
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_ANALISES = "analises.sqlite"
+ESPERA_TRAVA_SEGUNDOS = 30  # vários workers gravando no mesmo arquivo esperam a vez em vez de falhar
+MAX_ANALISES_RECENTES = 15
+# Suba quando os prompts ou o corte da extração mudarem: extrações guardadas com a versão anterior deixam de valer
+VERSAO_EXTRACAO = 2
+
+def novo_id():
+    return uuid.uuid4().hex[:12]
+
+def dados_vazios():
+    return {"empresa": "", "cnpj": "", "endereco": "", "cidade": ""}
+
+def _tipo_versionado(tipo):
+    return f"{tipo}@v{VERSAO_EXTRACAO}"
+
+class ArmazemAnalises:
+    """
+    Estado de cada análise fora da sessão do Streamlit: um refresh do navegador, a queda
+    de um worker ou outro worker atrás do balanceador retomam do mesmo ponto. Rascunhos
+    ficam um por linha, gravados assim que cada item do lote termina. Extrações de PDF
+    (as chamadas pagas ao LLM) ficam guardadas pelo hash do arquivo.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_ANALISES):
+        self._trava = threading.Lock()
+        self._db = sqlite3.connect(arquivo, check_same_thread=False, timeout=ESPERA_TRAVA_SEGUNDOS)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS analises (
+            id TEXT PRIMARY KEY, empresa TEXT NOT NULL DEFAULT '', dados_auto TEXT NOT NULL, fila TEXT NOT NULL,
+            relatorio TEXT NOT NULL, criada_em REAL NOT NULL, atualizada_em REAL NOT NULL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS rascunhos (
+            analise_id TEXT NOT NULL, exigencia TEXT NOT NULL, resposta TEXT NOT NULL, modo TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (analise_id, exigencia))""")
+        # Arquivos de antes do modo por rascunho ganham a coluna vazia
+        if "modo" not in {coluna[1] for coluna in self._db.execute("PRAGMA table_info(rascunhos)")}:
+            self._db.execute("ALTER TABLE rascunhos ADD COLUMN modo TEXT NOT NULL DEFAULT ''")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS extracoes (
+            hash_pdf TEXT NOT NULL, tipo TEXT NOT NULL, resultado TEXT NOT NULL, criada_em REAL NOT NULL,
+            PRIMARY KEY (hash_pdf, tipo))""")
+        self._db.commit()
+
+    def carregar(self, analise_id):
+        """
+        {dados_auto, fila, relatorio, rascunhos, modos} da análise; estado vazio se ela ainda
+        não foi salva. modos diz com que profundidade cada rascunho foi gerado.
+        """
+        with self._trava:
+            linha = self._db.execute("SELECT dados_auto, fila, relatorio FROM analises WHERE id = ?", (analise_id,)).fetchone()
+            linhas = self._db.execute("SELECT exigencia, resposta, modo FROM rascunhos WHERE analise_id = ?", (analise_id,)).fetchall()
+        rascunhos = {exigencia: resposta for exigencia, resposta, _ in linhas}
+        modos = {exigencia: modo for exigencia, _, modo in linhas if modo}
+        if linha is None:
+            return {"dados_auto": dados_vazios(), "fila": [], "relatorio": [], "rascunhos": rascunhos, "modos": modos}
+        dados_auto, fila, relatorio = (json.loads(campo) for campo in linha)
+        return {"dados_auto": {**dados_vazios(), **dados_auto}, "fila": fila, "relatorio": relatorio,
+                "rascunhos": rascunhos, "modos": modos}
+
+    def salvar(self, analise_id, dados_auto=None, fila=None, relatorio=None):
+        """Grava apenas os campos informados; a análise é criada na primeira gravação."""
+        agora = time.time()
+        campos = {nome: json.dumps(valor, ensure_ascii=False)
+                  for nome, valor in (("dados_auto", dados_auto), ("fila", fila), ("relatorio", relatorio)) if valor is not None}
+        if dados_auto is not None: campos["empresa"] = str(dados_auto.get("empresa", "")).strip()
+        with self._trava:
+            self._db.execute("INSERT OR IGNORE INTO analises (id, dados_auto, fila, relatorio, criada_em, atualizada_em) "
+                             "VALUES (?, ?, '[]', '[]', ?, ?)", (analise_id, json.dumps(dados_vazios()), agora, agora))
+            atribuicoes = ", ".join(f"{nome} = ?" for nome in campos)
+            self._db.execute(f"UPDATE analises SET {atribuicoes + ', ' if atribuicoes else ''}atualizada_em = ? WHERE id = ?",
+                             (*campos.values(), agora, analise_id))
+            self._db.commit()
+
+    def guardar_rascunho(self, analise_id, exigencia, resposta, modo=""):
+        with self._trava:
+            self._db.execute("INSERT OR REPLACE INTO rascunhos (analise_id, exigencia, resposta, modo) VALUES (?, ?, ?, ?)",
+                             (analise_id, exigencia, resposta, modo))
+            self._db.execute("UPDATE analises SET atualizada_em = ? WHERE id = ?", (time.time(), analise_id))
+            self._db.commit()
+
+    def remover_rascunho(self, analise_id, exigencia):
+        with self._trava:
+            self._db.execute("DELETE FROM rascunhos WHERE analise_id = ? AND exigencia = ?", (analise_id, exigencia))
+            self._db.commit()
+
+    def limpar_rascunhos(self, analise_id):
+        with self._trava:
+            self._db.execute("DELETE FROM rascunhos WHERE analise_id = ?", (analise_id,))
+            self._db.commit()
+
+    def recentes(self, ids, limite=MAX_ANALISES_RECENTES):
+        """
+        [{id, empresa, atualizada_em, na_fila, aprovados}] das análises mexidas por último,
+        só entre os ids informados (as que o próprio usuário abriu): o arquivo é de todos.
+        """
+        ids = list(ids)
+        if not ids: return []
+        with self._trava:
+            linhas = self._db.execute(f"SELECT id, empresa, atualizada_em, fila, relatorio FROM analises "
+                                      f"WHERE id IN ({', '.join('?' * len(ids))}) ORDER BY atualizada_em DESC LIMIT ?",
+                                      (*ids, limite)).fetchall()
+        return [{"id": id_, "empresa": empresa, "atualizada_em": atualizada_em,
+                 "na_fila": len(json.loads(fila)), "aprovados": len(json.loads(relatorio))}
+                for id_, empresa, atualizada_em, fila, relatorio in linhas]
+
+    # --- EXTRAÇÕES JÁ PAGAS (MESMO PDF NÃO VOLTA AO LLM) ---
+
+    def extracao(self, hash_pdf, tipo):
+        with self._trava:
+            linha = self._db.execute("SELECT resultado FROM extracoes WHERE hash_pdf = ? AND tipo = ?",
+                                     (hash_pdf, _tipo_versionado(tipo))).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def guardar_extracao(self, hash_pdf, tipo, resultado):
+        with self._trava:
+            self._db.execute("INSERT OR REPLACE INTO extracoes (hash_pdf, tipo, resultado, criada_em) VALUES (?, ?, ?, ?)",
+                             (hash_pdf, _tipo_versionado(tipo), json.dumps(resultado, ensure_ascii=False), time.time()))
+            self._db.commit()
+
+### FIM DO ARMAZÉM DE ANÁLISES ###
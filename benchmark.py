@@ -0,0 +1,254 @@
+### BENCHMARK OFFLINE: INGESTÃO, TAMANHO DO ÍNDICE, LATÊNCIA E ACERTO DA BUSCA ###
+#
+# Uso:  python benchmark.py [--tamanho-pedaco 1000] [--sobreposicao 200] [--modelo all-MiniLM-L6-v2] [--k 3]
+#                           [--backend torch|onnx|onnx-int8] [--divisao estrutural|recursiva]
+#                           [--comparar benchmarks/anterior.json]
+#
+# Indexa a pasta pdfs_cetesb num banco temporário (o banco_chroma de produção não é tocado),
+# roda as exigências rotuladas de benchmark_pares.json e grava o resultado em benchmarks/*.json.
+# O LLM é um modelo falso local: nada sai para a rede além do download inicial do modelo de embeddings.
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+import indexador
+import busca_hibrida
+import metricas
+from indexador import PASTA_DOCUMENTOS, sincronizar_cerebro
+from busca_hibrida import IndiceLexical, buscar_hibrido
+from orcamento_contexto import montar_contexto, CANDIDATOS_CONTEXTO
+from motor_embeddings import MODELO_EMBEDDINGS, MotorEmbeddings, BACKEND_EMBEDDINGS, BACKENDS_EMBEDDINGS
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_PARES = "benchmark_pares.json"
+PASTA_RESULTADOS = "benchmarks"
+REPETICOES_LATENCIA = 3  # a 1ª passada pega o embedding da consulta frio; as outras, o LRU quente
+
+TEMPLATE_FALSO = """Contexto: {context}
+
+Exigência: {question}
+
+Resposta:"""
+
+# --- PARES ROTULADOS (EXIGÊNCIA -> MARCADORES DO TRECHO CERTO) ---
+
+def carregar_pares(arquivo=ARQUIVO_PARES):
+    """
+    Conjunto fixo versionado junto com o código: exigências reescritas com outras palavras
+    (uma cópia literal do corpus favoreceria o BM25) e, para cada uma, os marcadores que
+    um trecho recuperado precisa conter para contar como acerto. Como o corpus repete os
+    mesmos temas em vários arquivos, o acerto não depende de arquivo/página nem do splitter.
+    Pares escritos à mão também podem apontar {"arquivo", "pagina"}.
+    """
+    if not os.path.exists(arquivo): raise SystemExit(f"Conjunto de pares '{arquivo}' não encontrado.")
+    with open(arquivo, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# --- MEDIÇÕES ---
+
+def _distribuicao(segundos):
+    if not segundos: return {}
+    ordenados = sorted(segundos)
+    return {
+        "n": len(ordenados),
+        "media_ms": round(statistics.fmean(ordenados) * 1000, 2),
+        "p50_ms": round(metricas.percentil(ordenados, 50) * 1000, 2),
+        "p95_ms": round(metricas.percentil(ordenados, 95) * 1000, 2),
+        "p99_ms": round(metricas.percentil(ordenados, 99) * 1000, 2),
+        "max_ms": round(ordenados[-1] * 1000, 2),
+    }
+
+def _tamanho_pasta(pasta):
+    total = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        total += sum(os.path.getsize(os.path.join(raiz, a)) for a in arquivos)
+    return total
+
+def _origem(doc, pasta):
+    fonte = doc.metadata.get("source", "")
+    relativo = os.path.relpath(fonte, pasta).replace(os.sep, "/") if fonte else ""
+    return relativo, doc.metadata.get("page")
+
+def _relevante(doc, par, pasta):
+    if "marcadores" in par:
+        return all(re.search(marcador, doc.page_content, re.IGNORECASE) for marcador in par["marcadores"])
+    return _origem(doc, pasta) == (par["arquivo"], par["pagina"])
+
+def avaliar_recuperacao(pares, vectorstore, indice_lexical, pasta, k):
+    """hit@k e MRR: posição do primeiro trecho relevante entre os k recuperados."""
+    acertos, reciprocos = 0, []
+    latencias = [[] for _ in range(REPETICOES_LATENCIA)]
+    vectorstore.embeddings.limpar_cache_consultas()
+    for par in pares:
+        for passada in range(REPETICOES_LATENCIA):
+            inicio = time.perf_counter()
+            docs = buscar_hibrido(par["exigencia"], vectorstore, indice_lexical, k=k)
+            latencias[passada].append(time.perf_counter() - inicio)
+        posicao = next((n for n, d in enumerate(docs, 1) if _relevante(d, par, pasta)), None)
+        if posicao: acertos += 1
+        reciprocos.append(1 / posicao if posicao else 0.0)
+    return {
+        "hit_rate": round(acertos / len(pares), 4) if pares else None,
+        "mrr": round(statistics.fmean(reciprocos), 4) if reciprocos else None,
+        "latencia_fria": _distribuicao(latencias[0]),
+        "latencia_quente": _distribuicao([s for passada in latencias[1:] for s in passada]),
+    }
+
+def medir_consulta_completa(pares, vectorstore, indice_lexical, k):
+    """Busca + orçamento de contexto + prompt + LLM falso local: o custo do pipeline sem a rede do Groq."""
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    chain = ChatPromptTemplate.from_template(TEMPLATE_FALSO) | FakeListChatModel(responses=["Resposta simulada."])
+    latencias, tokens = [], []
+    for par in pares:
+        inicio = time.perf_counter()
+        with metricas.operacao("consultar_ia"):
+            docs = buscar_hibrido(par["exigencia"], vectorstore, indice_lexical, k=max(k, CANDIDATOS_CONTEXTO))
+            contexto, relatorio = montar_contexto(docs, par["exigencia"])
+            tokens.append(relatorio["tokens"])
+            with metricas.medir("llm_falso"):
+                chain.invoke({"context": contexto, "question": par["exigencia"]})
+        latencias.append(time.perf_counter() - inicio)
+    return {**_distribuicao(latencias), "tokens_contexto_medio": round(statistics.fmean(tokens)) if tokens else None}
+
+# --- EXECUÇÃO ---
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def rodar_benchmark(pasta=PASTA_DOCUMENTOS, modelo=MODELO_EMBEDDINGS, tamanho_pedaco=indexador.TAMANHO_PEDACO,
+                    sobreposicao=indexador.SOBREPOSICAO_PEDACO, k=busca_hibrida.K_BUSCA, processos=None, manter_banco=False,
+                    backend=BACKEND_EMBEDDINGS, divisao=indexador.DIVISAO):
+    pares = carregar_pares()
+    raiz = tempfile.mkdtemp(prefix="benchmark_")
+    banco = os.path.join(raiz, "banco")
+    # O splitter é lido do indexador na hora da divisão; o original volta no fim
+    divisao_original = (indexador.TAMANHO_PEDACO, indexador.SOBREPOSICAO_PEDACO, indexador.DIVISAO)
+    indexador.TAMANHO_PEDACO, indexador.SOBREPOSICAO_PEDACO, indexador.DIVISAO = tamanho_pedaco, sobreposicao, divisao
+    try:
+        with metricas.gravando_em(os.path.join(raiz, "metricas.sqlite")):
+            # Sem cache de embeddings: toda execução codifica o corpus inteiro e os números são comparáveis
+            inicio = time.perf_counter()
+            embedding_function = MotorEmbeddings(modelo=modelo, threads=os.cpu_count(), arquivo_cache=None, backend=backend)
+            segundos_modelo = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            vectorstore, resumo = sincronizar_cerebro(pasta, banco, embedding_function, processos)
+            segundos_total = time.perf_counter() - inicio
+            paginas = sum(r["paginas"] for r in resumo["ingestao"])
+            indice_lexical = IndiceLexical.abrir(banco)
+            tamanho_lexical = _tamanho_pasta(os.path.join(banco, busca_hibrida.PASTA_INDICE_LEXICAL))
+
+            resultado = {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "commit": _commit_atual(),
+                "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+                "configuracao": {
+                    "modelo": modelo, "backend": backend, "divisao": divisao, "deduplicar": indexador.DEDUPLICAR,
+                    "tamanho_pedaco": tamanho_pedaco, "sobreposicao": sobreposicao, "k": k,
+                    "peso_vetorial": busca_hibrida.PESO_VETORIAL, "peso_lexical": busca_hibrida.PESO_LEXICAL,
+                    "pares": len(pares),
+                },
+                "ingestao": {
+                    "arquivos": len(resumo["ingestao"]),
+                    "falhas": len(resumo["falhas"]),
+                    "paginas": paginas,
+                    "pedacos": resumo["total_pedacos"],
+                    "pedacos_duplicados": resumo["pedacos_duplicados"],
+                    "segundos_carga_modelo": round(segundos_modelo, 3),
+                    "segundos_leitura": resumo["segundos_ingestao"],
+                    "segundos_total": round(segundos_total, 3),
+                    "paginas_por_segundo": round(paginas / segundos_total, 2) if segundos_total else None,
+                    "pedacos_por_segundo": round(resumo["total_pedacos"] / segundos_total, 2) if segundos_total else None,
+                },
+                "disco": {
+                    "bytes_total": _tamanho_pasta(banco),
+                    "bytes_indice_lexical": tamanho_lexical,
+                },
+                "busca_hibrida": avaliar_recuperacao(pares, vectorstore, indice_lexical, pasta, k),
+                "busca_vetorial": avaliar_recuperacao(pares, vectorstore, None, pasta, k),
+                "consulta_completa_llm_falso": medir_consulta_completa(pares, vectorstore, indice_lexical, k),
+            }
+            # Quebra por etapa das mesmas medições que o painel do app mostra
+            resultado["etapas"] = metricas.registro().resumo()
+            return resultado
+    finally:
+        indexador.TAMANHO_PEDACO, indexador.SOBREPOSICAO_PEDACO, indexador.DIVISAO = divisao_original
+        if manter_banco:
+            print(f"Banco do benchmark mantido em '{banco}'.")
+        else:
+            shutil.rmtree(raiz, ignore_errors=True)
+
+def salvar_resultado(resultado, pasta=PASTA_RESULTADOS):
+    os.makedirs(pasta, exist_ok=True)
+    nome = f"{datetime.now():%Y%m%d-%H%M%S}-{resultado['commit'] or 'sem-git'}.json"
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    return caminho
+
+def comparar(atual, anterior):
+    """Imprime a variação dos principais números em relação a uma execução anterior."""
+    chaves = [("ingestao", "paginas_por_segundo"), ("ingestao", "pedacos_por_segundo"), ("disco", "bytes_total"),
+              ("busca_hibrida", "hit_rate"), ("busca_hibrida", "mrr"), ("busca_vetorial", "hit_rate")]
+    print(f"\n--- COMPARAÇÃO COM {anterior.get('data')} ({anterior.get('commit')}) ---")
+    for secao, chave in chaves:
+        novo, velho = atual.get(secao, {}).get(chave), anterior.get(secao, {}).get(chave)
+        if novo is None or velho is None: continue
+        variacao = f" ({(novo - velho) / velho:+.1%})" if velho else ""
+        print(f"{secao}.{chave}: {velho} -> {novo}{variacao}")
+    for secao in ("latencia_fria", "latencia_quente"):
+        novo = atual["busca_hibrida"].get(secao, {}).get("p95_ms")
+        velho = anterior.get("busca_hibrida", {}).get(secao, {}).get("p95_ms")
+        if novo is not None and velho is not None:
+            print(f"busca_hibrida.{secao}.p95_ms: {velho} -> {novo}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline da ingestão e da busca sobre pdfs_cetesb.")
+    parser.add_argument("--pasta", default=PASTA_DOCUMENTOS)
+    parser.add_argument("--modelo", default=MODELO_EMBEDDINGS)
+    parser.add_argument("--tamanho-pedaco", type=int, default=indexador.TAMANHO_PEDACO)
+    parser.add_argument("--sobreposicao", type=int, default=indexador.SOBREPOSICAO_PEDACO)
+    parser.add_argument("--k", type=int, default=busca_hibrida.K_BUSCA)
+    parser.add_argument("--backend", choices=BACKENDS_EMBEDDINGS, default=BACKEND_EMBEDDINGS)
+    parser.add_argument("--divisao", choices=["estrutural", "recursiva"], default=indexador.DIVISAO)
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para mostrar a variação")
+    parser.add_argument("--manter-banco", action="store_true", help="não apaga o banco temporário ao final")
+    args = parser.parse_args(argv)
+
+    print("--- INICIANDO BENCHMARK ---")
+    resultado = rodar_benchmark(args.pasta, args.modelo, args.tamanho_pedaco, args.sobreposicao, args.k,
+                                args.processos, args.manter_banco, args.backend, args.divisao)
+    caminho = salvar_resultado(resultado)
+    ingestao, hibrida = resultado["ingestao"], resultado["busca_hibrida"]
+    print(f"\n✅ Ingestão: {ingestao['paginas']} páginas, {ingestao['pedacos']} pedaços em {ingestao['segundos_total']}s "
+          f"({ingestao['paginas_por_segundo']} pág/s, {ingestao['pedacos_por_segundo']} pedaços/s)")
+    print(f"✅ Disco: {resultado['disco']['bytes_total'] / 1e6:.1f} MB")
+    print(f"✅ Busca híbrida: hit@{args.k} {hibrida['hit_rate']} | MRR {hibrida['mrr']} | "
+          f"p50 {hibrida['latencia_quente'].get('p50_ms')} ms | p95 {hibrida['latencia_quente'].get('p95_ms')} ms")
+    print(f"✅ Só vetorial: hit@{args.k} {resultado['busca_vetorial']['hit_rate']}")
+    print(f"\nResultado gravado em '{caminho}'.")
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
+
+### FIM DO BENCHMARK ###
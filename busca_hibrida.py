@@ -0,0 +1,154 @@
+### BUSCA HÍBRIDA: ÍNDICE BM25 PERSISTENTE + VETORES DO CHROMA ###
+
+import os
+import json
+import math
+import hashlib
+from collections import Counter
+import numpy as np
+from langchain_core.documents import Document
+from metricas import medir
+from tokenizacao import tokenizar
+
+# --- CONFIGURAÇÃO ---
+PASTA_INDICE_LEXICAL = "bm25"  # dentro do banco do Chroma
+K_BUSCA = 3
+PESO_VETORIAL = 1.0
+PESO_LEXICAL = 1.0
+CANDIDATOS_POR_BUSCA = 12  # quantos resultados cada busca traz para a fusão
+CONSTANTE_RRF = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def assinatura_ids(ids):
+    """Identifica um conjunto de pedaços; muda sempre que o banco ganha ou perde pedaços."""
+    h = hashlib.sha1()
+    for i in sorted(ids): h.update(i.encode("utf-8") + b"\n")
+    return h.hexdigest()
+
+# --- CONSTRUÇÃO E PERSISTÊNCIA ---
+
+def construir_indice_lexical(ids, textos, banco, assinatura):
+    """Grava o índice invertido em arrays .npy (lidos depois via memmap) + vocabulário JSON."""
+    pasta = os.path.join(banco, PASTA_INDICE_LEXICAL)
+    os.makedirs(pasta, exist_ok=True)
+    postings = {}
+    tamanhos = np.zeros(len(textos), dtype=np.int32)
+    for n, texto in enumerate(textos):
+        contagem = Counter(tokenizar(texto))
+        tamanhos[n] = sum(contagem.values())
+        for termo, tf in contagem.items():
+            postings.setdefault(termo, []).append((n, tf))
+
+    vocabulario, docs, tfs, deslocamento = {}, [], [], 0
+    for termo in sorted(postings):
+        lista = postings[termo]
+        vocabulario[termo] = [deslocamento, len(lista)]
+        docs.extend(n for n, _ in lista); tfs.extend(tf for _, tf in lista)
+        deslocamento += len(lista)
+
+    arrays = {
+        "docs.npy": np.asarray(docs, dtype=np.int32),
+        "tfs.npy": np.asarray(tfs, dtype=np.float32),
+        "tamanhos.npy": tamanhos,
+    }
+    for nome, array in arrays.items():
+        with open(os.path.join(pasta, nome + ".tmp"), "wb") as f: np.save(f, array)
+        os.replace(os.path.join(pasta, nome + ".tmp"), os.path.join(pasta, nome))
+    _gravar_json(os.path.join(pasta, "vocabulario.json"), vocabulario)
+    _gravar_json(os.path.join(pasta, "ids.json"), list(ids))
+    # O meta vai por último: enquanto não existir com a assinatura nova, o índice é tratado como velho
+    _gravar_json(os.path.join(pasta, "meta.json"), {"assinatura": assinatura, "total": len(textos)})
+
+def _gravar_json(caminho, dados):
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f: json.dump(dados, f, ensure_ascii=False)
+    os.replace(caminho + ".tmp", caminho)
+
+def sincronizar_indice_lexical(vectorstore, banco, assinatura):
+    """Reconstrói o BM25 a partir dos pedaços do Chroma se a assinatura mudou."""
+    if ler_assinatura_indice(banco) == assinatura: return False
+    conteudo = vectorstore.get(include=["documents"])
+    construir_indice_lexical(conteudo["ids"], conteudo["documents"], banco, assinatura)
+    return True
+
+def ler_assinatura_indice(banco):
+    try:
+        with open(os.path.join(banco, PASTA_INDICE_LEXICAL, "meta.json"), encoding="utf-8") as f:
+            return json.load(f).get("assinatura")
+    except (OSError, ValueError):
+        return None
+
+class IndiceLexical:
+    """Índice BM25 carregado com memmap: abrir é instantâneo, as páginas vêm do disco sob demanda."""
+
+    def __init__(self, banco):
+        pasta = os.path.join(banco, PASTA_INDICE_LEXICAL)
+        with open(os.path.join(pasta, "meta.json"), encoding="utf-8") as f: self.assinatura = json.load(f)["assinatura"]
+        with open(os.path.join(pasta, "vocabulario.json"), encoding="utf-8") as f: self.vocabulario = json.load(f)
+        with open(os.path.join(pasta, "ids.json"), encoding="utf-8") as f: self.ids = json.load(f)
+        self.docs = np.load(os.path.join(pasta, "docs.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(pasta, "tfs.npy"), mmap_mode="r")
+        self.tamanhos = np.load(os.path.join(pasta, "tamanhos.npy"), mmap_mode="r")
+        self.media_tamanho = float(self.tamanhos.mean()) if len(self.tamanhos) else 0.0
+
+    @classmethod
+    def abrir(cls, banco):
+        """Retorna None se o índice não existir (a busca cai para só vetorial)."""
+        try:
+            return cls(banco)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def buscar(self, consulta, k=CANDIDATOS_POR_BUSCA):
+        """Retorna [(id_do_pedaco, score)] ordenado pelo BM25."""
+        total = len(self.ids)
+        if not total: return []
+        scores = np.zeros(total, dtype=np.float32)
+        for termo in set(tokenizar(consulta)):
+            if termo not in self.vocabulario: continue
+            inicio, df = self.vocabulario[termo]
+            docs = self.docs[inicio:inicio + df]
+            tfs = self.tfs[inicio:inicio + df]
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            norma = BM25_K1 * (1 - BM25_B + BM25_B * self.tamanhos[docs] / (self.media_tamanho or 1.0))
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norma)
+        k = min(k, total)
+        melhores = np.argpartition(-scores, k - 1)[:k]
+        melhores = melhores[np.argsort(-scores[melhores])]
+        return [(self.ids[i], float(scores[i])) for i in melhores if scores[i] > 0]
+
+# --- FUSÃO ---
+
+def buscar_hibrido(consulta, vectorstore, indice_lexical=None, k=K_BUSCA,
+                   peso_vetorial=PESO_VETORIAL, peso_lexical=PESO_LEXICAL, candidatos=CANDIDATOS_POR_BUSCA):
+    """
+    Junta os resultados do Chroma e do BM25 por Reciprocal Rank Fusion ponderada.
+    Sem índice lexical (ou com peso_lexical=0) equivale ao similarity_search puro.
+    """
+    # Embedding da consulta (com o LRU do motor) e busca no Chroma medidos separadamente
+    with medir("embedding_consulta"):
+        vetor = vectorstore.embeddings.embed_query(consulta)
+    if indice_lexical is None or not peso_lexical:
+        with medir("busca_vetorial", k=k):
+            return vectorstore.similarity_search_by_vector(vetor, k=k)
+    pontuacao, documentos = {}, {}
+    with medir("busca_vetorial", k=candidatos):
+        vetoriais = vectorstore.similarity_search_by_vector(vetor, k=candidatos)
+    for rank, doc in enumerate(vetoriais):
+        pontuacao[doc.page_content] = pontuacao.get(doc.page_content, 0.0) + peso_vetorial / (CONSTANTE_RRF + rank + 1)
+        documentos.setdefault(doc.page_content, doc)
+    with medir("busca_lexical", k=candidatos):
+        lexicais = indice_lexical.buscar(consulta, candidatos)
+        encontrados = vectorstore.get(ids=[i for i, _ in lexicais], include=["documents", "metadatas"]) if lexicais else None
+    if lexicais:
+        por_id = {i: Document(page_content=t, metadata=m or {})
+                  for i, t, m in zip(encontrados["ids"], encontrados["documents"], encontrados["metadatas"])}
+        for rank, (id_pedaco, _) in enumerate(lexicais):
+            doc = por_id.get(id_pedaco)
+            if doc is None: continue
+            pontuacao[doc.page_content] = pontuacao.get(doc.page_content, 0.0) + peso_lexical / (CONSTANTE_RRF + rank + 1)
+            documentos.setdefault(doc.page_content, doc)
+    ordenados = sorted(pontuacao, key=pontuacao.get, reverse=True)[:k]
+    return [documentos[texto] for texto in ordenados]
+
+### FIM DA BUSCA HÍBRIDA ###
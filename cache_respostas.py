@@ -0,0 +1,118 @@
+### CACHE SEMÂNTICO DE RESPOSTAS APROVADAS ###
+
+import time
+import sqlite3
+import threading
+import numpy as np
+from array import array
+from motor_embeddings import normalizar
+from tokenizacao import tokenizar
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_CACHE_RESPOSTAS = "cache_respostas.sqlite"
+LIMIAR_SIMILARIDADE = 0.92  # cosseno mínimo para reaproveitar uma resposta aprovada
+MAX_RESPOSTAS_CACHE = 2000
+# Além do cosseno, números e siglas de norma precisam ser os mesmos nas duas exigências
+SIGLAS_NORMAS = {"nbr", "abnt", "nr", "iso", "conama", "cetesb", "lei", "decreto", "resolucao", "portaria"}
+
+def termos_exatos(exigencia):
+    """Números e siglas de norma: "NBR 10004" e "NBR 10151" ficam perto no embedding, mas não são a mesma exigência."""
+    return frozenset(t for t in tokenizar(exigencia) if t in SIGLAS_NORMAS or any(c.isdigit() for c in t))
+
+class CacheRespostas:
+    """
+    Respostas aprovadas em "APROVAR E SALVAR", indexadas pelo embedding da exigência,
+    pelo modo (curta/media/avancada) e pela versão da base de conhecimento.
+    Entradas de versões antigas da base são apagadas ao abrir o cache.
+    """
+
+    def __init__(self, embedding_function, versao_base, arquivo=ARQUIVO_CACHE_RESPOSTAS,
+                 limiar=LIMIAR_SIMILARIDADE, maximo=MAX_RESPOSTAS_CACHE):
+        self.embedding_function = embedding_function
+        self.versao_base = versao_base or ""
+        self.limiar = limiar
+        self.maximo = maximo
+        self._trava = threading.Lock()
+        self._db = sqlite3.connect(arquivo, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS respostas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, modo TEXT NOT NULL, versao_base TEXT NOT NULL,
+            exigencia TEXT NOT NULL, vetor BLOB NOT NULL, resposta TEXT NOT NULL, usado_em REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_respostas_modo ON respostas (versao_base, modo)")
+        # Base reconstruída: respostas antigas podem citar um gabarito que não existe mais
+        self._db.execute("DELETE FROM respostas WHERE versao_base != ?", (self.versao_base,))
+        self._db.commit()
+        self._vetores = {}  # modo -> (ids, matriz normalizada, termos exatos), carregado sob demanda
+
+    def _carregar_modo(self, modo):
+        if modo not in self._vetores:
+            linhas = self._db.execute("SELECT id, vetor, exigencia FROM respostas WHERE versao_base = ? AND modo = ?",
+                                      (self.versao_base, modo)).fetchall()
+            matriz = normalizar([np.frombuffer(vetor, dtype=np.float32) for _, vetor, _ in linhas]) if linhas else None
+            self._vetores[modo] = ([id_ for id_, _, _ in linhas], matriz, [termos_exatos(e) for _, _, e in linhas])
+        return self._vetores[modo]
+
+    def _mais_parecida(self, vetor, modo, termos):
+        """
+        (id, similaridade) da aprovação mais parecida do modo acima do limiar e com os mesmos
+        termos exatos, ou (None, 0.0). Um único produto matriz-vetor.
+        """
+        ids, matriz, termos_linhas = self._carregar_modo(modo)
+        if not ids: return None, 0.0
+        similaridades = matriz @ normalizar([vetor])[0]
+        acima = np.flatnonzero(similaridades >= self.limiar)
+        for n in acima[np.argsort(-similaridades[acima])]:
+            if termos_linhas[n] == termos: return ids[n], float(similaridades[n])
+        return None, 0.0
+
+    def buscar(self, exigencia, modo):
+        """Retorna (resposta, similaridade) da aprovação mais parecida acima do limiar, ou None."""
+        vetor = self.embedding_function.embed_query(exigencia)
+        with self._trava:
+            melhor_id, melhor = self._mais_parecida(vetor, modo, termos_exatos(exigencia))
+            if melhor_id is None: return None
+            resposta, = self._db.execute("SELECT resposta FROM respostas WHERE id = ?", (melhor_id,)).fetchone()
+            self._db.execute("UPDATE respostas SET usado_em = ? WHERE id = ?", (time.time(), melhor_id))
+            self._db.commit()
+        return resposta, melhor
+
+    def guardar(self, exigencia, modo, resposta):
+        """
+        Grava a aprovação. A mesma exigência no mesmo modo é atualizada no lugar, e uma
+        resposta que já veio do cache (aprovada sem mudança) só renova o uso.
+        """
+        vetor = self.embedding_function.embed_query(exigencia)
+        agora = time.time()
+        with self._trava:
+            melhor_id, _ = self._mais_parecida(vetor, modo, termos_exatos(exigencia))
+            if melhor_id is not None:
+                anterior, = self._db.execute("SELECT resposta FROM respostas WHERE id = ?", (melhor_id,)).fetchone()
+                if anterior == resposta:
+                    self._db.execute("UPDATE respostas SET usado_em = ? WHERE id = ?", (agora, melhor_id))
+                    self._db.commit()
+                    return
+            existente = self._db.execute("SELECT id FROM respostas WHERE versao_base = ? AND modo = ? AND exigencia = ?",
+                                         (self.versao_base, modo, exigencia)).fetchone()
+            if existente:
+                self._db.execute("UPDATE respostas SET resposta = ?, usado_em = ? WHERE id = ?", (resposta, agora, existente[0]))
+                self._db.commit()
+                return
+            cursor = self._db.execute(
+                "INSERT INTO respostas (modo, versao_base, exigencia, vetor, resposta, usado_em) VALUES (?, ?, ?, ?, ?, ?)",
+                (modo, self.versao_base, exigencia, array("f", vetor).tobytes(), resposta, agora))
+            ids, matriz, termos = self._carregar_modo(modo)
+            novo = normalizar([vetor])
+            self._vetores[modo] = (ids + [cursor.lastrowid], novo if matriz is None else np.vstack([matriz, novo]),
+                                   termos + [termos_exatos(exigencia)])
+            # Despejo LRU: mantém só as `maximo` respostas usadas mais recentemente
+            excedentes = [id_ for id_, in self._db.execute(
+                "SELECT id FROM respostas ORDER BY usado_em DESC LIMIT -1 OFFSET ?", (self.maximo,))]
+            if excedentes:
+                self._db.executemany("DELETE FROM respostas WHERE id = ?", [(i,) for i in excedentes])
+                removidos = set(excedentes)
+                for m, (ids, matriz, termos) in list(self._vetores.items()):
+                    if matriz is None: continue
+                    manter = [n for n, i in enumerate(ids) if i not in removidos]
+                    self._vetores[m] = ([ids[n] for n in manter], matriz[manter], [termos[n] for n in manter])
+            self._db.commit()
+
+### FIM DO CACHE SEMÂNTICO ###
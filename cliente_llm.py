@@ -0,0 +1,136 @@
+### POOL COMPARTILHADO DE CLIENTES LLM (GROQ) ###
+
+import time
+import random
+import hashlib
+import threading
+from contextlib import closing
+from collections import OrderedDict
+from metricas import medir, registro, tokens_da_resposta
+
+# --- CONFIGURAÇÃO ---
+MODELO_LLM = "llama-3.1-8b-instant"
+LIMITE_CONCORRENCIA_GLOBAL = 8  # chamadas simultâneas ao Groq somando todos os usuários do servidor
+REQUISICOES_POR_MINUTO = 30
+RAJADA = 5  # quantas requisições podem sair juntas antes do espaçamento valer
+MAX_TENTATIVAS_LLM = 5
+MAX_CHAINS = 64  # chains prontos guardados (LRU); cada template/modo/temperatura/chave gera um
+
+def eh_limite_de_taxa(erro):
+    if getattr(erro, "status_code", None) == 429: return True
+    texto = str(erro).lower()
+    return "429" in texto or "rate limit" in texto or "rate_limit" in texto
+
+def espera_retry(erro, tentativa):
+    """Respeita o Retry-After do Groq quando existir; senão, backoff exponencial com jitter."""
+    resposta = getattr(erro, "response", None)
+    try:
+        return float(resposta.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return min(30.0, 2 ** tentativa) + random.uniform(0, 1)
+
+class LimitadorTaxa:
+    """Limite de requisições por minuto (GCRA, com rajada) compartilhado entre threads."""
+
+    def __init__(self, por_minuto=REQUISICOES_POR_MINUTO, rajada=RAJADA):
+        self.intervalo = 60.0 / por_minuto
+        self.rajada = rajada
+        self._tat = 0.0
+        self._pausa_ate = 0.0
+        self._trava = threading.Lock()
+
+    def aguardar_vez(self):
+        with self._trava:
+            agora = time.monotonic()
+            novo_tat = max(self._tat, agora) + self.intervalo
+            vez = max(agora, novo_tat - self.rajada * self.intervalo, self._pausa_ate)
+            self._tat = novo_tat
+        if vez > agora: time.sleep(vez - agora)
+
+    def pausar(self, segundos):
+        """Depois de um 429, segura todo mundo em vez de cada usuário bater no limite de novo."""
+        with self._trava:
+            self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+
+class PoolLLM:
+    """
+    Um ChatGroq por (modelo, temperatura, chave) reaproveitado por todo o processo,
+    o que mantém as conexões HTTP/TLS abertas, e um chain pronto por template (os
+    `max_chains` usados mais recentemente). Toda chamada passa pelo limite global de
+    concorrência e de taxa.
+    """
+
+    def __init__(self, limite=LIMITE_CONCORRENCIA_GLOBAL, por_minuto=REQUISICOES_POR_MINUTO, max_chains=MAX_CHAINS):
+        self._clientes = {}
+        self._chains = OrderedDict()
+        self.max_chains = max_chains
+        self._trava = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(limite)
+        self.limitador = LimitadorTaxa(por_minuto)
+
+    def cliente(self, api_key, modelo=MODELO_LLM, temperatura=0.0):
+        chave = (modelo, float(temperatura), hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+        with self._trava:
+            if chave not in self._clientes:
+                from langchain_groq import ChatGroq
+                self._clientes[chave] = ChatGroq(model=modelo, temperature=temperatura, api_key=api_key)
+            return chave, self._clientes[chave]
+
+    def chain(self, template, api_key, modelo=MODELO_LLM, temperatura=0.0):
+        chave_cliente, llm = self.cliente(api_key, modelo, temperatura)
+        with self._trava:
+            chave = (chave_cliente, template)
+            if chave in self._chains:
+                self._chains.move_to_end(chave)
+            else:
+                from langchain_core.prompts import ChatPromptTemplate
+                self._chains[chave] = ChatPromptTemplate.from_template(template) | llm
+                if len(self._chains) > self.max_chains: self._chains.popitem(last=False)
+            return self._chains[chave]
+
+    def invocar(self, chain, entrada):
+        """chain.invoke com vaga global, limite de taxa e retry em 429."""
+        for tentativa in range(MAX_TENTATIVAS_LLM):
+            self.limitador.aguardar_vez()
+            with self._vagas:
+                try:
+                    with medir("llm_total", tentativa=tentativa + 1) as span:
+                        resposta = chain.invoke(entrada)
+                        span["tokens_entrada"], span["tokens_saida"] = tokens_da_resposta(resposta)
+                    return resposta
+                except Exception as e:
+                    if not eh_limite_de_taxa(e) or tentativa == MAX_TENTATIVAS_LLM - 1: raise
+                    espera = espera_retry(e, tentativa)
+            self.limitador.pausar(espera)
+
+    def stream(self, chain, entrada):
+        """
+        chain.stream com as mesmas regras; só repete se o 429 vier antes do primeiro token.
+        A vaga fica presa enquanto o gerador está aberto: quem parar de consumir antes do
+        fim deve chamar .close() (ou usar contextlib.closing) para devolvê-la na hora.
+        """
+        for tentativa in range(MAX_TENTATIVAS_LLM):
+            self.limitador.aguardar_vez()
+            recebeu = False
+            with self._vagas:
+                try:
+                    with medir("llm_total", tentativa=tentativa + 1, stream=True) as span:
+                        inicio, acumulado = time.perf_counter(), None
+                        with closing(chain.stream(entrada)) as pedacos:
+                            for pedaco in pedacos:
+                                if not recebeu:
+                                    registro().gravar("llm_primeiro_token", time.perf_counter() - inicio)
+                                recebeu = True
+                                acumulado = pedaco if acumulado is None else acumulado + pedaco
+                                yield pedaco
+                        span["tokens_entrada"], span["tokens_saida"] = tokens_da_resposta(acumulado)
+                    return
+                except Exception as e:
+                    if recebeu or not eh_limite_de_taxa(e) or tentativa == MAX_TENTATIVAS_LLM - 1: raise
+                    espera = espera_retry(e, tentativa)
+            self.limitador.pausar(espera)
+
+# Instância única do processo: todas as sessões do Streamlit compartilham clientes e limites
+pool_llm = PoolLLM()
+
+### FIM DO POOL DE CLIENTES LLM ###
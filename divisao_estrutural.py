@@ -0,0 +1,160 @@
+### DIVISÃO POR ESTRUTURA (ITENS NUMERADOS / SEÇÕES) + DEDUPLICAÇÃO MINHASH ###
+
+import re
+import hashlib
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# --- CONFIGURAÇÃO ---
+TAMANHO_SHINGLE = 5  # palavras por shingle
+PERMUTACOES_MINHASH = 64
+FAIXAS_LSH = 16  # 16 faixas x 4 linhas: candidatos a partir de ~50% de semelhança
+LIMIAR_DUPLICATA = 0.9  # Jaccard estimado a partir do qual o pedaço é descartado
+SEMENTE_MINHASH = 1729
+TAMANHO_TITULO = 120
+VERSAO_DIVISAO = 2  # suba quando a regra de corte mudar: o banco é redividido na próxima sincronização
+
+# Começo de item: "1.", "1.1", "12)", "a)", "Art. 5º", "§ 2º", "IV -"
+PADRAO_ITEM = re.compile(
+    r"^\s*(?:(\d{1,2}(?:\.\d{1,2})+\.?|\d{1,2}[\.\)\-–])\s+\S|([a-z])\)\s+\S|(Art\.?\s*\d+\S*)|(§\s*\d+\S*)|([IVXL]{1,6})\s*[-–]\s+\S)")
+# Título de seção: linha curta em maiúsculas ("EXIGÊNCIAS TÉCNICAS") ou "CAPÍTULO/SEÇÃO/ANEXO/TÍTULO ..."
+PADRAO_SECAO = re.compile(r"^\s*(?:CAP[ÍI]TULO|SE[ÇC][ÃA]O|ANEXO|T[ÍI]TULO)\b", re.IGNORECASE)
+
+def _eh_titulo(linha):
+    texto = linha.strip()
+    if PADRAO_SECAO.match(texto): return True
+    letras = [c for c in texto if c.isalpha()]
+    # Maioria de letras evita confundir "CNPJ: 12.345.678/0001-90" com título
+    return (4 <= len(texto) <= 80 and len(letras) >= 4 and len(letras) >= 0.6 * len(texto.replace(" ", ""))
+            and all(c.isupper() for c in letras) and not texto.endswith("."))
+
+def _numero_item(linha):
+    achado = PADRAO_ITEM.match(linha)
+    if not achado: return None
+    return next(g for g in achado.groups() if g).rstrip(".)-–").strip()
+
+# --- BLOCOS ESTRUTURAIS ---
+
+def _blocos(documentos):
+    """
+    Percorre as páginas do arquivo em ordem e corta nos inícios de item e nos títulos.
+    Um item que continua na página seguinte fica inteiro no mesmo bloco.
+    Gera dicts {linhas, page, secao, item, titulo}.
+    """
+    secao, atual = "", None
+    for doc in documentos:
+        pagina = doc.metadata.get("page", 0)
+        for linha in doc.page_content.splitlines():
+            if not linha.strip(): continue
+            titulo, item = _eh_titulo(linha), _numero_item(linha)
+            if titulo or item or atual is None:
+                if atual: yield atual
+                if titulo: secao = linha.strip()[:TAMANHO_TITULO]
+                atual = {"linhas": [], "page": pagina, "secao": secao, "item": item or "", "titulo": titulo}
+            atual["linhas"].append(linha.strip())
+    if atual: yield atual
+
+def dividir_por_estrutura(documentos, tamanho, sobreposicao):
+    """
+    Junta blocos consecutivos da mesma seção em pedaços de até `tamanho` caracteres,
+    sem sobreposição entre eles. Só um bloco maior que o limite é cortado pelo
+    splitter recursivo (com `sobreposicao`); se ele vem logo depois do título da seção,
+    cada parte leva o título na frente em vez de o título virar um pedaço sozinho.
+    Metadados: source, page, secao, item.
+    """
+    if not documentos: return []
+    fonte = documentos[0].metadata.get("source", "")
+    divisor = RecursiveCharacterTextSplitter(chunk_size=tamanho, chunk_overlap=sobreposicao)
+    pedacos, grupo = [], []
+
+    def _fechar():
+        if not grupo: return
+        texto = "\n".join("\n".join(b["linhas"]) for b in grupo)
+        item = next((b["item"] for b in grupo if b["item"]), "")
+        pedacos.append(Document(page_content=texto, metadata={
+            "source": fonte, "page": grupo[0]["page"], "secao": grupo[0]["secao"], "item": item}))
+        grupo.clear()
+
+    for bloco in _blocos(documentos):
+        texto = "\n".join(bloco["linhas"])
+        tamanho_grupo = sum(len("\n".join(b["linhas"])) + 1 for b in grupo)
+        # Grupo com só o título da seção: vai na frente das partes do bloco seguinte, que precisa ser cortado
+        so_titulo = len(grupo) == 1 and grupo[0]["titulo"] and not bloco["titulo"] and bloco["secao"] == grupo[0]["secao"]
+        titulo = "\n".join(grupo[0]["linhas"]) + "\n" if so_titulo else ""
+        if len(titulo) >= tamanho - sobreposicao: titulo = ""  # título longo demais para repetir em cada parte
+        if len(texto) > tamanho or (titulo and tamanho_grupo + len(texto) > tamanho):
+            if titulo:
+                pagina = grupo[0]["page"]
+                grupo.clear()
+                partes = RecursiveCharacterTextSplitter(chunk_size=tamanho - len(titulo), chunk_overlap=sobreposicao).split_text(texto)
+            else:
+                pagina = bloco["page"]
+                _fechar()
+                partes = divisor.split_text(texto)
+            metadados = {"source": fonte, "page": pagina, "secao": bloco["secao"], "item": bloco["item"]}
+            pedacos.extend(Document(page_content=titulo + t, metadata=dict(metadados)) for t in partes)
+            continue
+        # Título novo abre pedaço novo: seções diferentes não se misturam
+        if grupo and (bloco["titulo"] or bloco["secao"] != grupo[0]["secao"] or tamanho_grupo + len(texto) > tamanho):
+            _fechar()
+        grupo.append(bloco)
+    _fechar()
+    return pedacos
+
+# --- DEDUPLICAÇÃO (MINHASH + LSH) ---
+
+_PRIMO = np.uint64((1 << 61) - 1)
+_aleatorio = np.random.RandomState(SEMENTE_MINHASH)
+_A = _aleatorio.randint(1, 2 ** 31 - 1, size=PERMUTACOES_MINHASH).astype(np.uint64)
+_B = _aleatorio.randint(0, 2 ** 31 - 1, size=PERMUTACOES_MINHASH).astype(np.uint64)
+
+def assinatura_minhash(texto):
+    """Assinatura MinHash dos shingles de palavras; None para textos curtos demais."""
+    palavras = re.findall(r"\w+", texto.lower())
+    if len(palavras) < TAMANHO_SHINGLE: return None
+    shingles = {" ".join(palavras[i:i + TAMANHO_SHINGLE]) for i in range(len(palavras) - TAMANHO_SHINGLE + 1)}
+    # Hash de 32 bits por shingle: a*h + b cabe em 64 bits sem estourar
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                          for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((np.outer(hashes, _A) + _B) % _PRIMO).min(axis=0)
+
+class DeduplicadorMinHash:
+    """Guarda as assinaturas dos pedaços mantidos e aponta quase-duplicatas por LSH."""
+
+    def __init__(self, limiar=LIMIAR_DUPLICATA, faixas=FAIXAS_LSH):
+        self.limiar = limiar
+        self.faixas = faixas
+        self.linhas = PERMUTACOES_MINHASH // faixas
+        self._assinaturas = []
+        self._baldes = {}
+
+    def _chaves(self, assinatura):
+        for f in range(self.faixas):
+            yield f, assinatura[f * self.linhas:(f + 1) * self.linhas].tobytes()
+
+    def duplicata(self, assinatura):
+        """Índice do pedaço já mantido de que este é quase cópia, ou None."""
+        if assinatura is None: return None
+        candidatos = {n for chave in self._chaves(assinatura) for n in self._baldes.get(chave, ())}
+        for n in candidatos:
+            if np.mean(self._assinaturas[n] == assinatura) >= self.limiar: return n
+        return None
+
+    def adicionar(self, assinatura):
+        if assinatura is None: return
+        n = len(self._assinaturas)
+        self._assinaturas.append(assinatura)
+        for chave in self._chaves(assinatura): self._baldes.setdefault(chave, []).append(n)
+
+    def filtrar(self, documentos):
+        """Mantém só os pedaços que não repetem algo já visto; os mantidos entram no índice."""
+        mantidos = []
+        for doc in documentos:
+            assinatura = assinatura_minhash(doc.page_content)
+            if self.duplicata(assinatura) is not None: continue
+            self.adicionar(assinatura)
+            mantidos.append(doc)
+        return mantidos
+
+### FIM DA DIVISÃO POR ESTRUTURA ###
@@ -0,0 +1,153 @@
+### PRÉ-EXTRAÇÃO DETERMINÍSTICA DOS DADOS CADASTRAIS (REGEX ANTES DO LLM) ###
+
+import re
+
+# --- CONFIGURAÇÃO ---
+CAMPOS = ("empresa", "cnpj", "endereco", "cidade")
+LIMIAR_CONFIANCA = 0.75  # abaixo disso o campo é pedido ao LLM
+CONFIANCA_ROTULO_FRACO = 0.5  # rótulos genéricos ("Interessado", "Nome"): o LLM confere
+
+RE_CNPJ = re.compile(r"(?<!\d)(\d{2})\.?(\d{3})\.?(\d{3})\s*/?\s*(\d{4})\s*-?\s*(\d{2})(?!\d)")
+RE_CEP = re.compile(r"(?<!\d)\d{2}\.?\d{3}-?\d{3}(?!\d)")
+RE_UF = re.compile(r"^(.+?)\s*[-/–]\s*([A-Z]{2})$")
+RE_SUFIXO_EMPRESA = re.compile(r"\b(LTDA|S/?A|S\.A\.?|EIRELI|ME|EPP|COOPERATIVA|IND[ÚU]STRIA|COM[ÉE]RCIO)\b", re.IGNORECASE)
+
+# Rótulos em ordem de preferência: os mais específicos primeiro
+ROTULOS = {
+    "empresa": [r"Raz[ãa]o\s+Social", r"Nome\s+Empresarial"],
+    "cnpj": [r"CNPJ(?:/CPF)?"],
+    "endereco": [r"Logradouro", r"Endere[çc]o"],
+    "cidade": [r"Munic[íi]pio", r"Cidade"],
+}
+# Também aparecem no texto corrido das licenças: o valor vale no máximo CONFIANCA_ROTULO_FRACO
+ROTULOS_FRACOS = {"empresa": [r"Interessad[oa]", r"Licenciad[oa]", r"Nome(?!\s+d[oa]\b)"]}
+_OUTROS_ROTULOS = r"N[úu]mero|Bairro|CEP|UF|Cadastro\s+na\s+CETESB|Inscri[çc][ãa]o|Complemento"
+_TODOS_ROTULOS = "|".join(r for grupo in (ROTULOS, ROTULOS_FRACOS) for rotulos in grupo.values() for r in rotulos)
+# Qualquer rótulo conhecido marca o fim do valor anterior na mesma linha
+RE_QUALQUER_ROTULO = re.compile(rf"\b(?:{_TODOS_ROTULOS}|{_OUTROS_ROTULOS})\b\s*[:\-–]?", re.IGNORECASE)
+# "Rótulo:" é o que separa os campos de uma linha de formulário ("Logradouro: ... Número: 120")
+RE_CAMPO = re.compile(rf"\b(?:{_TODOS_ROTULOS}|{_OUTROS_ROTULOS})\b\s*:", re.IGNORECASE)
+# Células de tabela: tab, barra vertical ou dois ou mais espaços
+RE_SEPARADOR_CELULAS = re.compile(r"\t|\s*\|\s*|\s{2,}")
+
+def cnpj_valido(digitos):
+    if len(digitos) != 14 or len(set(digitos)) == 1: return False
+    pesos = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    for posicao in (12, 13):
+        soma = sum(int(d) * p for d, p in zip(digitos[:posicao], pesos[-posicao:]))
+        resto = soma % 11
+        if int(digitos[posicao]) != (0 if resto < 2 else 11 - resto): return False
+    return True
+
+def _limpar(valor):
+    return re.sub(r"\s+", " ", valor).strip(" :;,-–\t")
+
+def _cortar_no_proximo_rotulo(valor):
+    m = RE_QUALQUER_ROTULO.search(valor)
+    return _limpar(valor[:m.start()] if m else valor)
+
+def _celulas(linha):
+    """
+    Divide a linha bruta em células. Uma célula que começa por "Rótulo:" é formulário:
+    cada "Rótulo:" seguinte abre outra célula.
+    """
+    celulas = []
+    for celula in RE_SEPARADOR_CELULAS.split(linha):
+        celula = re.sub(r"\s+", " ", celula).strip()
+        if not celula: continue
+        inicios = [m.start() for m in RE_CAMPO.finditer(celula)]
+        if not inicios or inicios[0] != 0:
+            celulas.append(celula); continue
+        celulas.extend(celula[a:b].strip() for a, b in zip(inicios, inicios[1:] + [None]))
+    return celulas
+
+def _valor_rotulado(linhas, rotulos):
+    """
+    Só vale rótulo no começo de uma linha ou célula. "Rótulo: valor" na mesma célula
+    dá 0.9; rótulo sozinho (cabeçalho de tabela) pega o valor da linha seguinte.
+    Rótulo no meio de uma frase ("empresa licenciada no SIGOR") não conta.
+    """
+    tabela = [_celulas(linha) for linha in linhas]
+    for rotulo in rotulos:
+        campo = re.compile(rf"(?:{rotulo})\b\s*:\s*(.*)", re.IGNORECASE)
+        so_rotulo = re.compile(rf"(?:{rotulo})\b\s*[:\-–]?", re.IGNORECASE)
+        for i, celulas in enumerate(tabela):
+            for coluna, celula in enumerate(celulas):
+                m = campo.match(celula)
+                if m and _cortar_no_proximo_rotulo(m.group(1)): return _cortar_no_proximo_rotulo(m.group(1)), 0.9
+                if not (m or so_rotulo.fullmatch(celula)): continue
+                proximas = [c for c in tabela[i + 1:i + 3] if c]
+                if not proximas or RE_QUALQUER_ROTULO.match(proximas[0][0]): continue
+                valores = proximas[0]
+                # Cabeçalho com um só rótulo é confiável; com vários, só se as colunas baterem
+                if len(celulas) == 1: return _limpar(" ".join(valores)), 0.8
+                if len(valores) == len(celulas): return _limpar(valores[coluna]), 0.8
+                return _limpar(" ".join(valores)), 0.6
+    return "", 0.0
+
+def _valor_com_rotulos_fracos(linhas, campo):
+    valor, confianca = _valor_rotulado(linhas, ROTULOS[campo])
+    if valor or campo not in ROTULOS_FRACOS: return valor, confianca
+    valor, confianca = _valor_rotulado(linhas, ROTULOS_FRACOS[campo])
+    return valor, min(confianca, CONFIANCA_ROTULO_FRACO)
+
+def extrair_cadastro_por_regex(texto):
+    """
+    Extrai EMPRESA/CNPJ/ENDERECO/CIDADE pelos padrões fixos das licenças CETESB.
+    Retorna (dados, confianca), com dados no mesmo formato de
+    extrair_dados_cadastrais_do_texto e confiança de 0 a 1 por campo.
+    """
+    dados = {campo: "" for campo in CAMPOS}
+    confianca = {campo: 0.0 for campo in CAMPOS}
+    linhas = texto.splitlines()
+
+    # CNPJ: máscara + dígitos verificadores
+    for m in RE_CNPJ.finditer(texto):
+        digitos = "".join(m.groups())
+        valido = cnpj_valido(digitos)
+        if valido or not dados["cnpj"]:
+            dados["cnpj"] = f"{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}"
+            confianca["cnpj"] = 0.99 if valido else 0.5
+        if valido: break
+
+    for campo in ("empresa", "endereco", "cidade"):
+        dados[campo], confianca[campo] = _valor_com_rotulos_fracos(linhas, campo)
+
+    # Empresa sem rótulo: linha com sufixo societário (LTDA, S/A...) perto do CNPJ
+    if not dados["empresa"]:
+        for linha in map(_limpar, linhas):
+            if RE_SUFIXO_EMPRESA.search(linha):
+                dados["empresa"], confianca["empresa"] = _limpar(RE_CNPJ.sub("", _cortar_no_proximo_rotulo(linha))), 0.6
+                break
+
+    # Endereço: agrega o número quando ele vem em rótulo separado
+    if dados["endereco"]:
+        numero, _ = _valor_rotulado(linhas, [r"N[úu]mero"])
+        if numero and numero not in dados["endereco"] and re.fullmatch(r"[\dA-Za-z/\-]{1,10}", numero):
+            dados["endereco"] = f"{dados['endereco']}, {numero}"
+
+    # Cidade no formato "Cidade - UF"; licenças CETESB são sempre de SP
+    if dados["cidade"]:
+        cidade = _limpar(RE_CEP.sub("", dados["cidade"]))
+        m = RE_UF.match(cidade)
+        if m:
+            cidade = f"{m.group(1)} - {m.group(2)}"
+        elif "CETESB" in texto.upper():
+            cidade = f"{cidade} - SP"
+        else:
+            confianca["cidade"] = min(confianca["cidade"], 0.6)
+        dados["cidade"] = cidade
+
+    for campo in CAMPOS:
+        if not dados[campo]: confianca[campo] = 0.0
+    return dados, confianca
+
+def campos_faltantes(confianca, limiar=LIMIAR_CONFIANCA):
+    return [campo for campo in CAMPOS if confianca.get(campo, 0.0) < limiar]
+
+def formatar_dados_cadastrais(dados):
+    """Mesmo formato de texto que o LLM devolve (lido por extrair_dados_cadastrais_do_texto)."""
+    # Campos vazios ficam de fora: "EMPRESA: " sem valor faria o parser engolir a linha seguinte
+    return "\n".join(f"{campo.upper()}: {dados[campo]}" for campo in CAMPOS if dados.get(campo))
+
+### FIM DA PRÉ-EXTRAÇÃO DETERMINÍSTICA ###
@@ -0,0 +1,76 @@
+### EXTRAÇÃO DE TEXTO DE PDF COM CACHE (UMA LEITURA POR ARQUIVO) ###
+
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+from metricas import medir
+
+# --- CONFIGURAÇÃO ---
+TAMANHO_CACHE_PDFS = 16  # quantos PDFs distintos ficam em memória
+
+class CacheTextoPdf:
+    """LRU limitado e thread-safe: hash do conteúdo -> tupla com o texto de cada página."""
+
+    def __init__(self, tamanho=TAMANHO_CACHE_PDFS):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            if chave not in self._itens: return None
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+
+    def guardar(self, chave, paginas):
+        with self._trava:
+            self._itens[chave] = paginas
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+_cache = CacheTextoPdf()
+
+def ler_bytes(arquivo_pdf):
+    """Aceita UploadedFile do Streamlit, caminho, bytes ou arquivo aberto."""
+    if isinstance(arquivo_pdf, (bytes, bytearray)): return bytes(arquivo_pdf)
+    if hasattr(arquivo_pdf, "getvalue"): return arquivo_pdf.getvalue()
+    if isinstance(arquivo_pdf, str):
+        with open(arquivo_pdf, "rb") as f: return f.read()
+    arquivo_pdf.seek(0)
+    return arquivo_pdf.read()
+
+def hash_conteudo(arquivo_pdf):
+    """SHA-256 dos bytes do PDF: identifica o arquivo independente do nome."""
+    return hashlib.sha256(ler_bytes(arquivo_pdf)).hexdigest()
+
+def extrair_paginas(arquivo_pdf, chave=None):
+    """
+    Texto de cada página (string vazia quando a extração falha), memoizado pelo
+    hash do conteúdo. Importações repetidas do mesmo arquivo não relêem o PDF.
+    `chave` é o hash_conteudo já calculado por quem chama: o arquivo não é hasheado de novo.
+    """
+    if chave is not None:
+        paginas = _cache.obter(chave)
+        if paginas is not None: return paginas
+    dados = ler_bytes(arquivo_pdf)
+    if chave is None:
+        chave = hashlib.sha256(dados).hexdigest()
+        paginas = _cache.obter(chave)
+        if paginas is not None: return paginas
+    from pypdf import PdfReader  # import adiado: não pesa na abertura do app.py
+    with medir("extracao_pdf", bytes=len(dados)) as span:
+        reader = PdfReader(io.BytesIO(dados))
+        paginas = tuple(_extrair_pagina(page) for page in reader.pages)
+        span["paginas"] = len(paginas)
+    _cache.guardar(chave, paginas)
+    return paginas
+
+def _extrair_pagina(page):
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+### FIM DA EXTRAÇÃO DE TEXTO DE PDF ###
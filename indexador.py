@@ -0,0 +1,387 @@
+### INDEXADOR INCREMENTAL DO CÉREBRO (COMPARTILHADO POR treinar.py E app.py) ###
+
+import os
+import glob
+import json
+import hashlib
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pypdf import PdfReader
+from langchain_core.documents import Document
+from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import Chroma
+from motor_embeddings import MODELO_EMBEDDINGS, MotorEmbeddings, verificar_compatibilidade
+from divisao_estrutural import dividir_por_estrutura, DeduplicadorMinHash, assinatura_minhash, VERSAO_DIVISAO
+from busca_hibrida import assinatura_ids, sincronizar_indice_lexical
+
+# --- CONFIGURAÇÃO ---
+PASTA_DOCUMENTOS = "pdfs_cetesb"
+NOME_BANCO = "banco_chroma"
+ARQUIVO_MANIFESTO = "manifesto.json"
+VERSAO_MANIFESTO = 1
+LOADERS = {".pdf": PyPDFLoader, ".txt": TextLoader, ".docx": Docx2txtLoader}
+PAGINAS_POR_TAREFA = 8  # PDFs grandes são fatiados em blocos de páginas entre os processos
+DIVISAO = "estrutural"  # "recursiva" volta ao RecursiveCharacterTextSplitter puro
+TAMANHO_PEDACO = 1000
+SOBREPOSICAO_PEDACO = 200  # na divisão estrutural, só vale para itens maiores que TAMANHO_PEDACO
+DEDUPLICAR = True  # descarta pedaços quase idênticos a outros já indexados (boilerplate legal)
+AMOSTRA_COMPATIBILIDADE = 64  # pedaços re-embedados para comparar um backend novo com o banco
+
+logger = logging.getLogger(__name__)
+
+# --- MANIFESTO (HASH DE CONTEÚDO + IDS DOS PEDAÇOS POR ARQUIVO) ---
+
+def calcular_hash_arquivo(caminho):
+    """Retorna o SHA-256 do conteúdo do arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def carregar_manifesto(banco=NOME_BANCO):
+    """Lê o manifesto do banco. Retorna None se ele ainda não existir."""
+    caminho = os.path.join(banco, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho): return None
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifesto.get("versao") != VERSAO_MANIFESTO: return None
+    return manifesto
+
+def versao_do_cerebro(banco=NOME_BANCO):
+    """Assinatura do conjunto de pedaços indexados; muda a cada reindexação com alterações."""
+    manifesto = carregar_manifesto(banco)
+    if manifesto is None: return None
+    return assinatura_ids(i for r in manifesto["arquivos"].values() for i in r["ids"])
+
+def salvar_manifesto(manifesto, banco=NOME_BANCO):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(banco, exist_ok=True)
+    caminho = os.path.join(banco, ARQUIVO_MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+def listar_arquivos(pasta=PASTA_DOCUMENTOS):
+    """Lista (recursivamente) os arquivos suportados, com caminho relativo à pasta."""
+    arquivos = {}
+    for extensao in LOADERS:
+        for caminho in glob.glob(os.path.join(pasta, f"**/*{extensao}"), recursive=True):
+            relativo = os.path.relpath(caminho, pasta).replace(os.sep, "/")
+            arquivos[relativo] = caminho
+    return dict(sorted(arquivos.items()))
+
+# --- CARGA E DIVISÃO ---
+
+def carregar_arquivo(caminho):
+    """Carrega um único arquivo com o loader adequado à extensão."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    return LOADERS[extensao](caminho).load()
+
+def _tarefa_arquivo(caminho):
+    inicio = time.perf_counter()
+    return carregar_arquivo(caminho), time.perf_counter() - inicio
+
+_leitor_do_processo = (None, None)
+
+def _leitor_pdf(caminho):
+    """Um PdfReader por processo: os blocos seguintes do mesmo arquivo não reabrem o PDF inteiro."""
+    global _leitor_do_processo
+    if _leitor_do_processo[0] != caminho:
+        _leitor_do_processo = (caminho, PdfReader(caminho))
+    return _leitor_do_processo[1]
+
+def _tarefa_paginas_pdf(caminho, primeira, ultima):
+    """Extrai um bloco de páginas com os mesmos metadados do PyPDFLoader."""
+    inicio = time.perf_counter()
+    reader = _leitor_pdf(caminho)
+    docs = [Document(page_content=reader.pages[i].extract_text() or "", metadata={"source": caminho, "page": i})
+            for i in range(primeira, ultima)]
+    return docs, time.perf_counter() - inicio
+
+def _carregar_em_sequencia(arquivos):
+    """Mesma saída de carregar_em_paralelo, lendo um arquivo por vez no próprio processo."""
+    for relativo, caminho in arquivos.items():
+        estado = {"caminho": caminho, "faltam": 0, "documentos": [], "segundos_cpu": 0.0,
+                  "erro": None, "inicio": time.perf_counter()}
+        try:
+            # PDFs pelo mesmo caminho do pool: metadados iguais aos de uma indexação pelo treinar.py
+            if caminho.lower().endswith(".pdf"):
+                documentos, segundos = _tarefa_paginas_pdf(caminho, 0, len(_leitor_pdf(caminho).pages))
+            else:
+                documentos, segundos = _tarefa_arquivo(caminho)
+            estado["documentos"], estado["segundos_cpu"] = documentos, segundos
+        except Exception as e:
+            estado["erro"] = str(e)
+        yield _finalizar_arquivo(relativo, estado)
+
+def carregar_em_paralelo(arquivos, processos=None):
+    """
+    Lê os arquivos {relativo: caminho} num pool de processos (todos os núcleos por padrão).
+    PDFs são divididos em blocos de páginas. Gera (relativo, documentos, registro) à
+    medida que cada arquivo termina; registro traz páginas, tempo e erro (se houver).
+    processos=0 lê tudo no próprio processo, sem pool (ex.: primeira indexação pelo app).
+    """
+    if not arquivos: return
+    if processos == 0:
+        yield from _carregar_em_sequencia(arquivos)
+        return
+    with ProcessPoolExecutor(max_workers=processos or os.cpu_count()) as pool:
+        pendentes, futuros = {}, {}
+        for relativo, caminho in arquivos.items():
+            pendentes[relativo] = {"caminho": caminho, "faltam": 0, "documentos": [], "segundos_cpu": 0.0,
+                                   "erro": None, "inicio": time.perf_counter()}
+            try:
+                if caminho.lower().endswith(".pdf"):
+                    total = len(PdfReader(caminho).pages)
+                    blocos = [(i, min(i + PAGINAS_POR_TAREFA, total)) for i in range(0, total, PAGINAS_POR_TAREFA)]
+                    for primeira, ultima in blocos:
+                        futuros[pool.submit(_tarefa_paginas_pdf, caminho, primeira, ultima)] = relativo
+                    pendentes[relativo]["faltam"] = len(blocos)
+                else:
+                    futuros[pool.submit(_tarefa_arquivo, caminho)] = relativo
+                    pendentes[relativo]["faltam"] = 1
+            except Exception as e:
+                pendentes[relativo]["erro"] = str(e)
+            if not pendentes[relativo]["faltam"]:
+                yield _finalizar_arquivo(relativo, pendentes.pop(relativo))
+
+        for futuro in as_completed(futuros):
+            relativo = futuros[futuro]
+            estado = pendentes[relativo]
+            try:
+                documentos, segundos = futuro.result()
+                estado["documentos"].extend(documentos)
+                estado["segundos_cpu"] += segundos
+            except Exception as e:
+                estado["erro"] = estado["erro"] or str(e)
+            estado["faltam"] -= 1
+            if not estado["faltam"]:
+                yield _finalizar_arquivo(relativo, pendentes.pop(relativo))
+
+def _em_ordem(resultados, ordem):
+    """
+    Reentrega os (relativo, ...) de carregar_em_paralelo na ordem dada: cada arquivo sai
+    assim que ele e todos os anteriores terminaram. A deduplicação depende da ordem, e
+    assim o mesmo conjunto de arquivos guarda sempre as mesmas cópias.
+    """
+    ordem, prontos = list(ordem), {}
+    proximo = 0
+    for resultado in resultados:
+        prontos[resultado[0]] = resultado
+        while proximo < len(ordem) and ordem[proximo] in prontos:
+            yield prontos.pop(ordem[proximo])
+            proximo += 1
+    yield from (prontos[relativo] for relativo in ordem[proximo:] if relativo in prontos)
+
+def _finalizar_arquivo(relativo, estado):
+    documentos = [] if estado["erro"] else sorted(estado["documentos"], key=lambda d: d.metadata.get("page", 0))
+    registro = {
+        "arquivo": relativo,
+        "paginas": len(documentos),
+        "segundos": round(time.perf_counter() - estado["inicio"], 3),
+        "segundos_cpu": round(estado["segundos_cpu"], 3),
+        "erro": estado["erro"],
+    }
+    if registro["erro"]:
+        logger.error("falha na ingestao %s", json.dumps(registro, ensure_ascii=False))
+    else:
+        logger.info("arquivo ingerido %s", json.dumps(registro, ensure_ascii=False))
+    return relativo, documentos, registro
+
+def config_divisao():
+    # Lida na hora da chamada para que o benchmark possa variar o splitter
+    return {"divisao": DIVISAO, "tamanho": TAMANHO_PEDACO, "sobreposicao": SOBREPOSICAO_PEDACO, "deduplicar": DEDUPLICAR,
+            "versao": VERSAO_DIVISAO}
+
+def dividir_documentos(documentos, tamanho=None, sobreposicao=None):
+    tamanho = tamanho or TAMANHO_PEDACO
+    sobreposicao = SOBREPOSICAO_PEDACO if sobreposicao is None else sobreposicao
+    if DIVISAO == "estrutural":
+        return dividir_por_estrutura(documentos, tamanho, sobreposicao)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=tamanho, chunk_overlap=sobreposicao)
+    return text_splitter.split_documents(documentos)
+
+def montar_deduplicador(vectorstore, ids, lote=5000):
+    """Índice MinHash dos pedaços que continuam no banco (os dos arquivos que serão relidos ficam fora)."""
+    deduplicador = DeduplicadorMinHash()
+    for i in range(0, len(ids), lote):
+        for texto in vectorstore.get(ids=ids[i:i + lote], include=["documents"])["documents"]:
+            deduplicador.adicionar(assinatura_minhash(texto))
+    return deduplicador
+
+def _excluir_ids(vectorstore, ids, lote=5000):
+    for i in range(0, len(ids), lote):
+        vectorstore.delete(ids=ids[i:i + lote])
+
+def gerar_ids_pedacos(relativo, splits):
+    """
+    IDs determinísticos por pedaço: prefixo do arquivo + hash de (página, texto).
+    Pedaços iguais entre duas versões do arquivo mantêm o mesmo ID.
+    """
+    prefixo = hashlib.sha1(relativo.encode("utf-8")).hexdigest()[:10]
+    ids, vistos = [], {}
+    for doc in splits:
+        chave = f"{doc.metadata.get('page', '')}|{doc.page_content}"
+        base = f"{prefixo}-{hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]}"
+        vistos[base] = vistos.get(base, 0) + 1
+        ids.append(base if vistos[base] == 1 else f"{base}-{vistos[base]}")
+    return ids
+
+# --- COMPATIBILIDADE DOS EMBEDDINGS COM O BANCO ---
+
+class EmbeddingsIncompativeis(RuntimeError):
+    pass
+
+def identidade_embeddings(embedding_function):
+    return {"modelo": getattr(embedding_function, "modelo", MODELO_EMBEDDINGS),
+            "backend": getattr(embedding_function, "backend", "torch")}
+
+def checar_embeddings(vectorstore, manifesto, embedding_function, amostra=AMOSTRA_COMPATIBILIDADE):
+    """
+    Se o banco foi gravado com outro modelo/backend, compara uma amostra de pedaços
+    re-embedados com os vetores gravados. Retorna None quando nada mudou ou quando esse
+    backend já foi aprovado antes; um backend aprovado entra em manifesto["backends_verificados"]
+    (quem grava o manifesto é o chamador). Bancos anteriores a esse registro foram gravados com o torch.
+    """
+    gravado = manifesto.get("embeddings") or {"modelo": MODELO_EMBEDDINGS, "backend": "torch"}
+    atual = identidade_embeddings(embedding_function)
+    if gravado == atual or atual in manifesto.get("backends_verificados", []): return None
+    if gravado["modelo"] != atual["modelo"]:
+        return {"compativel": False, "gravado": gravado, "atual": atual, "motivo": "modelo diferente"}
+    conteudo = vectorstore.get(limit=amostra, include=["documents", "embeddings"])
+    relatorio = verificar_compatibilidade(embedding_function, conteudo["documents"], conteudo["embeddings"])
+    if relatorio["compativel"]: manifesto.setdefault("backends_verificados", []).append(atual)
+    return {**relatorio, "gravado": gravado, "atual": atual}
+
+# --- ABERTURA SEM SINCRONIZAR (APP) ---
+
+def abrir_cerebro(banco=NOME_BANCO, embedding_function=None):
+    """
+    Abre o banco já indexado, sem ler a pasta nem subir o pool de processos: o app só
+    consulta, a ingestão fica com o treinar.py e o lote.py. Retorna None se não houver banco.
+    """
+    if not os.path.exists(banco): return None
+    if embedding_function is None:
+        embedding_function = MotorEmbeddings()
+    vectorstore = Chroma(persist_directory=banco, embedding_function=embedding_function)
+    manifesto = carregar_manifesto(banco)
+    if manifesto is not None:
+        compatibilidade = checar_embeddings(vectorstore, manifesto, embedding_function)
+        if compatibilidade and not compatibilidade["compativel"]:
+            raise EmbeddingsIncompativeis(
+                f"O banco '{banco}' foi gravado com {compatibilidade['gravado']} e os vetores de "
+                f"{compatibilidade['atual']} não batem. Reindexe com: "
+                f"python treinar.py --backend {compatibilidade['atual']['backend']} --reindexar")
+        if compatibilidade: salvar_manifesto(manifesto, banco)  # a próxima abertura não re-embeda a amostra
+    return vectorstore
+
+# --- SINCRONIZAÇÃO ---
+
+def sincronizar_cerebro(pasta=PASTA_DOCUMENTOS, banco=NOME_BANCO, embedding_function=None, processos=None, reindexar=False):
+    """
+    Deixa o banco Chroma em sincronia com a pasta de documentos.
+    Só arquivos novos ou alterados são lidos (em paralelo) e embedados; pedaços de
+    arquivos removidos ou alterados são apagados. Retorna (vectorstore, resumo).
+    reindexar=True apaga tudo e embeda de novo (ex.: troca por um backend incompatível).
+    """
+    if embedding_function is None:
+        embedding_function = MotorEmbeddings()
+    vectorstore = Chroma(persist_directory=banco, embedding_function=embedding_function)
+
+    manifesto = carregar_manifesto(banco)
+    compatibilidade = None
+    if manifesto is not None and not reindexar:
+        compatibilidade = checar_embeddings(vectorstore, manifesto, embedding_function)
+        if compatibilidade and not compatibilidade["compativel"]:
+            raise EmbeddingsIncompativeis(
+                f"O banco '{banco}' foi gravado com {compatibilidade['gravado']} e os vetores de "
+                f"{compatibilidade['atual']} não batem ({compatibilidade}). "
+                f"Reindexe com: python treinar.py --backend {compatibilidade['atual']['backend']} --reindexar")
+    if manifesto is None or reindexar:
+        # Banco antigo (sem manifesto) pode conter pedaços duplicados: começa do zero.
+        ids_legados = vectorstore.get(include=[])["ids"]
+        if ids_legados: _excluir_ids(vectorstore, ids_legados)
+        manifesto = {"versao": VERSAO_MANIFESTO, "arquivos": {},
+                     "embeddings": identidade_embeddings(embedding_function)}
+    # "embeddings" continua sendo quem gravou o banco; backends compatíveis ficam em "backends_verificados"
+    manifesto.setdefault("embeddings", {"modelo": MODELO_EMBEDDINGS, "backend": "torch"})
+    # Bancos anteriores a esse registro foram divididos pelo splitter recursivo 1000/200
+    divisao_gravada = manifesto.get("divisao") or {"divisao": "recursiva", "tamanho": 1000, "sobreposicao": 200, "deduplicar": False}
+    divisao_mudou = divisao_gravada != config_divisao()
+    manifesto["divisao"] = config_divisao()
+
+    registrados = manifesto["arquivos"]
+    atuais = {relativo: (caminho, calcular_hash_arquivo(caminho)) for relativo, caminho in listar_arquivos(pasta).items()}
+    resumo = {"novos": [], "alterados": [], "removidos": [], "inalterados": [], "falhas": [],
+              "pedacos_adicionados": 0, "pedacos_duplicados": 0, "ingestao": [], "compatibilidade": compatibilidade}
+
+    # 1. Remove pedaços de arquivos que sumiram da pasta
+    for relativo in [r for r in registrados if r not in atuais]:
+        _excluir_ids(vectorstore, registrados.pop(relativo)["ids"])
+        resumo["removidos"].append(relativo)
+        salvar_manifesto(manifesto, banco)
+
+    # 2. Processa apenas o que é novo ou mudou de conteúdo. Também relê tudo se o splitter mudou,
+    #    e, se algum arquivo saiu ou mudou, os que tinham pedaços descartados como cópia de outro
+    #    (o original pode ter ido embora junto com o arquivo antigo)
+    algum_alterado = any(relativo in registrados and registrados[relativo]["hash"] != hash_arquivo
+                         for relativo, (_, hash_arquivo) in atuais.items())
+    originais_mudaram = bool(resumo["removidos"]) or algum_alterado
+    a_ler = {}
+    for relativo, (caminho, hash_arquivo) in sorted(atuais.items()):
+        anterior = registrados.get(relativo)
+        if anterior and anterior["hash"] == hash_arquivo and not divisao_mudou \
+                and not (originais_mudaram and anterior.get("duplicados")):
+            resumo["inalterados"].append(relativo)
+        else:
+            a_ler[relativo] = caminho
+    deduplicador = None
+    if DEDUPLICAR and a_ler:
+        deduplicador = montar_deduplicador(vectorstore, [i for r, reg in registrados.items() if r not in a_ler for i in reg["ids"]])
+
+    # 3. Cada arquivo segue para o splitter assim que o pool termina de lê-lo e os anteriores
+    #    (em ordem alfabética) já passaram: a deduplicação fica igual de uma execução para outra
+    inicio = time.perf_counter()
+    for relativo, documentos, registro in _em_ordem(carregar_em_paralelo(a_ler, processos), a_ler):
+        resumo["ingestao"].append(registro)
+        if registro["erro"]:
+            resumo["falhas"].append({"arquivo": relativo, "erro": registro["erro"]})
+            continue
+        hash_arquivo = atuais[relativo][1]
+        anterior = registrados.get(relativo)
+        splits = dividir_documentos(documentos)
+        total_splits = len(splits)
+        if deduplicador is not None: splits = deduplicador.filtrar(splits)
+        ids = gerar_ids_pedacos(relativo, splits)
+        ids_atuais, ids_antigos = set(ids), set(anterior["ids"]) if anterior else set()
+        if anterior:
+            # Só sai o que deixou de existir; pedaços idênticos continuam no banco
+            _excluir_ids(vectorstore, [i for i in anterior["ids"] if i not in ids_atuais])
+            resumo["alterados"].append(relativo)
+        else:
+            resumo["novos"].append(relativo)
+        novos = [(i, doc) for i, doc in zip(ids, splits) if i not in ids_antigos]
+        if novos: vectorstore.add_documents([doc for _, doc in novos], ids=[i for i, _ in novos])
+        registrados[relativo] = {"hash": hash_arquivo, "ids": ids, "duplicados": total_splits - len(splits)}
+        resumo["pedacos_adicionados"] += len(novos)
+        resumo["pedacos_duplicados"] += total_splits - len(splits)
+        # Grava a cada arquivo para que uma interrupção não perca o trabalho já feito
+        salvar_manifesto(manifesto, banco)
+
+    salvar_manifesto(manifesto, banco)
+    resumo["segundos_ingestao"] = round(time.perf_counter() - inicio, 3)
+    resumo["total_pedacos"] = sum(len(r["ids"]) for r in registrados.values())
+
+    # 4. Índice BM25 acompanha o Chroma: reconstruído só quando o conjunto de pedaços muda
+    assinatura = assinatura_ids(i for r in registrados.values() for i in r["ids"])
+    resumo["indice_lexical_reconstruido"] = sincronizar_indice_lexical(vectorstore, banco, assinatura)
+    return vectorstore, resumo
+
+### FIM DO INDEXADOR ###
@@ -0,0 +1,179 @@
+### PROCESSAMENTO EM LOTE PELA LINHA DE COMANDO (SEM STREAMLIT) ###
+#
+# Uso:  python lote.py PASTA_DAS_LICENCAS [--saida relatorios_lote] [--workers 3] [--limite-llm 12] [--modo curta]
+#
+# Cada licença vira uma análise no armazém (id derivado do hash do PDF): extração, cadastro e
+# cada rascunho são gravados assim que ficam prontos. Rodar de novo retoma de onde parou e
+# não repete chamadas ao LLM já feitas. Sai um PDF de rascunho por licença + resumo_lote.json.
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from extracao_pdf import hash_conteudo
+from armazem_analises import ArmazemAnalises
+from relatorio_pdf import gerar_pdf_final, ASSINANTE_PADRAO, CARGO_PADRAO
+from processamento import (NOME_BANCO, LIMITE_CONCORRENCIA_LLM, extrair_dados_cadastrais_do_texto, separar_exigencias,
+                           processar_pdf_completo, rascunhar_fila, carregar_ou_construir_cerebro)
+
+# --- CONFIGURAÇÃO ---
+PASTA_SAIDA = "relatorios_lote"
+WORKERS_LOTE = 3  # licenças processadas ao mesmo tempo
+ARQUIVO_SECRETS = os.path.join(".streamlit", "secrets.toml")
+
+logger = logging.getLogger("lote")
+
+def ler_chave_api():
+    """GROQ_API_KEY do ambiente ou do mesmo secrets.toml usado pelo app."""
+    if os.environ.get("GROQ_API_KEY"): return os.environ["GROQ_API_KEY"]
+    try:
+        with open(ARQUIVO_SECRETS, "r", encoding="utf-8") as f:
+            encontrada = re.search(r'^\s*GROQ_API_KEY\s*=\s*["\'](.+?)["\']', f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return encontrada.group(1) if encontrada else None
+
+def carregar_base():
+    """Mesmo cérebro do app: embeddings + Chroma + BM25 + cache de respostas aprovadas."""
+    from motor_embeddings import MotorEmbeddings
+    from busca_hibrida import IndiceLexical
+    from cache_respostas import CacheRespostas
+    from indexador import versao_do_cerebro
+    embedding_function = MotorEmbeddings()
+    vectorstore = carregar_ou_construir_cerebro(embedding_function)
+    if not vectorstore: return None, None, None
+    return vectorstore, IndiceLexical.abrir(NOME_BANCO), CacheRespostas(embedding_function, versao_do_cerebro(NOME_BANCO))
+
+# --- UMA LICENÇA ---
+
+def processar_licenca(caminho, base, api_key, armazem, pasta_saida, modo, limite_llm, nome, cargo, reextrair=False):
+    """
+    Extrai, rascunha e gera o PDF de uma licença, retomando o que já estiver no armazém.
+    reextrair ignora a extração guardada e refaz a fila a partir da nova (rascunhos de
+    exigências que continuam na fila são aproveitados).
+    """
+    inicio = time.perf_counter()
+    vectorstore, indice_lexical, cache_respostas = base
+    hash_pdf = hash_conteudo(caminho)
+    analise_id = f"lote-{hash_pdf[:12]}"
+    registro = {"arquivo": os.path.basename(caminho), "analise": analise_id, "erro": None}
+
+    extraido = None if reextrair else armazem.extracao(hash_pdf, "completo")
+    registro["extracao_reaproveitada"] = extraido is not None
+    txt_dados, txt_exigencias = extraido or processar_pdf_completo(caminho, api_key, limite=limite_llm, hash_pdf=hash_pdf)
+    if "ERRO:" in txt_dados:
+        registro.update(erro=txt_dados, segundos=round(time.perf_counter() - inicio, 2))
+        return registro
+
+    estado = armazem.carregar(analise_id)
+    dados = {**estado["dados_auto"], **extrair_dados_cadastrais_do_texto(txt_dados)}
+    exigencias = separar_exigencias(txt_exigencias)
+    # Sem exigências a extração provavelmente falhou: não fica guardada para a próxima rodada
+    if exigencias: armazem.guardar_extracao(hash_pdf, "completo", [txt_dados, txt_exigencias])
+    fila = exigencias if reextrair else estado["fila"] or exigencias
+    armazem.salvar(analise_id, dados_auto=dados, fila=fila)
+
+    rascunhos = estado["rascunhos"]
+    pendentes = [e for e in fila if e not in rascunhos]
+    falhas = []
+
+    def _gravar(i, resposta, erro):
+        if erro is not None:
+            falhas.append({"exigencia": pendentes[i][:80], "erro": str(erro)})
+            return
+        rascunhos[pendentes[i]] = resposta
+        armazem.guardar_rascunho(analise_id, pendentes[i], resposta, modo)
+
+    if pendentes:
+        asyncio.run(rascunhar_fila(pendentes, vectorstore, api_key, modo=modo, limite=limite_llm, ao_concluir=_gravar,
+                                   indice_lexical=indice_lexical, cache_respostas=cache_respostas))
+
+    itens = [{"titulo": f"Item {n}", "exigencia": e, "resposta": rascunhos[e]}
+             for n, e in enumerate((e for e in fila if e in rascunhos), 1)]
+    if itens:
+        nome_pdf = f"Relatorio_Defesa_{os.path.splitext(registro['arquivo'])[0]}.pdf"
+        with open(os.path.join(pasta_saida, nome_pdf), "wb") as f:
+            f.write(gerar_pdf_final(itens, dados["empresa"], dados["cidade"], nome, cargo))
+        registro["relatorio"] = nome_pdf
+    registro.update(empresa=dados["empresa"], exigencias=len(fila), rascunhadas=len(itens),
+                    rascunhadas_agora=len(pendentes) - len(falhas), falhas=falhas,
+                    segundos=round(time.perf_counter() - inicio, 2))
+    return registro
+
+# --- LOTE ---
+
+def processar_lote(pasta, pasta_saida=PASTA_SAIDA, workers=WORKERS_LOTE, limite_llm=LIMITE_CONCORRENCIA_LLM * WORKERS_LOTE,
+                   modo="curta", nome=ASSINANTE_PADRAO, cargo=CARGO_PADRAO, api_key=None, reextrair=False):
+    api_key = api_key or ler_chave_api()
+    if not api_key: raise SystemExit("GROQ_API_KEY não encontrada (ambiente ou .streamlit/secrets.toml).")
+    arquivos = sorted(glob.glob(os.path.join(pasta, "**", "*.pdf"), recursive=True))
+    if not arquivos: raise SystemExit(f"Nenhum PDF encontrado em '{pasta}'.")
+    os.makedirs(pasta_saida, exist_ok=True)
+
+    print(f"--- LOTE: {len(arquivos)} licença(s), {workers} por vez ---")
+    base = carregar_base()
+    if not base[0]: raise SystemExit("Base de conhecimento não encontrada. Rode o treinar.py antes do lote.")
+    armazem = ArmazemAnalises()
+    # O limite total de chamadas simultâneas é dividido entre as licenças em andamento
+    limite_por_licenca = max(1, limite_llm // workers)
+
+    inicio, resultados = time.perf_counter(), []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(processar_licenca, caminho, base, api_key, armazem, pasta_saida, modo,
+                               limite_por_licenca, nome, cargo, reextrair): caminho for caminho in arquivos}
+        for futuro in as_completed(futuros):
+            try:
+                registro = futuro.result()
+            except Exception as e:
+                logger.exception("falha na licença %s", futuros[futuro])
+                registro = {"arquivo": os.path.basename(futuros[futuro]), "erro": str(e)}
+            resultados.append(registro)
+            situacao = f"❌ {registro['erro']}" if registro["erro"] else \
+                f"✅ {registro['rascunhadas']}/{registro['exigencias']} itens em {registro['segundos']}s"
+            print(f"[{len(resultados)}/{len(arquivos)}] {registro['arquivo']}: {situacao}")
+
+    resumo = {
+        "pasta": pasta,
+        "modo": modo,
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "licencas": len(arquivos),
+        "concluidas": sum(1 for r in resultados if not r["erro"] and r.get("rascunhadas") == r.get("exigencias")),
+        "com_falhas": sum(1 for r in resultados if r["erro"] or r.get("falhas")),
+        "resultados": sorted(resultados, key=lambda r: r["arquivo"]),
+    }
+    with open(os.path.join(pasta_saida, "resumo_lote.json"), "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=2)
+    return resumo
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera rascunhos de defesa para uma pasta de licenças, sem a interface.")
+    parser.add_argument("pasta", help="pasta com os PDFs das licenças (busca em subpastas)")
+    parser.add_argument("--saida", default=PASTA_SAIDA)
+    parser.add_argument("--workers", type=int, default=WORKERS_LOTE)
+    parser.add_argument("--limite-llm", type=int, default=LIMITE_CONCORRENCIA_LLM * WORKERS_LOTE,
+                        help="chamadas simultâneas ao LLM somando todas as licenças")
+    parser.add_argument("--modo", choices=["curta", "media", "avancada"], default="curta")
+    parser.add_argument("--nome", default=ASSINANTE_PADRAO)
+    parser.add_argument("--cargo", default=CARGO_PADRAO)
+    parser.add_argument("--reextrair", action="store_true",
+                        help="ignora as extrações guardadas e chama o LLM de novo para cada PDF")
+    args = parser.parse_args(argv)
+
+    resumo = processar_lote(args.pasta, args.saida, args.workers, args.limite_llm, args.modo, args.nome, args.cargo,
+                            reextrair=args.reextrair)
+    print(f"\n✅ {resumo['concluidas']}/{resumo['licencas']} licença(s) completas em {resumo['segundos']}s "
+          f"({resumo['com_falhas']} com falhas). Resumo em '{os.path.join(args.saida, 'resumo_lote.json')}'.")
+    return 1 if resumo["com_falhas"] else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
+
+### FIM DO PROCESSAMENTO EM LOTE ###
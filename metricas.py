@@ -0,0 +1,146 @@
+### INSTRUMENTAÇÃO: TEMPOS POR ETAPA E TOKENS (SQLITE LOCAL) ###
+
+import json
+import time
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_METRICAS = "metricas.sqlite"
+JANELA_PERCENTIS = 500  # quantas medições recentes de cada etapa entram no p50/p95
+MAX_SPANS = 50000  # linhas guardadas no total; as mais antigas saem
+PODA_A_CADA = 1000  # gravações entre duas podas
+
+_operacao_atual = contextvars.ContextVar("operacao_atual", default="")
+
+class RegistroMetricas:
+    """
+    Grava uma linha por etapa medida: operação, etapa, duração, tokens e extras em JSON.
+    Só as `maximo` medições mais recentes ficam no arquivo.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_METRICAS, maximo=MAX_SPANS):
+        self.maximo = maximo
+        self._gravacoes = 0
+        self._trava = threading.Lock()
+        self._db = sqlite3.connect(arquivo, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS spans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, momento REAL NOT NULL, operacao TEXT NOT NULL,
+            etapa TEXT NOT NULL, duracao REAL NOT NULL, tokens_entrada INTEGER, tokens_saida INTEGER, extra TEXT)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_spans_etapa ON spans (etapa, id)")
+        self._podar()
+        self._db.commit()
+
+    def _podar(self):
+        # ids são crescentes: tudo abaixo do n-ésimo mais recente sai de uma vez
+        self._db.execute("DELETE FROM spans WHERE id <= (SELECT MAX(id) FROM spans) - ?", (self.maximo,))
+
+    def gravar(self, etapa, duracao, tokens_entrada=None, tokens_saida=None, **extra):
+        linha = (time.time(), _operacao_atual.get(), etapa, duracao, tokens_entrada, tokens_saida,
+                 json.dumps(extra, ensure_ascii=False) if extra else None)
+        try:
+            with self._trava:
+                self._db.execute("INSERT INTO spans (momento, operacao, etapa, duracao, tokens_entrada, tokens_saida, extra) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", linha)
+                self._gravacoes += 1
+                if self._gravacoes % PODA_A_CADA == 0: self._podar()
+                self._db.commit()
+        except sqlite3.Error:
+            pass  # medir nunca pode derrubar a operação medida
+
+    def fechar(self):
+        with self._trava:
+            self._db.close()
+
+    def resumo(self, janela=JANELA_PERCENTIS):
+        """[{etapa, n, p50_ms, p95_ms, tokens_medios}] das medições mais recentes de cada etapa."""
+        with self._trava:
+            etapas = [e for e, in self._db.execute("SELECT DISTINCT etapa FROM spans ORDER BY etapa")]
+            linhas = []
+            for etapa in etapas:
+                medicoes = self._db.execute(
+                    "SELECT duracao, COALESCE(tokens_entrada, 0) + COALESCE(tokens_saida, 0), tokens_entrada IS NOT NULL "
+                    "FROM spans WHERE etapa = ? ORDER BY id DESC LIMIT ?", (etapa, janela)).fetchall()
+                duracoes = sorted(d for d, _, _ in medicoes)
+                tokens = [t for _, t, tem in medicoes if tem]
+                linhas.append({
+                    "etapa": etapa,
+                    "n": len(duracoes),
+                    "p50_ms": round(percentil(duracoes, 50) * 1000, 1),
+                    "p95_ms": round(percentil(duracoes, 95) * 1000, 1),
+                    "tokens_medios": round(sum(tokens) / len(tokens)) if tokens else None,
+                })
+        return linhas
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) com interpolação linear sobre uma lista já ordenada."""
+    if not ordenados: return 0.0
+    posicao = (len(ordenados) - 1) * p / 100
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+_registro = None
+_trava_registro = threading.Lock()
+
+def registro():
+    """Registro único do processo, aberto na primeira medição."""
+    global _registro
+    if _registro is None:
+        with _trava_registro:
+            if _registro is None: _registro = RegistroMetricas()
+    return _registro
+
+@contextmanager
+def gravando_em(arquivo):
+    """Grava as medições do bloco em outro arquivo (ex.: o benchmark não suja o registro do app) e volta ao anterior."""
+    global _registro
+    with _trava_registro:
+        anterior = _registro
+        _registro = RegistroMetricas(arquivo)
+    try:
+        yield _registro
+    finally:
+        with _trava_registro:
+            _registro.fechar()
+            _registro = anterior
+
+@contextmanager
+def operacao(nome):
+    """Agrupa as etapas medidas dentro do bloco sob uma operação (ex.: consultar_ia)."""
+    token = _operacao_atual.set(nome)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro().gravar(f"{nome} (total)", time.perf_counter() - inicio)
+        try:
+            _operacao_atual.reset(token)
+        except ValueError:
+            pass  # gerador fechado fora do contexto em que começou (ex.: stream interrompido)
+
+@contextmanager
+def medir(etapa, **extra):
+    """
+    Mede a duração do bloco. O dicionário entregue pode receber tokens_entrada,
+    tokens_saida ou qualquer campo extra antes do fim do bloco.
+    """
+    dados = dict(extra)
+    inicio = time.perf_counter()
+    try:
+        yield dados
+    finally:
+        registro().gravar(etapa, time.perf_counter() - inicio, **dados)
+
+def tokens_da_resposta(mensagem):
+    """(entrada, saída) a partir do usage_metadata/response_metadata de uma mensagem do LangChain."""
+    uso = getattr(mensagem, "usage_metadata", None)
+    if uso: return uso.get("input_tokens"), uso.get("output_tokens")
+    uso = (getattr(mensagem, "response_metadata", None) or {}).get("token_usage") or {}
+    return uso.get("prompt_tokens"), uso.get("completion_tokens")
+
+### FIM DA INSTRUMENTAÇÃO ###
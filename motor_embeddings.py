@@ -0,0 +1,149 @@
+### MOTOR DE EMBEDDINGS (LOTES + CACHE EM DISCO + LRU DE CONSULTAS) ###
+
+import os
+import sqlite3
+import hashlib
+import platform
+import threading
+import numpy as np
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from metricas import medir
+
+# --- CONFIGURAÇÃO ---
+MODELO_EMBEDDINGS = "all-MiniLM-L6-v2"
+ARQUIVO_CACHE_EMBEDDINGS = "cache_embeddings.sqlite"
+TAMANHO_LOTE = 64
+TAMANHO_CACHE_CONSULTAS = 512
+# torch = caminho padrão do sentence-transformers; onnx = ONNX Runtime fp32; onnx-int8 = ONNX quantizado
+# (os dois últimos pedem: pip install "sentence-transformers[onnx]")
+BACKENDS_EMBEDDINGS = ("torch", "onnx", "onnx-int8")
+BACKEND_EMBEDDINGS = os.environ.get("BACKEND_EMBEDDINGS", "torch")
+LIMIAR_COMPATIBILIDADE = 0.99  # cosseno médio mínimo contra os vetores já gravados no banco
+LIMIAR_COMPATIBILIDADE_MINIMO = 0.95  # e nenhum pedaço abaixo disso
+
+def _argumentos_modelo(backend):
+    """model_kwargs do SentenceTransformer para cada backend."""
+    if backend not in BACKENDS_EMBEDDINGS:
+        raise ValueError(f"backend de embeddings desconhecido: {backend!r} (use {', '.join(BACKENDS_EMBEDDINGS)})")
+    if backend == "torch": return {}
+    if backend == "onnx": return {"backend": "onnx"}
+    # Pesos int8 publicados junto com o modelo no Hub; a variante depende da CPU
+    arquivo = "model_qint8_arm64.onnx" if platform.machine().lower() in ("arm64", "aarch64") else "model_qint8_avx2.onnx"
+    return {"backend": "onnx", "model_kwargs": {"file_name": f"onnx/{arquivo}"}}
+
+class MotorEmbeddings(Embeddings):
+    """
+    Embeddings compartilhados pela indexação e pela consulta.
+    Pedaços são codificados em lotes e guardados num cache SQLite indexado pelo
+    hash do texto (trechos repetidos entre licenças são codificados uma vez só);
+    consultas ficam num LRU em memória.
+    """
+
+    def __init__(self, modelo=MODELO_EMBEDDINGS, tamanho_lote=TAMANHO_LOTE, threads=None, normalizar=False,
+                 arquivo_cache=ARQUIVO_CACHE_EMBEDDINGS, tamanho_cache_consultas=TAMANHO_CACHE_CONSULTAS,
+                 backend=BACKEND_EMBEDDINGS):
+        argumentos_modelo = _argumentos_modelo(backend)
+        if threads and backend == "torch":
+            import torch
+            torch.set_num_threads(threads)
+        self.modelo = modelo
+        self.backend = backend
+        self.normalizar = normalizar
+        self._hf = HuggingFaceEmbeddings(
+            model_name=modelo,
+            model_kwargs=argumentos_modelo,
+            encode_kwargs={"batch_size": tamanho_lote, "normalize_embeddings": normalizar},
+        )
+        self._trava = threading.Lock()
+        self._consultas = OrderedDict()
+        self._tamanho_cache_consultas = tamanho_cache_consultas
+        self._db = None
+        if arquivo_cache:
+            self._db = sqlite3.connect(arquivo_cache, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (chave TEXT PRIMARY KEY, vetor BLOB NOT NULL)")
+            self._db.commit()
+
+    def _chave(self, texto):
+        # O modelo, o backend e a normalização entram na chave: trocar qualquer um invalida o cache
+        # (o torch fica sem sufixo para manter válido o cache gravado antes dos outros backends)
+        modelo = self.modelo if self.backend == "torch" else f"{self.modelo}@{self.backend}"
+        base = f"{modelo}|{int(self.normalizar)}|{texto}"
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def _ler_cache(self, chaves):
+        encontrados = {}
+        if self._db is None: return encontrados
+        unicas = list(set(chaves))
+        with self._trava:
+            for i in range(0, len(unicas), 500):
+                lote = unicas[i:i + 500]
+                marcadores = ",".join("?" * len(lote))
+                for chave, vetor in self._db.execute(f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", lote):
+                    encontrados[chave] = array("f", vetor).tolist()
+        return encontrados
+
+    def _gravar_cache(self, pares):
+        if self._db is None or not pares: return
+        with self._trava:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (chave, vetor) VALUES (?, ?)",
+                                 [(chave, array("f", vetor).tobytes()) for chave, vetor in pares])
+            self._db.commit()
+
+    def embed_documents(self, texts):
+        chaves = [self._chave(t) for t in texts]
+        vetores = self._ler_cache(chaves)
+        faltantes = {}
+        for chave, texto in zip(chaves, texts):
+            if chave not in vetores: faltantes.setdefault(chave, texto)
+        if faltantes:
+            with medir("embedding_documentos", textos=len(faltantes), em_cache=len(texts) - len(faltantes)):
+                novos = self._hf.embed_documents(list(faltantes.values()))
+            pares = list(zip(faltantes.keys(), novos))
+            self._gravar_cache(pares)
+            vetores.update(pares)
+        return [vetores[c] for c in chaves]
+
+    def embed_query(self, text):
+        with self._trava:
+            if text in self._consultas:
+                self._consultas.move_to_end(text)
+                return self._consultas[text]
+        vetor = self._hf.embed_query(text)
+        with self._trava:
+            self._consultas[text] = vetor
+            if len(self._consultas) > self._tamanho_cache_consultas:
+                self._consultas.popitem(last=False)
+        return vetor
+
+    def limpar_cache_consultas(self):
+        with self._trava:
+            self._consultas.clear()
+
+def normalizar(vetores):
+    """Matriz float32 com cada linha de norma 1 (linhas nulas ficam nulas): cosseno vira produto escalar."""
+    matriz = np.atleast_2d(np.asarray(vetores, dtype=np.float32))
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return np.divide(matriz, normas, out=np.zeros_like(matriz), where=normas > 0)
+
+def verificar_compatibilidade(embedding_function, textos, vetores_gravados):
+    """
+    Recalcula o embedding de pedaços já indexados e compara com os vetores gravados.
+    Compatível = as consultas do backend atual acham os mesmos vizinhos no banco antigo.
+    """
+    textos = list(textos)
+    if not textos:
+        return {"compativel": True, "amostra": 0, "cosseno_medio": None, "cosseno_minimo": None}
+    novos = embedding_function.embed_documents(textos)
+    similaridades = (normalizar(novos) * normalizar(vetores_gravados)).sum(axis=1)
+    media, minimo = float(similaridades.mean()), float(similaridades.min())
+    return {
+        "compativel": media >= LIMIAR_COMPATIBILIDADE and minimo >= LIMIAR_COMPATIBILIDADE_MINIMO,
+        "amostra": len(similaridades),
+        "cosseno_medio": round(media, 5),
+        "cosseno_minimo": round(minimo, 5),
+    }
+
+### FIM DO MOTOR DE EMBEDDINGS ###
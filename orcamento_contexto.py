@@ -0,0 +1,103 @@
+### ORÇAMENTO DE CONTEXTO: CONTAGEM DE TOKENS, SEM REPETIÇÃO, CORTE POR MODO ###
+
+import re
+import math
+from tokenizacao import tokenizar
+
+# --- CONFIGURAÇÃO ---
+# Tokens de contexto (gabarito) por modo de resposta; o resto do prompt é fixo
+ORCAMENTO_POR_MODO = {"curta": 600, "media": 1200, "avancada": 2000}
+ORCAMENTO_PADRAO = 1200
+CANDIDATOS_CONTEXTO = 6  # trechos trazidos da busca para disputar o orçamento
+CARACTERES_POR_TOKEN = 3.5  # estimativa para português quando o tiktoken não está instalado
+MINIMO_TRECHO = 60  # abaixo disso um trecho cortado não vale a pena
+LIMIAR_REPETIDO = 0.6  # fração dos shingles já presente no contexto para descartar o trecho
+PESO_TERMOS = 0.5  # quanto os termos da exigência pesam contra a ordem da busca
+SEPARADOR = "\n---\n"
+
+_codificador = None
+
+def _tiktoken():
+    # O Llama 3 usa um vocabulário derivado do cl100k: boa aproximação da contagem do Groq
+    global _codificador
+    if _codificador is None:
+        try:
+            import tiktoken
+            _codificador = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _codificador = False
+    return _codificador
+
+def contar_tokens(texto):
+    codificador = _tiktoken()
+    if codificador: return len(codificador.encode(texto, disallowed_special=()))
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+def cortar_em_tokens(texto, limite):
+    """Corta no limite de tokens, recuando até o fim da última frase quando possível."""
+    if contar_tokens(texto) <= limite: return texto
+    codificador = _tiktoken()
+    if codificador:
+        cortado = codificador.decode(codificador.encode(texto, disallowed_special=())[:limite])
+    else:
+        cortado = texto[:int(limite * CARACTERES_POR_TOKEN)]
+    fim_frase = max(cortado.rfind(". "), cortado.rfind(".\n"), cortado.rfind(";"))
+    return cortado[:fim_frase + 1] if fim_frase > len(cortado) // 2 else cortado
+
+# --- REPETIÇÃO ENTRE TRECHOS ---
+
+def _shingles(texto, n=5):
+    palavras = re.findall(r"\w+", texto.lower())
+    return {" ".join(palavras[i:i + n]) for i in range(max(len(palavras) - n + 1, 1))}
+
+def _tirar_prefixo_repetido(texto, anteriores, minimo=40):
+    """Remove o começo do trecho que repete o fim de um trecho já escolhido (sobreposição do splitter)."""
+    for anterior in anteriores:
+        for tamanho in range(min(len(texto), len(anterior)), minimo - 1, -1):
+            if anterior.endswith(texto[:tamanho]):
+                return texto[tamanho:].lstrip()
+    return texto
+
+# --- MONTAGEM ---
+
+def montar_contexto(docs, exigencia, modo="media", orcamento=None):
+    """
+    Ordena os trechos recuperados (posição na busca + termos da exigência), descarta
+    repetidos e sobreposições e enche o orçamento de tokens do modo, cortando o último
+    trecho se couber um pedaço útil. Retorna (contexto, relatorio).
+    """
+    orcamento = orcamento or ORCAMENTO_POR_MODO.get(modo, ORCAMENTO_PADRAO)
+    termos = set(tokenizar(exigencia))
+
+    def _pontuacao(posicao_doc):
+        posicao, doc = posicao_doc
+        presentes = termos & set(tokenizar(doc.page_content)) if termos else set()
+        return 1 / (posicao + 1) + PESO_TERMOS * (len(presentes) / len(termos) if termos else 0)
+
+    ordenados = [doc for _, doc in sorted(enumerate(docs), key=_pontuacao, reverse=True)]
+    escolhidos, vistos = [], set()
+    relatorio = {"orcamento": orcamento, "recuperados": len(docs), "usados": 0, "repetidos": 0, "cortados": 0}
+    usados = 0
+    for doc in ordenados:
+        texto = _tirar_prefixo_repetido(doc.page_content.strip(), escolhidos)
+        shingles = _shingles(texto)
+        if not texto or len(shingles & vistos) >= LIMIAR_REPETIDO * len(shingles):
+            relatorio["repetidos"] += 1
+            continue
+        custo = contar_tokens(texto) + (contar_tokens(SEPARADOR) if escolhidos else 0)
+        if usados + custo > orcamento:
+            restante = orcamento - usados - (contar_tokens(SEPARADOR) if escolhidos else 0)
+            if restante < MINIMO_TRECHO: break
+            texto = cortar_em_tokens(texto, restante)
+            custo = orcamento - usados
+            relatorio["cortados"] += 1
+        escolhidos.append(texto)
+        vistos |= shingles
+        usados += custo
+        if usados >= orcamento: break
+    contexto = SEPARADOR.join(escolhidos)
+    relatorio["usados"] = len(escolhidos)
+    relatorio["tokens"] = contar_tokens(contexto)
+    return contexto, relatorio
+
+### FIM DO ORÇAMENTO DE CONTEXTO ###
@@ -0,0 +1,289 @@
+### PROCESSAMENTO DAS LICENÇAS (COMPARTILHADO POR app.py E lote.py) ###
+# Sem streamlit aqui: o módulo é importável pela linha de comando.
+
+import os
+import re
+import asyncio
+from contextlib import closing
+from extracao_pdf import extrair_paginas
+from extracao_cadastro import extrair_cadastro_por_regex, campos_faltantes, formatar_dados_cadastrais
+from cliente_llm import pool_llm
+from metricas import operacao, medir
+from orcamento_contexto import contar_tokens, cortar_em_tokens, montar_contexto, CANDIDATOS_CONTEXTO
+
+PASTA_DOCUMENTOS = "pdfs_cetesb"; NOME_BANCO = "banco_chroma"  # mesmos valores do indexador.py
+
+# --- DADOS CADASTRAIS ---
+
+def extrair_dados_cadastrais_do_texto(texto_llm):
+    """Converte o texto bruto da IA em um dicionário de dados."""
+    dados = {"empresa": "", "cnpj": "", "endereco": "", "cidade": ""}
+    padroes = {
+        "empresa": r"EMPRESA:\s*(.+)", 
+        "cnpj": r"CNPJ:\s*(.+)",
+        "endereco": r"ENDERECO:\s*(.+)", 
+        "cidade": r"CIDADE:\s*(.+)"
+    }
+    for chave, padrao in padroes.items():
+        match = re.search(padrao, texto_llm, re.IGNORECASE)
+        if match: 
+            dados[chave] = match.group(1).strip()
+    return dados
+
+def completar_cadastro(dados_regex, faltantes, texto_llm):
+    """Preenche só os campos que o regex não achou com confiança a partir da resposta do LLM."""
+    dados_llm = extrair_dados_cadastrais_do_texto(texto_llm)
+    for campo in faltantes:
+        if dados_llm[campo]: dados_regex[campo] = dados_llm[campo]
+    return formatar_dados_cadastrais(dados_regex)
+
+def separar_exigencias(txt_exigencias):
+    """Lista "###" devolvida pela extração -> exigências (descarta sobras curtas)."""
+    raw_list = txt_exigencias.split('###') if "###" in txt_exigencias else txt_exigencias.split('\n')
+    return [item.strip() for item in raw_list if len(item.strip()) > 10]
+
+# --- CHAMADAS AO LLM (CONCORRÊNCIA E RETRY) ---
+LIMITE_CONCORRENCIA_LLM = 4  # por tarefa; o limite global do servidor fica no pool_llm
+
+async def invocar_com_retry(chain, entrada, semaforo):
+    # O pool usa o cliente HTTP síncrono compartilhado (conexões reaproveitadas entre loops
+    # do asyncio.run) e cuida da vaga global, do limite de taxa e do retry em 429
+    async with semaforo:
+        return await asyncio.to_thread(pool_llm.invocar, chain, entrada)
+
+# --- EXTRAÇÃO DE EXIGÊNCIAS EM JANELAS (MAP-REDUCE) ---
+TOKENS_POR_JANELA = 3500  # ~12 mil caracteres: cabe folgado no modelo e o tempo de cada chamada fica previsível
+TOKENS_CADASTRO = 1200  # o licenciado está sempre no começo da licença
+
+def montar_janelas(paginas, limite=TOKENS_POR_JANELA):
+    """
+    Agrupa páginas consecutivas em janelas de até `limite` tokens (só uma página
+    sozinha maior que o limite passa dele). Cada janela repete a última página da
+    anterior quando as duas cabem juntas, para que uma exigência que atravesse a
+    quebra apareça inteira em pelo menos uma delas.
+    """
+    janelas, atual, tamanho = [], [], 0
+    for pagina, tokens in ((p, contar_tokens(p)) for p in paginas):
+        if atual and tamanho + tokens > limite:
+            janelas.append("\n".join(p for p, _ in atual))
+            # Janela de uma página só não é repetida: a seguinte a conteria inteira
+            ultima = atual[-1]
+            atual = [ultima] if len(atual) > 1 and ultima[1] + tokens <= limite else []
+            tamanho = sum(t for _, t in atual)
+        atual.append((pagina, tokens)); tamanho += tokens
+    if atual: janelas.append("\n".join(p for p, _ in atual))
+    return janelas
+
+def _normalizar_exigencia(texto):
+    texto = re.sub(r"\s+", " ", texto).strip().lower()
+    return re.sub(r"^[\d\.\)\-–\s]+", "", texto)
+
+def mesclar_exigencias(respostas):
+    """Junta as listas "###" de cada janela, removendo repetidas e fragmentos contidos em outra."""
+    itens = []
+    for resposta in respostas:
+        partes = resposta.split("###") if "###" in resposta else resposta.split("\n")
+        itens.extend(p.strip() for p in partes if len(p.strip()) > 10)
+    normalizados = [_normalizar_exigencia(i) for i in itens]
+    finais = []
+    for i, (item, norm) in enumerate(zip(itens, normalizados)):
+        repetido = any(
+            (norm == outro and j < i) or (norm != outro and norm in outro)
+            for j, outro in enumerate(normalizados) if j != i
+        )
+        if not repetido: finais.append(item)
+    return "".join(f"{item}\n###\n" for item in finais)
+
+@operacao("processar_pdf_completo")
+def processar_pdf_completo(arquivo_pdf, api_key, limite=LIMITE_CONCORRENCIA_LLM, hash_pdf=None):
+    """
+    Extrai (dados cadastrais, exigências) com no máximo `limite` chamadas ao LLM ao mesmo tempo.
+    hash_pdf: hash_conteudo do arquivo, quando quem chama já o calculou.
+    """
+    try:
+        # Texto por página vem do cache (compartilhado com processar_apenas_cadastro)
+        paginas = [p for p in extrair_paginas(arquivo_pdf, chave=hash_pdf) if p]
+        texto_completo = "\n".join(paginas)
+        if not texto_completo.strip(): return "ERRO: Texto não extraído.", "ERRO: Texto não extraído."
+
+        template_dados = """
+        Analise o texto da licença ambiental abaixo e extraia os dados do LICENCIADO.
+        TEXTO: {texto}
+        RETORNE APENAS NESTE FORMATO:
+        EMPRESA: (Razão Social)
+        CNPJ: (CNPJ)
+        ENDERECO: (Logradouro)
+        CIDADE: (Cidade - UF)
+        """
+        chain_dados = pool_llm.chain(template_dados, api_key)
+
+        template_exigencias = """
+        Analise o texto da Licença Ambiental.
+        SUA MISSÃO: Listar todas as EXIGÊNCIAS TÉCNICAS que o cliente precisa cumprir.
+        REGRAS:
+        1. NUNCA escreva textos introdutórios como "Aqui estão as exigências...".
+        2. Ignore leis, artigos e preâmbulos.
+        3. Copie o texto fiel da exigência.
+        4. Separe cada exigência EXCLUSIVAMENTE com o delimitador "###".
+        TEXTO: {texto}
+        RESPOSTA (APENAS AS EXIGÊNCIAS, SEM NADA ANTES OU DEPOIS):
+        """
+        chain_exig = pool_llm.chain(template_exigencias, api_key)
+
+        # Pré-passe por regex: o LLM só é chamado se algum campo cadastral faltar
+        texto_cadastro = cortar_em_tokens(texto_completo, TOKENS_CADASTRO)
+        dados_regex, confianca = extrair_cadastro_por_regex(texto_cadastro)
+        faltantes = campos_faltantes(confianca)
+
+        # Cadastro (se preciso) e todas as janelas de exigências vão ao LLM ao mesmo tempo
+        async def _extrair():
+            semaforo = asyncio.Semaphore(limite)
+            tarefas = [invocar_com_retry(chain_exig, {"texto": janela}, semaforo) for janela in montar_janelas(paginas)]
+            if faltantes:
+                tarefas.append(invocar_com_retry(chain_dados, {"texto": texto_cadastro}, semaforo))
+            return await asyncio.gather(*tarefas)
+        respostas = asyncio.run(_extrair())
+        if faltantes:
+            *respostas, resposta_dados = respostas
+            dados_cadastrais = completar_cadastro(dados_regex, faltantes, resposta_dados.content)
+        else:
+            dados_cadastrais = formatar_dados_cadastrais(dados_regex)
+        lista_exigencias = mesclar_exigencias([r.content for r in respostas])
+
+        return dados_cadastrais, lista_exigencias
+    except Exception as e:
+        return f"ERRO: {e}", f"ERRO: {e}"
+
+@operacao("processar_apenas_cadastro")
+def processar_apenas_cadastro(arquivo_pdf, api_key, hash_pdf=None):
+    try:
+        texto_curto = "\n".join(extrair_paginas(arquivo_pdf, chave=hash_pdf)[:3])
+        dados_regex, confianca = extrair_cadastro_por_regex(texto_curto)
+        faltantes = campos_faltantes(confianca)
+        if not faltantes: return formatar_dados_cadastrais(dados_regex)
+
+        template_dados = """
+        Extraia os dados cadastrais.
+        TEXTO: {texto}
+        RETORNE APENAS NESTE FORMATO:
+        EMPRESA: (Razão Social)
+        CNPJ: (CNPJ)
+        ENDERECO: (Logradouro)
+        CIDADE: (Cidade - UF)
+        """
+        chain_dados = pool_llm.chain(template_dados, api_key)
+        return completar_cadastro(dados_regex, faltantes, pool_llm.invocar(chain_dados, {"texto": texto_curto}).content)
+    except Exception as e:
+        return f"ERRO: {e}"
+
+def montar_chain_resposta(api_key, temperatura=0.0, modo="media"):
+    instrucoes_modo = {
+        "curta": "ESTILO: CURTO E GROSSO. FOCO: Diga apenas que a exigência foi cumprida.",
+        "media": "ESTILO: EQUILIBRADO E TÉCNICO. FOCO: Confirme o atendimento e explique brevemente.",
+        "avancada": "ESTILO: TÉCNICO DETALHADO. FOCO: Explique o funcionamento técnico completo."
+    }.get(modo, "ESTILO: TÉCNICO.")
+    template = f"""
+    Você é um Engenheiro Ambiental Sênior. {instrucoes_modo}
+    REGRAS GERAIS: Use voz passiva, seja impessoal, não repita a pergunta.
+    CONTEXTO (Gabarito): {{context}}
+    EXIGÊNCIA (Pergunta): {{question}}
+    RESPOSTA:
+    """
+    # Chain pronto e reaproveitado pelo pool (um por modo/temperatura/chave)
+    return pool_llm.chain(template, api_key, temperatura=temperatura)
+
+def orcar_contexto(docs, exigencia, modo):
+    """Gabarito sem trechos repetidos e dentro do orçamento de tokens do modo; tokens vão para as métricas."""
+    with medir("montar_contexto", modo=modo) as span:
+        contexto, relatorio = montar_contexto(docs, exigencia, modo)
+        span["tokens_entrada"] = relatorio.pop("tokens")
+        span.update(relatorio)
+    return contexto
+
+def consultar_ia_stream(exigencia, vectorstore, api_key, temperatura=0.0, modo="media", indice_lexical=None, cache_respostas=None):
+    """Gera a resposta em pedaços de texto, à medida que os tokens chegam do Groq."""
+    with operacao("consultar_ia"):
+        # Exigência recorrente (já aprovada antes neste modo): devolve a resposta salva na hora
+        if cache_respostas is not None:
+            with medir("cache_respostas") as span:
+                encontrada = cache_respostas.buscar(exigencia, modo)
+                span["acerto"] = bool(encontrada)
+            if encontrada:
+                yield encontrada[0]
+                return
+        from busca_hibrida import buscar_hibrido
+        docs = buscar_hibrido(exigencia, vectorstore, indice_lexical, k=CANDIDATOS_CONTEXTO)
+        contexto = orcar_contexto(docs, exigencia, modo)
+        chain = montar_chain_resposta(api_key, temperatura, modo)
+        # Fechado junto com este gerador: a vaga do pool volta mesmo se o consumo parar no meio
+        with closing(pool_llm.stream(chain, {"context": contexto, "question": exigencia})) as pedacos:
+            for pedaco in pedacos:
+                if pedaco.content: yield pedaco.content
+
+def consultar_ia(exigencia, vectorstore, api_key, temperatura=0.0, modo="media", indice_lexical=None, cache_respostas=None):
+    return "".join(consultar_ia_stream(exigencia, vectorstore, api_key, temperatura, modo, indice_lexical, cache_respostas))
+
+# --- RASCUNHO EM LOTE (TODA A FILA EM PARALELO) ---
+async def consultar_ia_async(exigencia, vectorstore, chain, semaforo, indice_lexical=None, modo="media"):
+    from busca_hibrida import buscar_hibrido
+    # A busca (Chroma + BM25) é síncrona: roda numa thread para não travar o loop
+    docs = await asyncio.to_thread(buscar_hibrido, exigencia, vectorstore, indice_lexical, CANDIDATOS_CONTEXTO)
+    contexto = orcar_contexto(docs, exigencia, modo)
+    return (await invocar_com_retry(chain, {"context": contexto, "question": exigencia}, semaforo)).content
+
+async def rascunhar_fila(exigencias, vectorstore, api_key, modo="media", limite=LIMITE_CONCORRENCIA_LLM, ao_concluir=None,
+                         indice_lexical=None, cache_respostas=None):
+    """
+    Gera rascunhos para todas as exigências de uma vez, com no máximo `limite`
+    chamadas simultâneas ao LLM. ao_concluir(indice, resposta, erro) é chamado
+    à medida que cada item termina. Retorna {indice: resposta}.
+    """
+    semaforo = asyncio.Semaphore(limite)
+    chain = montar_chain_resposta(api_key, modo=modo)
+
+    async def _item(i, exigencia):
+        # Cada item roda na sua própria task: a operação medida vale só para ele
+        with operacao("rascunho_item"):
+            try:
+                if cache_respostas is not None:
+                    encontrada = await asyncio.to_thread(cache_respostas.buscar, exigencia, modo)
+                    if encontrada: return i, encontrada[0], None
+                return i, await consultar_ia_async(exigencia, vectorstore, chain, semaforo, indice_lexical, modo), None
+            except Exception as e:
+                return i, None, e
+
+    resultados = {}
+    for tarefa in asyncio.as_completed([_item(i, e) for i, e in enumerate(exigencias)]):
+        i, resposta, erro = await tarefa
+        if resposta is not None: resultados[i] = resposta
+        if ao_concluir: ao_concluir(i, resposta, erro)
+    return resultados
+
+def construir_cerebro(embedding_function=None, processos=None):
+    from indexador import sincronizar_cerebro
+    if not os.path.exists(PASTA_DOCUMENTOS): os.makedirs(PASTA_DOCUMENTOS); return None
+    # Incremental: só arquivos novos/alterados são lidos e embedados (ver indexador.py)
+    vectorstore, resumo = sincronizar_cerebro(PASTA_DOCUMENTOS, NOME_BANCO, embedding_function, processos)
+    if not resumo["total_pedacos"]: return None
+    return vectorstore
+
+def abrir_cerebro(embedding_function):
+    """
+    Abre o banco existente (app); sincronizar com a pasta é trabalho do treinar.py/lote.py.
+    Num servidor novo, sem banco, a primeira indexação sai daqui, lendo os arquivos na
+    própria thread (sem pool de processos dentro do servidor).
+    """
+    from indexador import abrir_cerebro as _abrir
+    if not os.path.exists(NOME_BANCO) and os.path.exists(PASTA_DOCUMENTOS):
+        return construir_cerebro(embedding_function, processos=0)
+    return _abrir(NOME_BANCO, embedding_function)
+
+def carregar_ou_construir_cerebro(embedding_function):
+    from langchain_community.vectorstores import Chroma
+    if os.path.exists(PASTA_DOCUMENTOS):
+        return construir_cerebro(embedding_function)
+    if os.path.exists(NOME_BANCO):
+        return Chroma(persist_directory=NOME_BANCO, embedding_function=embedding_function)
+    return construir_cerebro(embedding_function)
+
+### FIM DO PROCESSAMENTO ###
@@ -0,0 +1,231 @@
+### RELATÓRIO EM PDF: DIAGRAMAÇÃO INCREMENTAL + CACHE POR CONTEÚDO ###
+
+import os
+import copy
+import zlib
+import struct
+import hashlib
+import datetime
+import tempfile
+import threading
+
+# --- CONFIGURAÇÃO ---
+ARQUIVO_ASSINATURA = "assinatura.png"
+ASSINANTE_PADRAO = "Ângelo Aparecido Amadeu Júnior"
+CARGO_PADRAO = "Consultor Técnico"
+MESES = {1: "janeiro", 2: "fevereiro", 3: "março", 4: "abril", 5: "maio", 6: "junho", 7: "julho",
+         8: "agosto", 9: "setembro", 10: "outubro", 11: "novembro", 12: "dezembro"}
+
+def _latin1(texto):
+    return str(texto).encode('latin-1', 'replace').decode('latin-1')
+
+def _limpar(texto):
+    # Limpeza robusta de TODOS os caracteres indesejados
+    return str(texto).strip().strip("'\"“”*")
+
+def _hash(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(str(parte).encode("utf-8") + b"\x00")
+    return h.hexdigest()
+
+# --- ASSINATURA (PNG CONVERTIDO UMA VEZ POR PROCESSO) ---
+# O fpdf 1.7 só aceita o caminho da imagem e, num PNG com canal alfa, separa o alfa pixel
+# a pixel em Python (~200 ms) a cada documento novo. A assinatura é convertida uma vez para
+# RGB sobre branco com o branco marcado como transparente (tRNS): esse PNG o fpdf só copia.
+
+_assinatura = {"chave": None, "arquivo": None}
+_trava_assinatura = threading.Lock()
+
+def _blocos_png(dados):
+    posicao = 8
+    while posicao < len(dados):
+        tamanho, = struct.unpack(">I", dados[posicao:posicao + 4])
+        yield dados[posicao + 4:posicao + 8], dados[posicao + 8:posicao + 8 + tamanho]
+        posicao += 12 + tamanho
+
+def _bloco_png(tipo, conteudo):
+    return struct.pack(">I", len(conteudo)) + tipo + conteudo + struct.pack(">I", zlib.crc32(tipo + conteudo))
+
+def _pixels_png(dados):
+    """Matriz (altura, largura, canais) de um PNG RGB/RGBA de 8 bits sem entrelaçamento; None nos demais."""
+    import numpy as np  # adiado: o app abre sem carregar o numpy
+    cabecalho = dict(_blocos_png(dados))[b"IHDR"]
+    largura, altura, bits, cor, _, _, entrelacado = struct.unpack(">IIBBBBB", cabecalho)
+    if bits != 8 or cor not in (2, 6) or entrelacado: return None
+    canais = 3 if cor == 2 else 4
+    bruto = np.frombuffer(zlib.decompress(b"".join(c for t, c in _blocos_png(dados) if t == b"IDAT")), dtype=np.uint8)
+    linhas = bruto.reshape(altura, largura * canais + 1)
+    pixels = np.zeros((altura, largura * canais), dtype=np.uint8)
+    anterior = np.zeros(largura * canais, dtype=np.uint8)
+    for y in range(altura):
+        filtro, linha = linhas[y, 0], linhas[y, 1:]
+        if filtro == 0: atual = linha.copy()
+        elif filtro == 1:  # Sub: soma acumulada por canal
+            atual = (np.cumsum(linha.reshape(largura, canais), axis=0, dtype=np.uint32) % 256).astype(np.uint8).ravel()
+        elif filtro == 2: atual = linha + anterior
+        else:
+            atual = bytearray(linha.tobytes())
+            acima = anterior.tolist()
+            for i in range(len(atual)):
+                esquerda = atual[i - canais] if i >= canais else 0
+                diagonal = acima[i - canais] if i >= canais else 0
+                if filtro == 3:
+                    atual[i] = (atual[i] + (esquerda + acima[i]) // 2) & 0xFF
+                else:  # Paeth
+                    p = esquerda + acima[i] - diagonal
+                    pa, pb, pc = abs(p - esquerda), abs(p - acima[i]), abs(p - diagonal)
+                    previsto = esquerda if pa <= pb and pa <= pc else acima[i] if pb <= pc else diagonal
+                    atual[i] = (atual[i] + previsto) & 0xFF
+            atual = np.frombuffer(bytes(atual), dtype=np.uint8)
+        pixels[y] = anterior = atual
+    return pixels.reshape(altura, largura, canais)
+
+def _converter_assinatura(caminho):
+    """Grava o PNG RGB com branco transparente num arquivo temporário; None se o formato não for suportado."""
+    import numpy as np
+    with open(caminho, "rb") as f: dados = f.read()
+    pixels = _pixels_png(dados)
+    if pixels is None: return None
+    if pixels.shape[2] == 4:
+        alfa = pixels[:, :, 3:].astype(np.uint16)
+        pixels = ((pixels[:, :, :3] * alfa + 255 * (255 - alfa)) // 255).astype(np.uint8)
+    altura, largura = pixels.shape[:2]
+    linhas = np.hstack([np.zeros((altura, 1), dtype=np.uint8), pixels.reshape(altura, -1)])
+    png = (b"\x89PNG\r\n\x1a\n"
+           + _bloco_png(b"IHDR", struct.pack(">IIBBBBB", largura, altura, 8, 2, 0, 0, 0))
+           + _bloco_png(b"tRNS", struct.pack(">HHH", 255, 255, 255))
+           + _bloco_png(b"IDAT", zlib.compress(linhas.tobytes(), 6))
+           + _bloco_png(b"IEND", b""))
+    descritor, convertido = tempfile.mkstemp(prefix="assinatura_", suffix=".png")
+    with os.fdopen(descritor, "wb") as f: f.write(png)
+    return convertido
+
+def _arquivo_assinatura(caminho):
+    """Caminho da assinatura já convertida, refeita só quando o arquivo muda no disco."""
+    chave = (os.path.abspath(caminho), os.path.getmtime(caminho))
+    with _trava_assinatura:
+        if _assinatura["chave"] != chave:
+            try:
+                convertido = _converter_assinatura(caminho)
+            except (OSError, ValueError, KeyError, zlib.error):
+                convertido = None
+            _assinatura["chave"], _assinatura["arquivo"] = chave, convertido or caminho
+        return _assinatura["arquivo"]
+
+# --- DIAGRAMAÇÃO ---
+
+def _novo_documento(empresa):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    # Cabeçalho
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, _latin1(_limpar(empresa)), ln=True, align="C")
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "RELATORIO DE ATENDIMENTO AS EXIGENCIAS TECNICAS", ln=True, align="C")
+    pdf.ln(10)
+    return pdf
+
+def _desenhar_item(pdf, item):
+    pdf.set_font("Arial", "B", 11)
+    pdf.set_fill_color(230, 230, 230)
+    pdf.cell(0, 8, _latin1(item['titulo']), ln=True, fill=True, align="C")
+    pdf.ln(2)
+    if item['exigencia']:
+        pdf.set_font("Arial", "I", 9)
+        pdf.set_text_color(100, 100, 100)
+        pdf.multi_cell(0, 5, _latin1(f"Exigencia: {item['exigencia']}"))
+        pdf.ln(2)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", "", 10)
+    pdf.multi_cell(0, 5, _latin1(item['resposta']))
+    pdf.ln(8)
+
+def _assinar(pdf, cidade, nome, cargo, hoje, assinatura=ARQUIVO_ASSINATURA):
+    # Assinatura
+    if pdf.get_y() > 240: pdf.add_page()
+    pdf.ln(10)
+
+    # Linha da Cidade e Data
+    data_formatada = f"{hoje.day} de {MESES[hoje.month]} de {hoje.year}"
+    pdf.set_font("Arial", "", 11)
+    pdf.cell(0, 10, _latin1(f"{_limpar(cidade)}, {data_formatada}"), ln=True, align="C")
+
+    if os.path.exists(assinatura):
+        assinatura_w = 100
+        # Centro da página + 2cm, subindo 2cm para a imagem ficar sobre a linha
+        assinatura_x = ((pdf.w - assinatura_w) / 2) + 20
+        assinatura_y = pdf.get_y() - 20
+        pdf.image(_arquivo_assinatura(assinatura), x=assinatura_x, y=assinatura_y, w=assinatura_w)
+        pdf.ln(30)
+    else:
+        pdf.ln(15)
+
+    pdf.line(60, pdf.get_y(), 150, pdf.get_y())
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 7, _latin1(_limpar(nome)), ln=True, align="C")
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 5, _latin1(_limpar(cargo)), ln=True, align="C")
+
+class RelatorioPdf:
+    """
+    Gera o PDF do relatório só quando pedido. Guarda um único ponto de retomada:
+    o documento diagramado até o último item da geração anterior. Se os itens atuais
+    começam pelos mesmos itens, só os novos são desenhados; o PDF pronto fica em
+    memória enquanto itens, cabeçalho e data não mudarem.
+    """
+
+    def __init__(self, assinatura=ARQUIVO_ASSINATURA):
+        self.assinatura = assinatura
+        self._ponto = (None, None, 0)  # (chave dos itens diagramados, documento, quantos itens)
+        self._final = (None, None)
+
+    def _chaves(self, itens, empresa):
+        chaves = [_hash("cabecalho", _limpar(empresa))]
+        for item in itens:
+            chaves.append(_hash(chaves[-1], item['titulo'], item['exigencia'], item['resposta']))
+        return chaves
+
+    def _chave_final(self, chaves, cidade, nome, cargo, hoje):
+        versao_assinatura = os.path.getmtime(self.assinatura) if os.path.exists(self.assinatura) else None
+        return _hash(chaves[-1], _limpar(cidade), _limpar(nome), _limpar(cargo), hoje, versao_assinatura)
+
+    def pronto(self, itens, empresa, cidade, nome, cargo):
+        """True se o PDF desse conteúdo já está gerado (o download sai sem diagramar nada)."""
+        chave = self._chave_final(self._chaves(itens, empresa), cidade, nome, cargo, datetime.date.today())
+        return self._final[0] == chave
+
+    def gerar(self, itens, empresa, cidade, nome, cargo):
+        hoje = datetime.date.today()
+        chaves = self._chaves(itens, empresa)
+        chave_final = self._chave_final(chaves, cidade, nome, cargo, hoje)
+        if self._final[0] == chave_final: return self._final[1]
+
+        # Retoma do ponto guardado se ele ainda é um prefixo dos itens atuais
+        chave_ponto, documento, feitos = self._ponto
+        if documento is not None and feitos < len(chaves) and chaves[feitos] == chave_ponto:
+            pdf = copy.deepcopy(documento)
+        else:
+            pdf, feitos = _novo_documento(empresa), 0
+        for item in itens[feitos:]:
+            _desenhar_item(pdf, item)
+        self._ponto = (chaves[-1], copy.deepcopy(pdf), len(itens))
+
+        # Cidade/data e assinatura vão no documento de trabalho: output() fecha o documento
+        _assinar(pdf, cidade, nome, cargo, hoje, self.assinatura)
+        dados = pdf.output(dest="S").encode("latin-1", "replace")
+        self._final = (chave_final, dados)
+        return dados
+
+def gerar_pdf_final(itens, empresa, cidade, nome, cargo):
+    """Gera o relatório completo de uma vez (sem reaproveitar diagramação anterior)."""
+    pdf = _novo_documento(empresa)
+    for item in itens:
+        _desenhar_item(pdf, item)
+    _assinar(pdf, cidade, nome, cargo, datetime.date.today())
+    return pdf.output(dest="S").encode("latin-1", "replace")
+
+### FIM DO RELATÓRIO EM PDF ###
@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# Os módulos do projeto ficam soltos na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metricas
+import orcamento_contexto
+
+@pytest.fixture(autouse=True)
+def metricas_temporarias(tmp_path):
+    """As medições dos testes não vão para o metricas.sqlite do app."""
+    with metricas.gravando_em(str(tmp_path / "metricas.sqlite")):
+        yield
+
+@pytest.fixture
+def contagem_estimada(monkeypatch):
+    """Contagem por caracteres (sem tiktoken): os limites dos testes ficam exatos."""
+    monkeypatch.setattr(orcamento_contexto, "_codificador", False)
@@ -0,0 +1,59 @@
+from armazem_analises import ArmazemAnalises, dados_vazios, novo_id
+
+def test_analise_nova_vem_vazia(tmp_path):
+    estado = ArmazemAnalises(str(tmp_path / "analises.sqlite")).carregar(novo_id())
+    assert estado == {"dados_auto": dados_vazios(), "fila": [], "relatorio": [], "rascunhos": {}, "modos": {}}
+
+def test_ida_e_volta_entre_instancias(tmp_path):
+    arquivo = str(tmp_path / "analises.sqlite")
+    armazem = ArmazemAnalises(arquivo)
+    dados = {"empresa": "Metalúrgica Exemplo LTDA", "cnpj": "11.222.333/0001-81", "endereco": "", "cidade": "Sorocaba - SP"}
+    relatorio = [{"titulo": "ITEM 1", "exigencia": "Laudo de ruído", "resposta": "Laudo anexo."}]
+    armazem.salvar("a1", dados_auto=dados, fila=["Laudo de ruído", "Bacia de contenção"], relatorio=relatorio)
+    armazem.guardar_rascunho("a1", "Bacia de contenção", "Instalada.", "curta")
+    # Outro worker abrindo o mesmo arquivo
+    estado = ArmazemAnalises(arquivo).carregar("a1")
+    assert estado["dados_auto"] == dados
+    assert estado["fila"] == ["Laudo de ruído", "Bacia de contenção"]
+    assert estado["relatorio"] == relatorio
+    assert estado["rascunhos"] == {"Bacia de contenção": "Instalada."}
+    assert estado["modos"] == {"Bacia de contenção": "curta"}
+
+def test_salvar_grava_so_os_campos_informados(tmp_path):
+    armazem = ArmazemAnalises(str(tmp_path / "analises.sqlite"))
+    armazem.salvar("a1", fila=["Exigência"], relatorio=[{"titulo": "T"}])
+    armazem.salvar("a1", dados_auto={**dados_vazios(), "empresa": "X"})
+    estado = armazem.carregar("a1")
+    assert estado["fila"] == ["Exigência"] and estado["relatorio"] == [{"titulo": "T"}]
+    assert estado["dados_auto"]["empresa"] == "X"
+
+def test_rascunhos_removidos(tmp_path):
+    armazem = ArmazemAnalises(str(tmp_path / "analises.sqlite"))
+    for exigencia in ("A", "B", "C"): armazem.guardar_rascunho("a1", exigencia, "resposta")
+    armazem.remover_rascunho("a1", "A")
+    assert set(armazem.carregar("a1")["rascunhos"]) == {"B", "C"}
+    armazem.limpar_rascunhos("a1")
+    assert armazem.carregar("a1")["rascunhos"] == {}
+
+def test_recentes_so_entre_os_ids_informados(tmp_path):
+    armazem = ArmazemAnalises(str(tmp_path / "analises.sqlite"))
+    armazem.salvar("minha", dados_auto={**dados_vazios(), "empresa": "Minha"}, fila=["A", "B"])
+    armazem.salvar("outra", dados_auto={**dados_vazios(), "empresa": "De outra pessoa"})
+    assert [(a["id"], a["empresa"], a["na_fila"]) for a in armazem.recentes(["minha"])] == [("minha", "Minha", 2)]
+    assert armazem.recentes([]) == []
+
+def test_extracoes_por_hash(tmp_path):
+    armazem = ArmazemAnalises(str(tmp_path / "analises.sqlite"))
+    assert armazem.extracao("abc", "completo") is None
+    armazem.guardar_extracao("abc", "completo", ["dados", "exigências"])
+    assert armazem.extracao("abc", "completo") == ["dados", "exigências"]
+    assert armazem.extracao("abc", "cadastro") is None
+
+def test_extracao_de_outra_versao_nao_vale(tmp_path, monkeypatch):
+    import armazem_analises
+    armazem = ArmazemAnalises(str(tmp_path / "analises.sqlite"))
+    armazem.guardar_extracao("abc", "completo", ["dados", "exigências"])
+    monkeypatch.setattr(armazem_analises, "VERSAO_EXTRACAO", armazem_analises.VERSAO_EXTRACAO + 1)
+    assert armazem.extracao("abc", "completo") is None
+    armazem.guardar_extracao("abc", "completo", ["dados", "novas exigências"])
+    assert armazem.extracao("abc", "completo") == ["dados", "novas exigências"]
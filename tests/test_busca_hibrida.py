@@ -0,0 +1,68 @@
+from langchain_core.documents import Document
+from busca_hibrida import construir_indice_lexical, IndiceLexical, buscar_hibrido, assinatura_ids
+
+TEXTOS = {
+    "p1": "Os resíduos sólidos devem ser armazenados em área coberta.",
+    "p2": "Apresentar laudo de ruído. O ruído não pode ultrapassar os limites da NBR 10151.",
+    "p3": "Manter a ventilação local exaustora e os filtros de mangas em operação.",
+    "p4": "Apresentar laudo anual assinado por responsável técnico.",
+}
+
+def _indice(pasta):
+    ids = list(TEXTOS)
+    construir_indice_lexical(ids, [TEXTOS[i] for i in ids], str(pasta), assinatura_ids(ids))
+    return IndiceLexical.abrir(str(pasta))
+
+def test_bm25_ordena_por_relevancia(tmp_path):
+    indice = _indice(tmp_path)
+    assert indice.assinatura == assinatura_ids(TEXTOS)
+    resultado = indice.buscar("laudo de ruído")
+    assert [i for i, _ in resultado] == ["p2", "p4"]
+    assert resultado[0][1] > resultado[1][1] > 0
+
+def test_bm25_ignora_acentos_stopwords_e_termos_ausentes(tmp_path):
+    indice = _indice(tmp_path)
+    assert [i for i, _ in indice.buscar("RESIDUOS SOLIDOS")] == ["p1"]
+    assert indice.buscar("de o a") == []
+    assert indice.buscar("efluente") == []
+    assert [i for i, _ in indice.buscar("10151")] == ["p2"]
+
+def test_indice_ausente_abre_como_none(tmp_path):
+    assert IndiceLexical.abrir(str(tmp_path)) is None
+
+class _Embeddings:
+    def embed_query(self, texto):
+        return [0.0]
+
+class _Vetorial:
+    """Chroma falso: a busca vetorial devolve uma ordem fixa e get() acha os pedaços por id."""
+
+    def __init__(self, ordem):
+        self.embeddings = _Embeddings()
+        self.ordem = ordem
+
+    def similarity_search_by_vector(self, vetor, k):
+        return [Document(page_content=TEXTOS[i], metadata={"id": i}) for i in self.ordem[:k]]
+
+    def get(self, ids, include):
+        return {"ids": ids, "documents": [TEXTOS[i] for i in ids], "metadatas": [{"id": i} for i in ids]}
+
+class _Lexical:
+    def __init__(self, ordem):
+        self.ordem = ordem
+
+    def buscar(self, consulta, k):
+        return [(i, 1.0) for i in self.ordem[:k]]
+
+def test_rrf_favorece_quem_aparece_nas_duas_buscas():
+    docs = buscar_hibrido("consulta", _Vetorial(["p1", "p2", "p3"]), _Lexical(["p4", "p2"]), k=3)
+    assert [d.metadata["id"] for d in docs] == ["p2", "p1", "p4"]
+
+def test_pesos_desempatam_as_buscas():
+    vetorial, lexical = _Vetorial(["p1"]), _Lexical(["p4"])
+    assert buscar_hibrido("c", vetorial, lexical, k=1, peso_lexical=2.0)[0].metadata["id"] == "p4"
+    assert buscar_hibrido("c", vetorial, lexical, k=1, peso_vetorial=2.0)[0].metadata["id"] == "p1"
+
+def test_sem_indice_lexical_e_busca_vetorial_pura():
+    docs = buscar_hibrido("consulta", _Vetorial(["p3", "p1", "p2"]), None, k=2)
+    assert [d.metadata["id"] for d in docs] == ["p3", "p1"]
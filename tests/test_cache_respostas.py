@@ -0,0 +1,73 @@
+import time
+import pytest
+from cache_respostas import CacheRespostas, termos_exatos
+
+class _Embeddings:
+    """Vetores escolhidos à mão: a semelhança entre exigências fica sob controle do teste."""
+
+    def __init__(self, vetores):
+        self.vetores = vetores
+
+    def embed_query(self, texto):
+        return self.vetores[texto]
+
+RESIDUOS = "Armazenar resíduos classe I conforme a NBR 10004"
+RESIDUOS_REESCRITA = "Armazenar os resíduos classe I de acordo com a NBR 10004"
+RUIDO = "Armazenar resíduos classe I conforme a NBR 10151"
+OUTRA = "Manter o sistema de exaustão ligado"
+
+@pytest.fixture
+def embeddings():
+    return _Embeddings({RESIDUOS: [1.0, 0.0, 0.0], RESIDUOS_REESCRITA: [0.98, 0.05, 0.0],
+                        RUIDO: [0.99, 0.02, 0.0], OUTRA: [0.0, 1.0, 0.0]})
+
+def _cache(embeddings, tmp_path, versao="v1", **kwargs):
+    return CacheRespostas(embeddings, versao, arquivo=str(tmp_path / "respostas.sqlite"), **kwargs)
+
+def test_reaproveita_exigencia_parecida_no_mesmo_modo(embeddings, tmp_path):
+    cache = _cache(embeddings, tmp_path)
+    cache.guardar(RESIDUOS, "media", "Resposta aprovada.")
+    resposta, similaridade = cache.buscar(RESIDUOS_REESCRITA, "media")
+    assert resposta == "Resposta aprovada." and similaridade >= cache.limiar
+    assert cache.buscar(RESIDUOS_REESCRITA, "curta") is None
+    assert cache.buscar(OUTRA, "media") is None
+
+def test_norma_diferente_nao_reaproveita(embeddings, tmp_path):
+    cache = _cache(embeddings, tmp_path)
+    cache.guardar(RESIDUOS, "media", "Resposta sobre a NBR 10004.")
+    # Cosseno de ~0.99: só os termos exatos separam as duas exigências
+    assert cache.buscar(RUIDO, "media") is None
+    cache.guardar(RUIDO, "media", "Resposta sobre a NBR 10151.")
+    assert cache.buscar(RUIDO, "media")[0] == "Resposta sobre a NBR 10151."
+    assert cache.buscar(RESIDUOS, "media")[0] == "Resposta sobre a NBR 10004."
+
+def test_termos_exatos():
+    assert termos_exatos("conforme a NBR 10.004") == {"nbr", "10", "004"}
+    assert termos_exatos(OUTRA) == frozenset()
+
+def test_nova_versao_da_base_invalida(embeddings, tmp_path):
+    _cache(embeddings, tmp_path, "v1").guardar(RESIDUOS, "media", "Resposta.")
+    assert _cache(embeddings, tmp_path, "v1").buscar(RESIDUOS, "media")[0] == "Resposta."
+    assert _cache(embeddings, tmp_path, "v2").buscar(RESIDUOS, "media") is None
+    assert _cache(embeddings, tmp_path, "v1").buscar(RESIDUOS, "media") is None
+
+def test_mesma_exigencia_atualiza_no_lugar(embeddings, tmp_path):
+    cache = _cache(embeddings, tmp_path)
+    cache.guardar(RESIDUOS, "media", "Primeira versão.")
+    cache.guardar(RESIDUOS, "media", "Versão corrigida.")
+    cache.guardar(RESIDUOS_REESCRITA, "media", "Versão corrigida.")  # veio do cache e foi aprovada sem mudança
+    assert cache._db.execute("SELECT COUNT(*) FROM respostas").fetchone()[0] == 1
+    assert cache.buscar(RESIDUOS, "media")[0] == "Versão corrigida."
+
+def test_despejo_lru(embeddings, tmp_path):
+    cache = _cache(embeddings, tmp_path, maximo=2)
+    cache.guardar(RESIDUOS, "media", "Resíduos.")
+    time.sleep(0.01)
+    cache.guardar(OUTRA, "media", "Exaustão.")
+    time.sleep(0.01)
+    cache.buscar(RESIDUOS, "media")  # renova o uso: a menos usada passa a ser OUTRA
+    time.sleep(0.01)
+    cache.guardar(RUIDO, "curta", "Ruído.")
+    assert cache.buscar(OUTRA, "media") is None
+    assert cache.buscar(RESIDUOS, "media")[0] == "Resíduos."
+    assert cache.buscar(RUIDO, "curta")[0] == "Ruído."
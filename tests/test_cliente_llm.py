@@ -0,0 +1,106 @@
+import pytest
+import cliente_llm
+from cliente_llm import LimitadorTaxa, PoolLLM, eh_limite_de_taxa, espera_retry, MAX_TENTATIVAS_LLM
+
+class _Relogio:
+    """Relógio falso: sleep só avança o tempo e anota quanto se esperou."""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    perf_counter = monotonic
+
+    def sleep(self, segundos):
+        self.esperas.append(round(segundos, 6))
+        self.agora += segundos
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(cliente_llm, "time", relogio)
+    return relogio
+
+class _Erro429(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limit")
+        self.response = type("Resposta", (), {"headers": {"retry-after": retry_after}})() if retry_after else None
+
+class _Chain:
+    """Levanta os erros da fila, um por chamada, e depois responde."""
+
+    def __init__(self, *erros):
+        self.erros = list(erros)
+        self.chamadas = 0
+
+    def _proximo(self):
+        self.chamadas += 1
+        if self.erros: raise self.erros.pop(0)
+
+    def invoke(self, entrada):
+        self._proximo()
+        return "resposta"
+
+    def stream(self, entrada):
+        self._proximo()
+        yield "pri"
+        yield "meiro"
+
+def test_rajada_sai_junta_e_o_resto_espacado(relogio):
+    limitador = LimitadorTaxa(por_minuto=60, rajada=3)
+    for _ in range(5): limitador.aguardar_vez()
+    assert relogio.esperas == [1.0, 1.0]
+
+def test_taxa_se_recupera_com_o_tempo(relogio):
+    limitador = LimitadorTaxa(por_minuto=60, rajada=2)
+    for _ in range(2): limitador.aguardar_vez()
+    relogio.agora += 10
+    for _ in range(2): limitador.aguardar_vez()
+    assert relogio.esperas == []
+
+def test_pausa_segura_a_proxima_chamada(relogio):
+    limitador = LimitadorTaxa(por_minuto=60, rajada=5)
+    limitador.pausar(7)
+    limitador.aguardar_vez()
+    assert relogio.esperas == [7.0]
+
+def test_reconhece_429_e_retry_after():
+    assert eh_limite_de_taxa(_Erro429()) and eh_limite_de_taxa(Exception("Error code: 429"))
+    assert not eh_limite_de_taxa(ValueError("entrada inválida"))
+    assert espera_retry(_Erro429("12"), 0) == 12.0
+    assert 2.0 <= espera_retry(_Erro429(), 1) < 3.0
+
+def test_invocar_repete_depois_de_429(relogio):
+    pool, chain = PoolLLM(por_minuto=6000), _Chain(_Erro429("3"), _Erro429("3"))
+    assert pool.invocar(chain, {}) == "resposta"
+    assert chain.chamadas == 3 and relogio.esperas.count(3.0) == 2
+
+def test_invocar_nao_repete_outros_erros(relogio):
+    chain = _Chain(ValueError("entrada inválida"))
+    with pytest.raises(ValueError):
+        PoolLLM().invocar(chain, {})
+    assert chain.chamadas == 1
+
+def test_invocar_desiste_depois_do_maximo(relogio):
+    chain = _Chain(*[_Erro429("1") for _ in range(MAX_TENTATIVAS_LLM)])
+    with pytest.raises(_Erro429):
+        PoolLLM(por_minuto=6000).invocar(chain, {})
+    assert chain.chamadas == MAX_TENTATIVAS_LLM
+
+def test_stream_repete_429_antes_do_primeiro_token(relogio):
+    chain = _Chain(_Erro429("2"))
+    assert "".join(PoolLLM(por_minuto=6000).stream(chain, {})) == "primeiro"
+    assert chain.chamadas == 2
+
+def test_stream_fechado_devolve_a_vaga(relogio):
+    pool = PoolLLM(limite=1)
+    gerador = pool.stream(_Chain(), {})
+    assert next(gerador) == "pri"
+    gerador.close()
+    # Com a única vaga devolvida, a próxima chamada não trava
+    assert pool.invocar(_Chain(), {}) == "resposta"
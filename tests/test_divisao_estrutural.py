@@ -0,0 +1,71 @@
+from langchain_core.documents import Document
+from divisao_estrutural import dividir_por_estrutura, assinatura_minhash, DeduplicadorMinHash
+
+PAGINA_1 = """CONDIÇÕES GERAIS
+1. Manter os equipamentos de controle de poluição em bom estado de funcionamento.
+2. Armazenar os resíduos sólidos em área coberta e com piso impermeável,
+conforme a norma ABNT NBR 12235.
+EXIGÊNCIAS TÉCNICAS
+1. Apresentar laudo de ruído no prazo de 90 dias."""
+
+PAGINA_2 = """2. Instalar bacia de contenção nos tanques de
+produtos químicos, com volume igual ao do maior tanque."""
+
+def _documentos():
+    return [Document(page_content=PAGINA_1, metadata={"source": "licenca.pdf", "page": 0}),
+            Document(page_content=PAGINA_2, metadata={"source": "licenca.pdf", "page": 1})]
+
+def test_secoes_nao_se_misturam():
+    pedacos = dividir_por_estrutura(_documentos(), tamanho=1000, sobreposicao=0)
+    assert [p.metadata["secao"] for p in pedacos] == ["CONDIÇÕES GERAIS", "EXIGÊNCIAS TÉCNICAS"]
+    assert "NBR 12235" in pedacos[0].page_content and "ruído" not in pedacos[0].page_content
+    assert all(p.metadata["source"] == "licenca.pdf" for p in pedacos)
+
+def test_pedacos_pequenos_cortam_nos_itens_e_item_atravessa_pagina():
+    pedacos = dividir_por_estrutura(_documentos(), tamanho=120, sobreposicao=0)
+    assert all(len(p.page_content) <= 120 for p in pedacos)
+    ultimo = pedacos[-1]
+    # O item 2 começa na página 2 e fica inteiro num pedaço só
+    assert ultimo.page_content.startswith("2. Instalar") and ultimo.page_content.endswith("maior tanque.")
+    assert ultimo.metadata["page"] == 1 and ultimo.metadata["item"] == "2"
+
+def test_bloco_maior_que_o_limite_vai_para_o_splitter():
+    longo = "1. " + " ".join(["Manter o sistema de ventilação local exaustora em operação."] * 20)
+    pedacos = dividir_por_estrutura([Document(page_content=longo, metadata={"page": 3})], tamanho=200, sobreposicao=20)
+    assert len(pedacos) > 1
+    assert all(len(p.page_content) <= 200 and p.metadata["page"] == 3 for p in pedacos)
+
+def test_titulo_vai_junto_com_bloco_maior_que_o_limite():
+    longo = "1. " + " ".join(["Manter o sistema de ventilação local exaustora em operação."] * 20)
+    texto = "BANCO DE DADOS: RESPOSTAS TÉCNICAS CETESB\n" + longo
+    pedacos = dividir_por_estrutura([Document(page_content=texto, metadata={"page": 0})], tamanho=200, sobreposicao=20)
+    assert len(pedacos) > 1 and pedacos[0].page_content.startswith("BANCO DE DADOS: RESPOSTAS TÉCNICAS CETESB\n1. Manter")
+    assert all(p.page_content.startswith("BANCO DE DADOS: RESPOSTAS TÉCNICAS CETESB\n") and len(p.page_content) <= 200
+               for p in pedacos)
+    assert all(p.metadata["secao"] == "BANCO DE DADOS: RESPOSTAS TÉCNICAS CETESB" and p.metadata["item"] == "1" for p in pedacos)
+
+def test_titulo_vai_junto_quando_grupo_estouraria_o_limite():
+    item = "1. Apresentar laudo de ruído ambiental elaborado por laboratório acreditado junto ao Inmetro."
+    pedacos = dividir_por_estrutura([Document(page_content="EXIGÊNCIAS TÉCNICAS\n" + item, metadata={"page": 0})],
+                                    tamanho=len(item) + 5, sobreposicao=0)
+    assert pedacos[0].page_content.startswith("EXIGÊNCIAS TÉCNICAS\n1. Apresentar")
+    assert all(p.page_content != "EXIGÊNCIAS TÉCNICAS" and len(p.page_content) <= len(item) + 5 for p in pedacos)
+
+def test_sem_documentos():
+    assert dividir_por_estrutura([], 1000, 200) == []
+
+def test_minhash_de_texto_curto_e_none():
+    assert assinatura_minhash("poucas palavras aqui") is None
+
+def test_deduplicador_descarta_quase_copias():
+    base = " ".join(f"Item {n}: manter o equipamento de controle número {n} em perfeitas condições." for n in range(8))
+    quase = base[:-1] + " de uso."
+    outro = "Apresentar à CETESB o laudo de medição de ruído ambiental elaborado por laboratório acreditado."
+    docs = [Document(page_content=t) for t in (base, quase, base, outro)]
+    assert [d.page_content for d in DeduplicadorMinHash().filtrar(docs)] == [base, outro]
+
+def test_deduplicador_lembra_entre_chamadas():
+    texto = "Os resíduos sólidos deverão ser armazenados em local coberto, com piso impermeável e bacia de contenção."
+    deduplicador = DeduplicadorMinHash()
+    assert len(deduplicador.filtrar([Document(page_content=texto)])) == 1
+    assert deduplicador.filtrar([Document(page_content=texto)]) == []
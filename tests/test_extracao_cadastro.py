@@ -0,0 +1,58 @@
+from extracao_cadastro import (cnpj_valido, extrair_cadastro_por_regex, campos_faltantes,
+                               formatar_dados_cadastrais, _cortar_no_proximo_rotulo)
+
+LICENCA = """CETESB - COMPANHIA AMBIENTAL DO ESTADO DE SÃO PAULO
+Razão Social: METALURGICA EXEMPLO LTDA CNPJ: 11.222.333/0001-81
+Logradouro: RUA DAS FLORES Número: 120
+Município: SOROCABA CEP: 18000-000
+"""
+
+def test_digitos_verificadores_do_cnpj():
+    assert cnpj_valido("11222333000181")
+    assert not cnpj_valido("11222333000182")
+    assert not cnpj_valido("11111111111111")
+    assert not cnpj_valido("1122233300018")
+
+def test_valor_termina_no_proximo_rotulo():
+    assert _cortar_no_proximo_rotulo("METALURGICA EXEMPLO LTDA CNPJ: 11.222.333/0001-81") == "METALURGICA EXEMPLO LTDA"
+    assert _cortar_no_proximo_rotulo("SOROCABA CEP: 18000-000") == "SOROCABA"
+
+def test_extrai_os_campos_rotulados():
+    dados, confianca = extrair_cadastro_por_regex(LICENCA)
+    assert dados == {"empresa": "METALURGICA EXEMPLO LTDA", "cnpj": "11.222.333/0001-81",
+                     "endereco": "RUA DAS FLORES, 120", "cidade": "SOROCABA - SP"}
+    assert campos_faltantes(confianca) == []
+
+def test_cnpj_sem_mascara_e_invalido_perde_confianca():
+    dados, confianca = extrair_cadastro_por_regex("CNPJ 11222333000182")
+    assert dados["cnpj"] == "11.222.333/0001-82"
+    assert "cnpj" in campos_faltantes(confianca)
+
+def test_valor_na_linha_seguinte():
+    dados, confianca = extrair_cadastro_por_regex("Município\nCAMPINAS - SP\n")
+    assert dados["cidade"] == "CAMPINAS - SP"
+    assert confianca["cidade"] == 0.8
+
+def test_formatacao_omite_campos_vazios():
+    assert formatar_dados_cadastrais({"empresa": "X LTDA", "cnpj": "", "endereco": "", "cidade": "Y - SP"}) == \
+        "EMPRESA: X LTDA\nCIDADE: Y - SP"
+
+def test_rotulo_no_meio_da_frase_nao_conta():
+    texto = ("O licenciado deverá manter o sistema de exaustão.\n"
+             "Em caso de mudança de endereço comunicar a CETESB.\n"
+             "Os resíduos devem ser enviados por empresa licenciada no SIGOR.\n")
+    dados, confianca = extrair_cadastro_por_regex(texto)
+    assert (dados["empresa"], dados["endereco"]) == ("", "")
+    assert campos_faltantes(confianca) == ["empresa", "cnpj", "endereco", "cidade"]
+
+def test_rotulo_generico_fica_abaixo_do_limiar():
+    dados, confianca = extrair_cadastro_por_regex("Interessado: METALURGICA EXEMPLO LTDA\n")
+    assert dados["empresa"] == "METALURGICA EXEMPLO LTDA"
+    assert "empresa" in campos_faltantes(confianca)
+
+def test_cabecalho_de_tabela_pega_a_coluna_certa():
+    texto = ("Razão Social      CNPJ                  Município\n"
+             "ACME IND LTDA     11.222.333/0001-81    SOROCABA - SP\n")
+    dados, confianca = extrair_cadastro_por_regex(texto)
+    assert (dados["empresa"], dados["cidade"]) == ("ACME IND LTDA", "SOROCABA - SP")
+    assert confianca["empresa"] == 0.8
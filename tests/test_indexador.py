@@ -0,0 +1,108 @@
+import pytest
+from langchain_core.documents import Document
+import indexador
+from indexador import gerar_ids_pedacos, sincronizar_cerebro, carregar_manifesto, calcular_hash_arquivo, _em_ordem
+from busca_hibrida import IndiceLexical
+
+def _docs(*textos, pagina=0):
+    return [Document(page_content=t, metadata={"page": pagina}) for t in textos]
+
+def test_ids_sao_deterministicos_e_por_arquivo():
+    ids = gerar_ids_pedacos("a.pdf", _docs("um", "dois"))
+    assert ids == gerar_ids_pedacos("a.pdf", _docs("um", "dois"))
+    assert len(set(ids)) == 2
+    assert set(ids).isdisjoint(gerar_ids_pedacos("b.pdf", _docs("um", "dois")))
+
+def test_pedaco_inalterado_mantem_o_id():
+    antes = gerar_ids_pedacos("a.pdf", _docs("um", "dois", "três"))
+    depois = gerar_ids_pedacos("a.pdf", _docs("um", "DOIS", "três"))
+    assert antes[0] == depois[0] and antes[2] == depois[2]
+    assert antes[1] != depois[1]
+
+def test_pagina_entra_no_id():
+    assert gerar_ids_pedacos("a.pdf", _docs("um", pagina=0)) != gerar_ids_pedacos("a.pdf", _docs("um", pagina=1))
+
+def test_textos_repetidos_ganham_sufixo():
+    ids = gerar_ids_pedacos("a.pdf", _docs("igual", "igual", "igual"))
+    assert ids[1] == f"{ids[0]}-2" and ids[2] == f"{ids[0]}-3"
+
+# --- SINCRONIZAÇÃO COM UM CHROMA FALSO ---
+
+class _ChromaFalso:
+    """Guarda os pedaços num dict por pasta: reabrir o "banco" devolve o mesmo conteúdo."""
+    bancos = {}
+
+    def __init__(self, persist_directory, embedding_function):
+        self.pedacos = self.bancos.setdefault(persist_directory, {})
+        self.adicionados = []
+
+    def get(self, ids=None, include=None, limit=None):
+        ids = list(self.pedacos) if ids is None else [i for i in ids if i in self.pedacos]
+        return {"ids": ids, "documents": [self.pedacos[i].page_content for i in ids],
+                "metadatas": [self.pedacos[i].metadata for i in ids]}
+
+    def add_documents(self, documentos, ids):
+        self.pedacos.update(zip(ids, documentos))
+        self.adicionados.extend(ids)
+
+    def delete(self, ids):
+        for i in ids: self.pedacos.pop(i, None)
+
+TEXTOS = {
+    "a.txt": "CONDIÇÕES GERAIS\n1. Manter os equipamentos de controle de poluição em perfeito funcionamento.",
+    "b.txt": "EXIGÊNCIAS TÉCNICAS\n1. Apresentar laudo de ruído ambiental elaborado por laboratório acreditado.",
+    "c.txt": "RESÍDUOS\n1. Armazenar os resíduos sólidos em área coberta com piso impermeável.",
+}
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexador, "Chroma", _ChromaFalso)
+    pasta, banco = tmp_path / "docs", str(tmp_path / "banco")
+    pasta.mkdir()
+    for nome in ("a.txt", "b.txt"): (pasta / nome).write_text(TEXTOS[nome], encoding="utf-8")
+
+    def sincronizar():
+        # processos=0: leitura no próprio processo, sem pool
+        return sincronizar_cerebro(str(pasta), banco, embedding_function=object(), processos=0)
+    return pasta, banco, sincronizar
+
+def test_primeira_sincronizacao_indexa_tudo(ambiente):
+    pasta, banco, sincronizar = ambiente
+    vectorstore, resumo = sincronizar()
+    assert resumo["novos"] == ["a.txt", "b.txt"] and not resumo["falhas"]
+    manifesto = carregar_manifesto(banco)
+    ids = [i for registro in manifesto["arquivos"].values() for i in registro["ids"]]
+    assert sorted(ids) == sorted(vectorstore.pedacos) and resumo["total_pedacos"] == len(ids)
+    assert manifesto["arquivos"]["a.txt"]["hash"] == calcular_hash_arquivo(str(pasta / "a.txt"))
+    assert IndiceLexical.abrir(banco).ids
+
+def test_sem_mudancas_nada_e_lido(ambiente):
+    _, _, sincronizar = ambiente
+    sincronizar()
+    vectorstore, resumo = sincronizar()
+    assert resumo["inalterados"] == ["a.txt", "b.txt"]
+    assert resumo["ingestao"] == [] and vectorstore.adicionados == []
+    assert resumo["indice_lexical_reconstruido"] is False
+
+def test_novos_alterados_e_removidos(ambiente):
+    pasta, banco, sincronizar = ambiente
+    _, antes = sincronizar()
+    ids_a = set(carregar_manifesto(banco)["arquivos"]["a.txt"]["ids"])
+    (pasta / "a.txt").unlink()
+    (pasta / "b.txt").write_text(TEXTOS["b.txt"] + "\n2. Refazer o laudo a cada renovação.", encoding="utf-8")
+    (pasta / "c.txt").write_text(TEXTOS["c.txt"], encoding="utf-8")
+    vectorstore, resumo = sincronizar()
+    assert (resumo["novos"], resumo["alterados"], resumo["removidos"]) == (["c.txt"], ["b.txt"], ["a.txt"])
+    manifesto = carregar_manifesto(banco)
+    assert set(manifesto["arquivos"]) == {"b.txt", "c.txt"}
+    assert manifesto["arquivos"]["b.txt"]["hash"] == calcular_hash_arquivo(str(pasta / "b.txt"))
+    ids = {i for registro in manifesto["arquivos"].values() for i in registro["ids"]}
+    assert ids == set(vectorstore.pedacos) and ids.isdisjoint(ids_a)
+    assert resumo["indice_lexical_reconstruido"] is True
+
+def test_resultados_voltam_na_ordem_pedida():
+    chegada = [("c", 1), ("a", 2), ("d", 3), ("b", 4)]
+    assert list(_em_ordem(chegada, ["a", "b", "c", "d"])) == [("a", 2), ("b", 4), ("c", 1), ("d", 3)]
+
+def test_ordem_com_arquivo_que_nao_chegou():
+    assert list(_em_ordem([("c", 1), ("a", 2)], ["a", "b", "c"])) == [("a", 2), ("c", 1)]
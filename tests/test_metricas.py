@@ -0,0 +1,34 @@
+import metricas
+from metricas import RegistroMetricas, percentil, medir, operacao
+
+def test_percentil_interpola():
+    assert percentil([], 50) == 0.0
+    assert percentil([4.0], 95) == 4.0
+    assert percentil([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentil([0.0, 10.0], 95) == 9.5
+
+def test_resumo_por_etapa(tmp_path):
+    registro = RegistroMetricas(str(tmp_path / "m.sqlite"))
+    for duracao in (0.1, 0.2, 0.3): registro.gravar("busca", duracao)
+    registro.gravar("llm", 1.0, tokens_entrada=100, tokens_saida=20)
+    resumo = {linha["etapa"]: linha for linha in registro.resumo()}
+    assert resumo["busca"]["n"] == 3 and resumo["busca"]["p50_ms"] == 200.0
+    assert resumo["busca"]["tokens_medios"] is None and resumo["llm"]["tokens_medios"] == 120
+
+def test_poda_mantem_so_as_mais_recentes(tmp_path, monkeypatch):
+    monkeypatch.setattr(metricas, "PODA_A_CADA", 10)
+    arquivo = str(tmp_path / "m.sqlite")
+    registro = RegistroMetricas(arquivo, maximo=25)
+    for n in range(100): registro.gravar("etapa", float(n))
+    linhas = registro._db.execute("SELECT COUNT(*), MIN(duracao) FROM spans").fetchone()
+    assert linhas == (25, 75.0)
+    # Reabrir também poda, mesmo com um limite menor
+    assert RegistroMetricas(arquivo, maximo=5)._db.execute("SELECT COUNT(*) FROM spans").fetchone()[0] == 5
+
+def test_medir_agrupa_sob_a_operacao(tmp_path):
+    with metricas.gravando_em(str(tmp_path / "outro.sqlite")) as registro:
+        with operacao("consultar_ia"):
+            with medir("busca") as span: span["tokens_entrada"] = 7
+        operacoes = dict(registro._db.execute("SELECT etapa, operacao FROM spans"))
+    assert operacoes == {"busca": "consultar_ia", "consultar_ia (total)": "consultar_ia"}
+    assert metricas.registro() is not registro
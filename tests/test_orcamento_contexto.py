@@ -0,0 +1,63 @@
+import os
+import sys
+import subprocess
+
+import pytest
+from langchain_core.documents import Document
+from orcamento_contexto import contar_tokens, cortar_em_tokens, montar_contexto, SEPARADOR
+from tokenizacao import tokenizar
+
+pytestmark = pytest.mark.usefixtures("contagem_estimada")
+
+def _doc(texto):
+    return Document(page_content=texto)
+
+def test_texto_dentro_do_limite_nao_e_cortado():
+    assert cortar_em_tokens("Texto curto.", 100) == "Texto curto."
+
+def test_corte_recua_ate_o_fim_da_frase():
+    texto = "Primeira frase completa sobre resíduos. " * 5 + "Segunda frase que ficaria pela metade no corte."
+    cortado = cortar_em_tokens(texto, 50)
+    assert contar_tokens(cortado) <= 50
+    assert cortado.endswith(".") and texto.startswith(cortado)
+
+def test_contexto_cabe_no_orcamento_e_corta_o_ultimo_trecho():
+    docs = [_doc(f"Trecho {n} sobre {tema}. " * 40) for n, tema in enumerate(["ruído", "odor", "efluente"])]
+    contexto, relatorio = montar_contexto(docs, "ruído", orcamento=400)
+    assert contar_tokens(contexto) <= 400
+    assert relatorio["cortados"] == 1 and relatorio["usados"] == 2
+    assert contexto.startswith("Trecho 0 sobre ruído")
+
+def test_termos_da_exigencia_sobem_o_trecho():
+    docs = [_doc("Manter os filtros limpos."), _doc("Varrer o pátio diariamente."),
+            _doc("Apresentar o laudo de ruído ambiental.")]
+    contexto, _ = montar_contexto(docs, "laudo de ruído", orcamento=1000)
+    # O primeiro da busca continua na frente; o que tem os termos passa o segundo
+    assert contexto.split(SEPARADOR) == ["Manter os filtros limpos.", "Apresentar o laudo de ruído ambiental.",
+                                         "Varrer o pátio diariamente."]
+
+def test_repetidos_e_sobreposicao_saem():
+    comum = "Os resíduos classe I devem ser armazenados conforme a NBR 12235 em área coberta e impermeável. "
+    fim = "Com bacia de contenção dimensionada para o maior tanque."
+    docs = [_doc(comum + fim), _doc(comum + fim),
+            _doc(fim + " Inspecionar os tanques todo mês e registrar as inspeções.")]
+    contexto, relatorio = montar_contexto(docs, "", orcamento=1000)
+    assert relatorio["repetidos"] == 1
+    assert contexto.count(comum.strip()) == 1
+    # O começo do último trecho repete o fim do primeiro e é removido
+    assert contexto.endswith(SEPARADOR + "Inspecionar os tanques todo mês e registrar as inspeções.")
+
+def test_orcamento_depende_do_modo():
+    docs = [_doc(f"Trecho número {n} com texto suficiente. " * 20) for n in range(6)]
+    curta, _ = montar_contexto(docs, "", modo="curta")
+    avancada, _ = montar_contexto(docs, "", modo="avancada")
+    assert contar_tokens(curta) <= 600 < contar_tokens(avancada) <= 2000
+
+def test_tokenizar_sem_acentos_nem_stopwords():
+    assert tokenizar("Apresentar o Laudo de Emissões conforme a NBR 10004") == ["apresentar", "laudo", "emissoes", "conforme", "nbr", "10004"]
+
+def test_orcamento_nao_carrega_numpy_nem_langchain():
+    codigo = "import sys, orcamento_contexto; print(sorted(m for m in ('numpy', 'langchain_core') if m in sys.modules))"
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert saida.stdout.strip() == "[]"
@@ -0,0 +1,48 @@
+import pytest
+from orcamento_contexto import contar_tokens
+from processamento import montar_janelas, mesclar_exigencias
+
+pytestmark = pytest.mark.usefixtures("contagem_estimada")
+
+def _pagina(n, tokens):
+    # 3.5 caracteres por token na contagem estimada
+    return f"P{n:02d}" + "x" * (int(tokens * 3.5) - 3)
+
+def test_janelas_respeitam_o_limite():
+    paginas = [_pagina(n, 400) for n in range(10)]
+    janelas = montar_janelas(paginas, limite=1000)
+    assert len(janelas) > 1
+    assert all(contar_tokens(j) <= 1000 for j in janelas)
+
+def test_janelas_cobrem_todas_as_paginas_e_repetem_a_ultima():
+    paginas = [_pagina(n, 400) for n in range(6)]
+    janelas = montar_janelas(paginas, limite=1000)
+    assert all(any(p in j for j in janelas) for p in paginas)
+    # Cada janela começa pela última página da anterior (cabem duas de 400 em 1000)
+    for anterior, seguinte in zip(janelas, janelas[1:]):
+        assert seguinte.split("\n")[0] == anterior.split("\n")[-1]
+
+def test_pagina_maior_que_o_limite_fica_sozinha():
+    paginas = [_pagina(0, 300), _pagina(1, 1500), _pagina(2, 300)]
+    janelas = montar_janelas(paginas, limite=1000)
+    assert janelas == paginas
+
+def test_janela_de_uma_pagina_nao_e_repetida():
+    paginas = [_pagina(0, 800), _pagina(1, 800)]
+    assert montar_janelas(paginas, limite=1000) == paginas
+
+def test_sem_paginas_nao_ha_janelas():
+    assert montar_janelas([]) == []
+
+def test_mesclar_remove_repetidas_e_fragmentos():
+    respostas = [
+        "1. Manter o sistema de exaustão ligado###2. Apresentar laudo de ruído anual",
+        "Apresentar laudo de ruído anual###Manter o sistema de exaustão",
+    ]
+    assert mesclar_exigencias(respostas) == (
+        "1. Manter o sistema de exaustão ligado\n###\n2. Apresentar laudo de ruído anual\n###\n")
+
+def test_mesclar_aceita_lista_por_linhas_e_descarta_sobras_curtas():
+    respostas = ["Armazenar resíduos em área coberta\nok\n", "Instalar bacia de contenção nos tanques"]
+    itens = mesclar_exigencias(respostas).split("\n###\n")
+    assert itens == ["Armazenar resíduos em área coberta", "Instalar bacia de contenção nos tanques", ""]
@@ -0,0 +1,95 @@
+import os
+import re
+import zlib
+import struct
+
+import numpy as np
+
+import relatorio_pdf
+from relatorio_pdf import RelatorioPdf, gerar_pdf_final
+
+ITENS = [{"titulo": f"Item {i}", "exigencia": f"Exigência {i} conforme NBR 1000{i}.", "resposta": f"Resposta {i} " * 40}
+         for i in range(1, 5)]
+CABECALHO = ("Empresa Teste Ltda", "São Paulo", "Fulano", "Engenheiro")
+
+def _sem_data(pdf):
+    return re.sub(rb"/CreationDate \(D:\d+\)", b"", pdf)
+
+def test_retomada_igual_a_geracao_completa():
+    relatorio = RelatorioPdf()
+    relatorio.gerar(ITENS[:2], *CABECALHO)
+    assert _sem_data(relatorio.gerar(ITENS, *CABECALHO)) == _sem_data(gerar_pdf_final(ITENS, *CABECALHO))
+
+def test_mesmo_conteudo_sai_da_memoria():
+    relatorio = RelatorioPdf()
+    assert not relatorio.pronto(ITENS, *CABECALHO)
+    primeiro = relatorio.gerar(ITENS, *CABECALHO)
+    assert relatorio.pronto(ITENS, *CABECALHO)
+    assert relatorio.gerar(ITENS, *CABECALHO) is primeiro
+
+def test_editar_item_do_meio_redesenha_dali_em_diante():
+    relatorio = RelatorioPdf()
+    relatorio.gerar(ITENS, *CABECALHO)
+    editados = [dict(item) for item in ITENS]
+    editados[1]["resposta"] = "Resposta revisada."
+    assert not relatorio.pronto(editados, *CABECALHO)
+    assert _sem_data(relatorio.gerar(editados, *CABECALHO)) == _sem_data(gerar_pdf_final(editados, *CABECALHO))
+
+def test_trocar_empresa_invalida_o_pdf():
+    relatorio = RelatorioPdf()
+    relatorio.gerar(ITENS, *CABECALHO)
+    outro = ("Outra Empresa S.A.",) + CABECALHO[1:]
+    assert not relatorio.pronto(ITENS, *outro)
+    assert b"Outra Empresa" in zlib.decompress(re.search(rb"stream\r?\n(.*?)endstream", relatorio.gerar(ITENS, *outro), re.S).group(1))
+
+# --- ASSINATURA ---
+
+def _png_rgba(pixels, filtros):
+    """PNG RGBA de 8 bits com o filtro indicado em cada linha (codificação de referência)."""
+    altura, largura, _ = pixels.shape
+    bruto, anterior = b"", [0] * (largura * 4)
+    for y in range(altura):
+        linha = pixels[y].ravel().tolist()
+        filtro, saida = filtros[y % len(filtros)], []
+        for i, valor in enumerate(linha):
+            esquerda = linha[i - 4] if i >= 4 else 0
+            diagonal = anterior[i - 4] if i >= 4 else 0
+            acima = anterior[i]
+            if filtro == 0: previsto = 0
+            elif filtro == 1: previsto = esquerda
+            elif filtro == 2: previsto = acima
+            elif filtro == 3: previsto = (esquerda + acima) // 2
+            else:
+                p = esquerda + acima - diagonal
+                pa, pb, pc = abs(p - esquerda), abs(p - acima), abs(p - diagonal)
+                previsto = esquerda if pa <= pb and pa <= pc else acima if pb <= pc else diagonal
+            saida.append((valor - previsto) & 0xFF)
+        bruto += bytes([filtro] + saida)
+        anterior = linha
+    return (b"\x89PNG\r\n\x1a\n"
+            + relatorio_pdf._bloco_png(b"IHDR", struct.pack(">IIBBBBB", largura, altura, 8, 6, 0, 0, 0))
+            + relatorio_pdf._bloco_png(b"IDAT", zlib.compress(bruto))
+            + relatorio_pdf._bloco_png(b"IEND", b""))
+
+def test_decodifica_todos_os_filtros_png():
+    pixels = np.random.default_rng(7).integers(0, 256, size=(10, 6, 4), dtype=np.uint8)
+    assert np.array_equal(relatorio_pdf._pixels_png(_png_rgba(pixels, [0, 1, 2, 3, 4])), pixels)
+
+def test_assinatura_convertida_uma_vez_por_versao(tmp_path, monkeypatch):
+    pixels = np.zeros((4, 4, 4), dtype=np.uint8)
+    pixels[1:3, 1:3] = (0, 0, 128, 255)  # traço azul opaco sobre fundo transparente
+    caminho = tmp_path / "assinatura.png"
+    caminho.write_bytes(_png_rgba(pixels, [1]))
+    monkeypatch.setattr(relatorio_pdf, "_assinatura", {"chave": None, "arquivo": None})
+    conversoes = []
+    converter = relatorio_pdf._converter_assinatura
+    monkeypatch.setattr(relatorio_pdf, "_converter_assinatura", lambda c: conversoes.append(c) or converter(c))
+
+    convertido = relatorio_pdf._arquivo_assinatura(str(caminho))
+    assert relatorio_pdf._arquivo_assinatura(str(caminho)) == convertido and len(conversoes) == 1
+    rgb = relatorio_pdf._pixels_png(open(convertido, "rb").read())
+    assert rgb.shape == (4, 4, 3) and tuple(rgb[0, 0]) == (255, 255, 255) and tuple(rgb[1, 1]) == (0, 0, 128)
+
+    os.utime(caminho, (0, 0))  # arquivo trocado no disco: converte de novo
+    relatorio_pdf._arquivo_assinatura(str(caminho))
+    assert len(conversoes) == 2
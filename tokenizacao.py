@@ -0,0 +1,19 @@
+### TOKENIZAÇÃO: TERMOS DE BUSCA SEM ACENTOS NEM STOPWORDS ###
+
+# Só biblioteca padrão: o orçamento de contexto importa este módulo sem trazer numpy/langchain ao app
+import re
+import unicodedata
+
+STOPWORDS = set("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas para com sem sob
+e ou que se ao aos à às é ser são foi como mais menos seu sua seus suas este esta estes estas esse essa
+isso isto aquele aquela ter deve deverá deverão será serão não sim já quando onde qual quais entre sobre
+""".split())
+
+def tokenizar(texto):
+    """Minúsculas, sem acentos, sem stopwords. Números (ex.: NBR 10004) viram termos próprios."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r"[a-z0-9]+", texto) if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+### FIM DA TOKENIZAÇÃO ###
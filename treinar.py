@@ -1,56 +1,45 @@
 ### INÍCIO DO ARQUIVO COMPLETO: treinar.py (VERSÃO FINAL PARA DEPLOY) ###
 
 import os
-import glob
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+import logging
+import argparse
+from motor_embeddings import MotorEmbeddings, TAMANHO_LOTE, BACKEND_EMBEDDINGS, BACKENDS_EMBEDDINGS
+from indexador import PASTA_DOCUMENTOS, NOME_BANCO, MODELO_EMBEDDINGS, sincronizar_cerebro, EmbeddingsIncompativeis
 
-# --- CONFIGURAÇÃO PARA DEPLOY: Usando caminhos relativos ---
-PASTA_DOCUMENTOS = "pdfs_cetesb"
-NOME_BANCO = "banco_chroma"
-MODELO_EMBEDDINGS = "all-MiniLM-L6-v2"
-
-def carregar_documentos_da_pasta(pasta):
-    documentos = []
-    loaders = {".pdf": PyPDFLoader, ".txt": TextLoader, ".docx": Docx2txtLoader}
+def treinar_cerebro(backend=BACKEND_EMBEDDINGS, reindexar=False):
     print(f"--- INICIANDO PROTOCOLO DE LEITURA ---")
-    print(f"Buscando documentos na pasta: '{pasta}'")
-    for extensao, loader_class in loaders.items():
-        caminho_busca = os.path.join(pasta, f"**/*{extensao}")
-        arquivos_encontrados = glob.glob(caminho_busca, recursive=True)
-        if arquivos_encontrados:
-            print(f"Encontrados {len(arquivos_encontrados)} arquivo(s) com extensão '{extensao}'.")
-            for arquivo_path in arquivos_encontrados:
-                try:
-                    print(f"Processando: {arquivo_path}...")
-                    loader = loader_class(arquivo_path)
-                    documentos.extend(loader.load())
-                except Exception as e:
-                    print(f"🚨 Falha ao ler o arquivo {arquivo_path}: {e}")
-    return documentos
-
-def treinar_cerebro():
-    documentos = carregar_documentos_da_pasta(PASTA_DOCUMENTOS)
-    if not documentos:
+    print(f"Sincronizando a pasta '{PASTA_DOCUMENTOS}' com o cérebro em '{NOME_BANCO}'...")
+    print(f"Modelo de embeddings: '{MODELO_EMBEDDINGS}' via {backend} (lotes de {TAMANHO_LOTE}, {os.cpu_count()} threads)")
+    # Na indexação o script tem a máquina toda: usa todos os núcleos para codificar
+    embedding_function = MotorEmbeddings(threads=os.cpu_count(), backend=backend)
+    try:
+        vectorstore, resumo = sincronizar_cerebro(PASTA_DOCUMENTOS, NOME_BANCO, embedding_function, reindexar=reindexar)
+    except EmbeddingsIncompativeis as e:
+        print(f"\n❌ {e}")
+        return
+    if resumo["compatibilidade"]:
+        c = resumo["compatibilidade"]
+        print(f"\n✅ Backend compatível com o banco existente (cosseno médio {c['cosseno_medio']}, mínimo {c['cosseno_minimo']}).")
+    paginas = sum(r["paginas"] for r in resumo["ingestao"])
+    print(f"\n✅ {len(resumo['ingestao'])} arquivo(s) lido(s), {paginas} página(s) em {resumo['segundos_ingestao']}s "
+          f"({len(resumo['falhas'])} falha(s)).")
+    print(f"\n✅ Novos: {len(resumo['novos'])} | Alterados: {len(resumo['alterados'])} | "
+          f"Removidos: {len(resumo['removidos'])} | Inalterados: {len(resumo['inalterados'])}")
+    print(f"✅ {resumo['pedacos_adicionados']} pedaço(s) embedado(s), {resumo['pedacos_duplicados']} cópia(s) descartada(s). "
+          f"Total no cérebro: {resumo['total_pedacos']}.")
+    if not resumo["total_pedacos"]:
         print("\n❌ ERRO CRÍTICO: Nenhum documento válido foi carregado.")
         return
-    print(f"\n2. Dividindo {len(documentos)} páginas/documentos em pedaços...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    splits = text_splitter.split_documents(documentos)
-    print(f"✅ Documentos divididos em {len(splits)} pedaços.")
-    print(f"\n3. Gerando embeddings com o modelo '{MODELO_EMBEDDINGS}'...")
-    embedding_function = HuggingFaceEmbeddings(model_name=MODELO_EMBEDDINGS)
-    print(f"\n4. Criando e salvando o cérebro na pasta '{NOME_BANCO}'...")
-    vectorstore = Chroma.from_documents(
-        documents=splits, 
-        embedding=embedding_function,
-        persist_directory=NOME_BANCO 
-    )
     print("\n--- ✅ MISSÃO CUMPRIDA! ---")
 
 if __name__ == "__main__":
-    treinar_cerebro()
+    # Relatório estruturado da ingestão (tempo e falhas por arquivo) vem do logger do indexador
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Sincroniza a pasta de documentos com o cérebro (Chroma + BM25).")
+    parser.add_argument("--backend", choices=BACKENDS_EMBEDDINGS, default=BACKEND_EMBEDDINGS,
+                        help="onnx/onnx-int8 codificam mais rápido em CPU; o padrão vem de BACKEND_EMBEDDINGS")
+    parser.add_argument("--reindexar", action="store_true", help="apaga o banco e embeda tudo de novo")
+    args = parser.parse_args()
+    treinar_cerebro(args.backend, args.reindexar)
 
 ### FIM DO ARQUIVO COMPLETO: treinar.py (VERSÃO FINAL PARA DEPLOY) ###